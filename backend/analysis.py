@@ -3,148 +3,86 @@
 import pandas as pd
 import os
 import json
-import plotly.graph_objects as go
-import plotly.express as px
-import plotly.utils
+import logging
 import numpy as np
 from datetime import datetime
-import plotly.graph_objs as go
-import plotly.express as px
-import plotly.utils
-from datetime import datetime
+from sidecar import read_sidecar
+from excel import read_excel_sheet
+from profiling import DatasetProfile, memory_footprint, memory_saved
+from correlation import matrix_to_dict
+from metrics import stage, log_event
+from sniffing import read_csv_lean
+from json_records import JSON_LINES_EXTENSIONS, json_layout, read_json_records, records_to_frame
+from compression import DecompressionLimitError, data_format, open_data, open_text
+from sampling import sample_rows, approximation_report, scale_to_population
+# Re-exported: the version of analyze_data's output lives with the cache that keys on it
+from cache import ANALYSIS_VERSION
+
+logger = logging.getLogger('data_analyzer.analysis')
+
+# Cap on individual outlier points drawn in a box plot
+MAX_BOX_OUTLIERS = 500
+
+# Heatmaps with more columns than this drop the per-cell labels
+HEATMAP_LABEL_COLUMNS = 12
 
-def load_data(file_path):
+# Column pairs at least this correlated are listed as insights, at most MAX_CORRELATION_INSIGHTS
+STRONG_CORRELATION = 0.8
+MAX_CORRELATION_INSIGHTS = 5
+
+def load_data(file_path, use_sidecar=True, sheet_name=None):
     """
-    Load data from CSV, JSON, or Excel files
+    Load data from CSV, JSON (array, document or JSON Lines), or Excel files
+    Uses the columnar sidecar written at upload time when it is up to date
+    sheet_name picks an Excel sheet (default: the first one, which the sidecar holds)
     Returns pandas DataFrame
     """
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"File not found: {file_path}")
     
+    if use_sidecar and sheet_name is None:
+        with stage('load', 'sidecar') as record:
+            data = read_sidecar(file_path)
+            if data is not None:
+                record.frame(data)
+        if data is not None:
+            return data
+    
     try:
-        file_extension = os.path.splitext(file_path)[1].lower()
+        # For a compressed upload, the format of the data inside it
+        file_extension, _ = data_format(file_path)
         
         if file_extension == '.csv':
-            # Try different encodings for CSV files
-            try:
-                data = pd.read_csv(file_path, encoding='utf-8')
-            except UnicodeDecodeError:
-                try:
-                    data = pd.read_csv(file_path, encoding='latin-1')
-                except UnicodeDecodeError:
-                    data = pd.read_csv(file_path, encoding='cp1252')
-                    
-        elif file_extension == '.json':
-            # Enhanced JSON loading with multiple fallback methods
-            try:
-                # Method 1: Try pandas read_json (works for properly structured JSON)
-                data = pd.read_json(file_path)
-            except (ValueError, UnicodeDecodeError):
-                try:
-                    # Method 2: Load as regular JSON and convert to DataFrame
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        json_data = json.load(f)
+            # Encoding, delimiter and column types are sniffed up front so the file is parsed once
+            data = read_csv_lean(file_path)
                     
-                    # Handle different JSON structures
-                    if isinstance(json_data, list):
-                        data = pd.DataFrame(json_data)
-                    elif isinstance(json_data, dict):
-                        # If it's a dict, try to convert to DataFrame
-                        if all(isinstance(v, list) for v in json_data.values()):
-                            # Dict of lists format
-                            data = pd.DataFrame(json_data)
-                        else:
-                            # Single record dict, convert to single-row DataFrame
-                            data = pd.DataFrame([json_data])
-                    else:
-                        raise ValueError("JSON structure not supported for analysis")
-                        
-                except json.JSONDecodeError as jde:
-                    raise ValueError(f"Invalid JSON format: {str(jde)}")
-                except UnicodeDecodeError:
-                    # Try different encoding
-                    try:
-                        with open(file_path, 'r', encoding='latin-1') as f:
-                            json_data = json.load(f)
-                        data = pd.DataFrame(json_data if isinstance(json_data, list) else [json_data])
-                    except:
-                        raise ValueError("Unable to read JSON file with any encoding")
+        elif file_extension == '.json' or file_extension in JSON_LINES_EXTENSIONS:
+            layout = 'lines' if file_extension in JSON_LINES_EXTENSIONS else json_layout(file_path)
+            if layout == 'document':
+                data = load_json_document(file_path)
+            else:
+                # Records are parsed as the file is read and nested fields flattened batch by batch
+                with stage('load', f'json_{layout}') as record:
+                    data = record.frame(read_json_records(file_path, lines=layout == 'lines'))
                         
         elif file_extension in ['.xlsx', '.xls']:
-            # Enhanced Excel loading with comprehensive error handling
-            print(f"Attempting to load Excel file: {file_path}")
-            data = None
-            last_error = None
+            # One streaming pass over the requested sheet, engine chosen from the file's magic bytes
+            try:
+                with stage('load', 'excel') as record:
+                    data = record.frame(read_excel_sheet(file_path, sheet_name))
+            except ValueError:
+                raise
+            except Exception as e:
+                if file_extension == '.xls':
+                    raise ValueError(f"Unable to read .xls file. This appears to be an older Excel format that requires conversion. Please save as .xlsx or .csv format. Last error: {str(e)}")
+                raise ValueError(f"Unable to read .xlsx file: {str(e)}. Please ensure the file is not corrupted.")
             
-            # Determine best engine based on file extension
-            if file_extension == '.xls':
-                # For .xls files, try xlrd first, then fallbacks
-                engines_to_try = ['xlrd', 'openpyxl', None]
-            else:
-                # For .xlsx files, try openpyxl first, then fallbacks  
-                engines_to_try = ['openpyxl', None]
+            # Check if data has proper structure
+            if data.empty:
+                raise ValueError("Excel file appears to be empty")
             
-            for engine in engines_to_try:
-                try:
-                    if engine:
-                        print(f"Trying {engine} engine...")
-                        data = pd.read_excel(file_path, engine=engine)
-                        print(f"Successfully loaded with {engine}: {data.shape}")
-                    else:
-                        print("Trying default pandas Excel reader...")
-                        data = pd.read_excel(file_path)
-                        print(f"Successfully loaded with default reader: {data.shape}")
-                    break  # Success, exit the loop
-                    
-                except Exception as e:
-                    last_error = e
-                    engine_name = engine if engine else 'default'
-                    print(f"{engine_name} failed: {str(e)}")
-                    continue
-            
-            # If all engines failed
-            if data is None:
-                # Final attempt: Try reading with explicit sheet name
-                try:
-                    print("Final attempt: Trying to read first sheet explicitly...")
-                    # Try different engines with explicit sheet name
-                    for engine in engines_to_try:
-                        try:
-                            if engine:
-                                data = pd.read_excel(file_path, engine=engine, sheet_name=0)
-                            else:
-                                data = pd.read_excel(file_path, sheet_name=0)
-                            print(f"Successfully loaded first sheet with {engine or 'default'}: {data.shape}")
-                            break
-                        except Exception as e:
-                            continue
-                            
-                    if data is None:
-                        # All attempts failed
-                        error_msg = f"Unable to read Excel file. Last error: {str(last_error)}"
-                        if file_extension == '.xls':
-                            error_msg = f"Unable to read .xls file. This appears to be an older Excel format. Please save as .xlsx or .csv format. Last error: {str(last_error)}"
-                        raise ValueError(error_msg)
-                        
-                except Exception as final_error:
-                    if file_extension == '.xls':
-                        raise ValueError(f"Unable to read .xls file. This appears to be an older Excel format that requires conversion. Please save as .xlsx or .csv format. Last error: {str(final_error)}")
-                    else:
-                        raise ValueError(f"Unable to read .xlsx file: {str(final_error)}. Please ensure the file is not corrupted.")
-            
-            # Final validation for Excel data
-            if data is not None:
-                print(f"Excel file loaded successfully: {data.shape}")
-                # Check if data has proper structure
-                if data.empty:
-                    raise ValueError("Excel file appears to be empty")
-                    
-                # Handle potential encoding issues in column names
-                try:
-                    data.columns = [str(col).strip() for col in data.columns]
-                    print(f"Column names: {list(data.columns)}")
-                except Exception as col_error:
-                    print(f"Warning: Column name processing issue: {str(col_error)}")
+            # Handle potential encoding issues in column names
+            data.columns = [str(col).strip() for col in data.columns]
                     
         else:
             raise ValueError(f"Unsupported file format '{file_extension}'. Please upload a CSV, JSON, or Excel file.")
@@ -169,63 +107,142 @@ def load_data(file_path):
         else:
             raise Exception(f"Error loading file '{os.path.basename(file_path)}': {str(e)}")
 
-def analyze_data(data):
+def load_json_document(file_path):
+    """Load a .json file holding one document (an object of columns or a single record)"""
+    # Enhanced JSON loading with multiple fallback methods
+    try:
+        # Method 1: Try pandas read_json (works for properly structured JSON)
+        with stage('load', 'json_read_json') as record, open_data(file_path) as f:
+            data = record.frame(pd.read_json(f))
+    except DecompressionLimitError:
+        raise
+    except (ValueError, UnicodeDecodeError):
+        try:
+            # Method 2: Load as regular JSON and convert to DataFrame
+            with stage('load', 'json_load') as record:
+                with open_text(file_path, 'utf-8') as f:
+                    json_data = json.load(f)
+
+                # Handle different JSON structures
+                if isinstance(json_data, list):
+                    data = pd.DataFrame(json_data)
+                elif isinstance(json_data, dict):
+                    # If it's a dict, try to convert to DataFrame
+                    if all(isinstance(v, list) for v in json_data.values()):
+                        # Dict of lists format
+                        data = pd.DataFrame(json_data)
+                    else:
+                        # Single record dict, convert to single-row DataFrame with nested fields flattened
+                        data = records_to_frame([json_data])
+                else:
+                    raise ValueError("JSON structure not supported for analysis")
+                record.frame(data)
+
+        except json.JSONDecodeError as jde:
+            raise ValueError(f"Invalid JSON format: {str(jde)}")
+        except UnicodeDecodeError:
+            # Try different encoding
+            try:
+                with stage('load', 'json_latin1') as record:
+                    with open_text(file_path, 'latin-1') as f:
+                        json_data = json.load(f)
+                    data = record.frame(pd.DataFrame(json_data if isinstance(json_data, list) else [json_data]))
+            except DecompressionLimitError:
+                raise
+            except:
+                raise ValueError("Unable to read JSON file with any encoding")
+
+    return data
+
+def analyze_sample(sample, population_size, progress=None, confidence=0.95):
+    """
+    Analyze a uniform sample drawn from population_size rows
+    Counts are scaled up to full-data estimates and an 'approximation' entry
+    reports confidence intervals for means, quartiles and missing-value rates
+    """
+    if population_size <= len(sample):
+        return analyze_data(sample, progress=progress)
+    profile = DatasetProfile(sample)
+    analysis = analyze_data(sample, progress=progress, profile=profile, sampled=True)
+    report = approximation_report(sample, population_size, profile, confidence)
+    analysis = scale_to_population(analysis, report)
+    analysis['approximation'] = report
+    return analysis
+
+def analyze_data(data, progress=None, sample_size=None, workers=1, profile=None, sampled=False):
     """
     Perform comprehensive analysis on the data
+    progress, if given, is called with the name of each stage as it starts
+    sample_size enables fast mode: larger frames are analyzed on a random sample
+    of that many rows (see analyze_sample)
+    workers sets how many processes large frames are profiled with
+    profile reuses a DatasetProfile already built for data; sampled marks data
+    as a sample, so insights leave out duplicate counts that do not scale
     Returns analysis results as dictionary
     """
+    if sample_size is not None and len(data) > sample_size:
+        return analyze_sample(sample_rows(data, sample_size), len(data), progress=progress)
+    
     try:
+        if progress:
+            progress('stats')
+        
+        # Shared column profile, so each statistic is computed only once
+        if profile is None:
+            profile = DatasetProfile(data, workers=workers)
+        
         # Basic information
         shape = data.shape
         columns = list(data.columns)
         dtypes = data.dtypes.astype(str).to_dict()
-        missing_values = data.isnull().sum().to_dict()
-        total_missing = sum(missing_values.values())
+        missing_values = profile.null_counts.to_dict()
+        total_missing = profile.total_missing
         
         # Identify column types
-        numeric_columns = list(data.select_dtypes(include=['number']).columns)
-        categorical_columns = list(data.select_dtypes(include=['object', 'category']).columns)
-        datetime_columns = list(data.select_dtypes(include=['datetime']).columns)
+        numeric_columns = profile.numeric_columns
+        categorical_columns = profile.categorical_columns
+        datetime_columns = profile.datetime_columns
         
-        # Basic statistics for numeric columns
-        basic_stats = {}
-        if len(numeric_columns) > 0:
-            stats_df = data[numeric_columns].describe()
-            for col in numeric_columns:
-                basic_stats[col] = {
-                    'count': float(stats_df.loc['count', col]),
-                    'mean': float(stats_df.loc['mean', col]),
-                    'std': float(stats_df.loc['std', col]),
-                    'min': float(stats_df.loc['min', col]),
-                    '25%': float(stats_df.loc['25%', col]),
-                    '50%': float(stats_df.loc['50%', col]),
-                    '75%': float(stats_df.loc['75%', col]),
-                    'max': float(stats_df.loc['max', col])
-                }
+        with stage('stats') as record:
+            record.frame(data)
+            # Basic statistics for numeric columns
+            basic_stats = {}
+            if len(numeric_columns) > 0:
+                stats_df = profile.numeric_stats
+                for col in numeric_columns:
+                    basic_stats[col] = {
+                        'count': float(stats_df.loc['count', col]),
+                        'mean': float(stats_df.loc['mean', col]),
+                        'std': float(stats_df.loc['std', col]),
+                        'min': float(stats_df.loc['min', col]),
+                        '25%': float(stats_df.loc['25%', col]),
+                        '50%': float(stats_df.loc['50%', col]),
+                        '75%': float(stats_df.loc['75%', col]),
+                        'max': float(stats_df.loc['max', col])
+                    }
         
-        # Categorical statistics
-        categorical_stats = {}
-        for col in categorical_columns:
-            if col in data.columns:
-                col_data = data[col].dropna()  # Remove NaN values for accurate counting
-                if len(col_data) > 0:
-                    unique_count = col_data.nunique()
-                    mode_values = col_data.mode()
-                    most_frequent = str(mode_values.iloc[0]) if len(mode_values) > 0 else 'N/A'
-                    value_counts = col_data.value_counts()
-                    frequency = int(value_counts.iloc[0]) if len(value_counts) > 0 else 0
+            # Categorical statistics
+            categorical_stats = {}
+            profile.count_values(categorical_columns)
+            for col in categorical_columns:
+                if col in data.columns:
+                    value_counts = profile.value_counts(col)  # Non-null values only
+                    if len(value_counts) > 0:
+                        unique_count = len(value_counts)
+                        most_frequent = str(profile.mode(col))
+                        frequency = int(value_counts.iloc[0])
                     
-                    categorical_stats[col] = {
-                        'unique_count': int(unique_count),
-                        'most_frequent': most_frequent,
-                        'frequency': frequency
-                    }
-                else:
-                    categorical_stats[col] = {
-                        'unique_count': 0,
-                        'most_frequent': 'N/A',
-                        'frequency': 0
-                    }
+                        categorical_stats[col] = {
+                            'unique_count': int(unique_count),
+                            'most_frequent': most_frequent,
+                            'frequency': frequency
+                        }
+                    else:
+                        categorical_stats[col] = {
+                            'unique_count': 0,
+                            'most_frequent': 'N/A',
+                            'frequency': 0
+                        }
         
         # Data preview (first 5 rows)
         head_data = data.head().to_dict('records')
@@ -234,32 +251,40 @@ def analyze_data(data):
         data_quality = {
             'completeness': ((shape[0] * shape[1] - total_missing) / (shape[0] * shape[1])) * 100 if shape[0] * shape[1] > 0 else 0,
             'missing_percentage': (total_missing / (shape[0] * shape[1])) * 100 if shape[0] * shape[1] > 0 else 0,
-            'duplicate_rows': int(data.duplicated().sum()),
-            'memory_usage': float(data.memory_usage(deep=True).sum() / 1024**2)  # MB
+            'duplicate_rows': profile.duplicates['duplicate_rows'],
+            'duplicate_groups': profile.duplicates['groups'],
+            'duplicates_approximate': profile.duplicates['approximate'],
+            'memory_usage': float(memory_footprint(data) / 1024**2),  # MB
+            # Saved by category and downcast numeric dtypes (see sniffing.read_csv_lean)
+            'memory_saved': float(memory_saved(data) / 1024**2)  # MB
         }
         
         # Column types breakdown
         dtype_counts = data.dtypes.value_counts().to_dict()
         dtype_counts = {str(k): int(v) for k, v in dtype_counts.items()}
         
-        # Generate visualizations
-        visualizations = generate_visualizations(data, numeric_columns, categorical_columns)
+        # List the available visualizations; figures are built on demand by build_visualization
+        if progress:
+            progress('visualizations')
+        visualizations = visualization_manifest(data, numeric_columns, categorical_columns, profile)
         
-        # Correlation analysis for numeric data
+        # Correlation analysis for numeric data: the strongest pairs plus a reduced
+        # matrix of the most correlated columns, never the full N x N matrix
         correlations = {}
+        top_correlations = []
         if len(numeric_columns) > 1:
-            corr_matrix = data[numeric_columns].corr()
-            correlations = corr_matrix.to_dict()
-            # Convert numpy values to float for JSON serialization
-            for key in correlations:
-                for subkey in correlations[key]:
-                    if pd.notna(correlations[key][subkey]):
-                        correlations[key][subkey] = float(correlations[key][subkey])
-                    else:
-                        correlations[key][subkey] = None
+            with stage('correlations') as record:
+                record.rows, record.columns = shape[0], len(numeric_columns)
+                summary = profile.correlations()
+                correlations = matrix_to_dict(summary['matrix'])
+                top_correlations = summary['pairs']
         
         # Advanced insights
-        insights = generate_insights(data, numeric_columns)
+        if progress:
+            progress('insights')
+        with stage('insights') as record:
+            record.frame(data)
+            insights = generate_insights(data, numeric_columns, profile, sampled=sampled)
         
         analysis = {
             'shape': shape,
@@ -273,11 +298,14 @@ def analyze_data(data):
             'head': head_data,
             'data_quality': data_quality,
             'numeric_columns': list(numeric_columns),
-            'categorical_columns': list(data.select_dtypes(include=['object', 'category']).columns),
-            'datetime_columns': list(data.select_dtypes(include=['datetime64']).columns),
+            'categorical_columns': list(categorical_columns),
+            'datetime_columns': list(datetime_columns),
             'visualizations': visualizations,
             'correlations': correlations,
+            'top_correlations': top_correlations,
             'insights': insights,
+            # Sections that could not be computed, with the reason (see streaming.UNAVAILABLE)
+            'unavailable': {},
             'analysis_timestamp': datetime.now().isoformat()
         }
         
@@ -286,137 +314,252 @@ def analyze_data(data):
     except Exception as e:
         raise Exception(f"Error analyzing data: {str(e)}")
 
-def generate_visualizations(data, numeric_columns, categorical_columns):
-    """Generate Plotly visualizations for the data"""
-    visualizations = {}
+def visualization_manifest(data, numeric_columns, categorical_columns, profile=None):
+    """
+    List the charts available for the data without building them
+    Returns an ordered dict of chart id -> {'title', 'column'}
+    """
+    if profile is None:
+        profile = DatasetProfile(data)
+    manifest = {}
     
-    try:
-        # 1. Data types distribution pie chart
-        dtype_counts = data.dtypes.value_counts()
-        if len(dtype_counts) > 0:
-            fig_dtypes = px.pie(
+    # 1. Data types distribution pie chart
+    if len(data.columns) > 0:
+        manifest['data_types_pie'] = {'title': "Data Types Distribution", 'column': None}
+    
+    # 2. Missing values bar chart
+    if (profile.null_counts > 0).any():
+        manifest['missing_values_bar'] = {'title': "Missing Values by Column", 'column': None}
+    
+    # 3. Histograms for the first 4 numeric columns
+    for i, col in enumerate(list(numeric_columns)[:4]):
+        if profile.numeric_stats.at['count', col] > 0:
+            manifest[f'histogram_{i+1}'] = {'title': f"Distribution of {col}", 'column': col}
+    
+    # 4. Correlation heatmap for numeric data
+    if len(numeric_columns) > 1:
+        manifest['correlation_heatmap'] = {'title': "Correlation Matrix", 'column': None}
+    
+    # 5. Box plots for the first 3 numeric columns (outlier detection)
+    for i, col in enumerate(list(numeric_columns)[:3]):
+        if profile.numeric_stats.at['count', col] > 0:
+            manifest[f'boxplot_{i+1}'] = {'title': f"Box Plot - {col} (Outlier Detection)", 'column': col}
+    
+    # 6. Top categories for the first 2 categorical columns
+    for i, col in enumerate(list(categorical_columns)[:2]):
+        if len(profile.value_counts(col)) > 0:
+            manifest[f'categorical_{i+1}'] = {'title': f"Top Categories in {col}", 'column': col}
+    
+    return manifest
+
+def build_visualization(data, chart_id, profile=None):
+    """Build one chart listed in the visualization manifest and return the Plotly figure"""
+    if profile is None:
+        profile = DatasetProfile(data)
+    manifest = visualization_manifest(data, profile.numeric_columns, profile.categorical_columns, profile)
+    if chart_id not in manifest:
+        raise ValueError(f"Visualization '{chart_id}' is not available for this dataset")
+    title = manifest[chart_id]['title']
+    col = manifest[chart_id]['column']
+    # Plotly is imported by the first chart rather than when a worker starts
+    import plotly.express as px
+    
+    with stage('visualization', chart_id) as record:
+        record.frame(data)
+        if chart_id == 'data_types_pie':
+            dtype_counts = data.dtypes.value_counts()
+            fig = px.pie(
                 values=dtype_counts.values,
                 names=[str(x) for x in dtype_counts.index],
-                title="Data Types Distribution"
+                title=title
             )
-            fig_dtypes.update_layout(
+            fig.update_layout(
                 font=dict(size=14),
                 showlegend=True,
                 height=400
             )
-            visualizations['data_types_pie'] = json.loads(plotly.utils.PlotlyJSONEncoder().encode(fig_dtypes))
-        
-        # 2. Missing values bar chart
-        missing_data = data.isnull().sum()
-        missing_data = missing_data[missing_data > 0].sort_values(ascending=False)
-        
-        if len(missing_data) > 0:
-            fig_missing = px.bar(
+    
+        elif chart_id == 'missing_values_bar':
+            missing_data = profile.null_counts
+            missing_data = missing_data[missing_data > 0].sort_values(ascending=False)
+            fig = px.bar(
                 x=missing_data.index,
                 y=missing_data.values,
-                title="Missing Values by Column",
+                title=title,
                 labels={'x': 'Columns', 'y': 'Missing Count'}
             )
-            fig_missing.update_layout(
+            fig.update_layout(
                 xaxis_tickangle=-45,
                 height=400,
                 font=dict(size=12)
             )
-            visualizations['missing_values_bar'] = json.loads(plotly.utils.PlotlyJSONEncoder().encode(fig_missing))
-        
-        # 3. Numeric columns distribution histograms
-        if len(numeric_columns) > 0:
-            # Select first 4 numeric columns for histograms
-            cols_to_plot = list(numeric_columns)[:4]
-            
-            for i, col in enumerate(cols_to_plot):
-                clean_data = data[col].dropna()
-                if len(clean_data) > 0:
-                    fig_hist = px.histogram(
-                        x=clean_data, 
-                        title=f"Distribution of {col}",
-                        nbins=min(30, len(clean_data.unique()))
-                    )
-                    fig_hist.update_layout(
-                        height=350,
-                        font=dict(size=12),
-                        xaxis_title=col,
-                        yaxis_title="Frequency"
-                    )
-                    visualizations[f'histogram_{i+1}'] = json.loads(plotly.utils.PlotlyJSONEncoder().encode(fig_hist))
-        
-        # 4. Correlation heatmap for numeric data
-        if len(numeric_columns) > 1:
-            corr_matrix = data[numeric_columns].corr()
-            
-            fig_corr = px.imshow(
-                corr_matrix,
-                title="Correlation Matrix",
+    
+        elif chart_id.startswith('histogram_'):
+            clean_data = data[col].dropna()
+            fig = histogram_figure(
+                clean_data,
+                title=title,
+                nbins=min(30, clean_data.nunique())
+            )
+            fig.update_layout(
+                height=350,
+                font=dict(size=12),
+                xaxis_title=col,
+                yaxis_title="Frequency"
+            )
+    
+        elif chart_id == 'correlation_heatmap':
+            summary = profile.correlations()
+            matrix = summary['matrix']
+            if summary['columns'] > len(matrix):
+                title = f"{title} ({len(matrix)} most correlated of {summary['columns']} columns)"
+            fig = px.imshow(
+                matrix,
+                title=title,
                 color_continuous_scale="RdBu",
                 aspect="auto",
-                text_auto=True
+                zmin=-1,
+                zmax=1,
+                # Cell labels only while they stay readable
+                text_auto=len(matrix) <= HEATMAP_LABEL_COLUMNS
             )
-            fig_corr.update_layout(
+            fig.update_layout(
                 height=500,
                 font=dict(size=12)
             )
-            visualizations['correlation_heatmap'] = json.loads(plotly.utils.PlotlyJSONEncoder().encode(fig_corr))
-        
-        # 5. Box plots for numeric columns (outlier detection)
-        if len(numeric_columns) > 0:
-            cols_to_plot = list(numeric_columns)[:3]  # First 3 numeric columns
-            
-            for i, col in enumerate(cols_to_plot):
-                clean_data = data[col].dropna()
-                if len(clean_data) > 0:
-                    fig_box = px.box(
-                        y=clean_data, 
-                        title=f"Box Plot - {col} (Outlier Detection)"
-                    )
-                    fig_box.update_layout(
-                        height=400,
-                        font=dict(size=12),
-                        yaxis_title=col
-                    )
-                    visualizations[f'boxplot_{i+1}'] = json.loads(plotly.utils.PlotlyJSONEncoder().encode(fig_box))
-        
-        # 6. Categorical data visualization
-        if len(categorical_columns) > 0:
-            for i, col in enumerate(categorical_columns[:2]):  # First 2 categorical columns
-                value_counts = data[col].value_counts().head(10)  # Top 10 categories
-                if len(value_counts) > 0:
-                    fig_cat = px.bar(
-                        x=value_counts.index,
-                        y=value_counts.values,
-                        title=f"Top Categories in {col}"
-                    )
-                    fig_cat.update_layout(
-                        height=400,
-                        font=dict(size=12),
-                        xaxis_title=col,
-                        yaxis_title="Count",
-                        xaxis_tickangle=-45
-                    )
-                    visualizations[f'categorical_{i+1}'] = json.loads(plotly.utils.PlotlyJSONEncoder().encode(fig_cat))
+    
+        elif chart_id.startswith('boxplot_'):
+            fig = box_figure(
+                data[col].dropna(),
+                profile.numeric_stats[col],
+                title=title
+            )
+            fig.update_layout(
+                height=400,
+                font=dict(size=12),
+                yaxis_title=col
+            )
+    
+        else:
+            value_counts = profile.value_counts(col).head(10)  # Top 10 categories
+            fig = px.bar(
+                x=value_counts.index,
+                y=value_counts.values,
+                title=title
+            )
+            fig.update_layout(
+                height=400,
+                font=dict(size=12),
+                xaxis_title=col,
+                yaxis_title="Count",
+                xaxis_tickangle=-45
+            )
+    
+    return fig
+
+def generate_visualizations(data, numeric_columns, categorical_columns, profile=None):
+    """
+    Generate every Plotly visualization for the data up front (benchmarks/run.py times it)
+    The app builds charts one at a time with build_visualization as /viz requests them;
+    each chart here is Plotly JSON text as /viz sends it, so the benchmark measures the
+    same work and payload
+    """
+    visualizations = {}
+    if profile is None:
+        profile = DatasetProfile(data)
+    
+    try:
+        for chart_id in visualization_manifest(data, numeric_columns, categorical_columns, profile):
+            fig = build_visualization(data, chart_id, profile)
+            visualizations[chart_id] = fig.to_json()
         
     except Exception as e:
-        print(f"Error generating visualizations: {str(e)}")
+        log_event(logger, 'visualizations_failed', logging.WARNING, error=str(e))
         visualizations['error'] = str(e)
     
     return visualizations
 
-def generate_insights(data, numeric_columns):
-    """Generate data insights and recommendations"""
+def histogram_figure(values, title, nbins):
+    """
+    Build a histogram from bin counts computed with NumPy
+    Only the bin edges and counts are sent to the browser, never the raw values
+    """
+    import plotly.express as px
+    values = values.to_numpy(dtype=float)
+    values = values[np.isfinite(values)]
+    counts, edges = np.histogram(values, bins=max(int(nbins), 1))
+    
+    fig = px.bar(
+        x=(edges[:-1] + edges[1:]) / 2,
+        y=counts,
+        title=title
+    )
+    fig.update_traces(
+        width=np.diff(edges),
+        customdata=np.column_stack([edges[:-1], edges[1:]]),
+        hovertemplate="x=%{customdata[0]:.4g} - %{customdata[1]:.4g}<br>count=%{y}<extra></extra>"
+    )
+    fig.update_layout(bargap=0)
+    return fig
+
+def box_figure(values, stats, title):
+    """
+    Build a box plot from precomputed quartiles and whiskers
+    Whiskers reach the furthest values within 1.5 IQR (Plotly's own rule); at
+    most MAX_BOX_OUTLIERS points beyond them are sampled, always keeping the extremes
+    """
+    values = values.to_numpy(dtype=float)
+    q1, median, q3 = float(stats['25%']), float(stats['50%']), float(stats['75%'])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    lowerfence = float(inside.min()) if len(inside) else q1
+    upperfence = float(inside.max()) if len(inside) else q3
+    
+    outliers = values[(values < lowerfence) | (values > upperfence)]
+    if len(outliers) > MAX_BOX_OUTLIERS:
+        sample = np.random.default_rng(0).choice(outliers, MAX_BOX_OUTLIERS - 2, replace=False)
+        outliers = np.concatenate([[outliers.min(), outliers.max()], sample])
+    
+    import plotly.express as px
+    import plotly.graph_objects as go
+    color = px.colors.qualitative.Plotly[0]
+    fig = go.Figure()
+    fig.add_trace(go.Box(
+        x=[0],
+        q1=[q1],
+        median=[median],
+        q3=[q3],
+        lowerfence=[lowerfence],
+        upperfence=[upperfence],
+        marker_color=color,
+        showlegend=False
+    ))
+    if len(outliers) > 0:
+        fig.add_trace(go.Scatter(
+            x=np.zeros(len(outliers)),
+            y=outliers,
+            mode='markers',
+            marker=dict(color=color, size=5),
+            hovertemplate="%{y}<extra>outlier</extra>",
+            showlegend=False
+        ))
+    fig.update_layout(title=title, xaxis=dict(visible=False))
+    return fig
+
+def generate_insights(data, numeric_columns, profile=None, sampled=False):
+    """Generate data insights and recommendations; a sampled frame gets no duplicate insight"""
     insights = {
         'data_quality': [],
         'patterns': [],
         'recommendations': []
     }
+    if profile is None:
+        profile = DatasetProfile(data)
     
     try:
         # Data quality insights
         total_cells = data.shape[0] * data.shape[1]
-        missing_cells = data.isnull().sum().sum()
+        missing_cells = profile.total_missing
         completeness = ((total_cells - missing_cells) / total_cells) * 100
         
         if completeness >= 95:
@@ -426,27 +569,37 @@ def generate_insights(data, numeric_columns):
         else:
             insights['data_quality'].append("Poor data quality - significant missing values detected")
         
+        duplicates = profile.duplicates
+        # Duplicates found in a sample say little about the full data (see sampling.scale_to_population)
+        if not sampled and duplicates['duplicate_rows'] > 0:
+            largest = duplicates['groups'][0]['count']
+            insights['data_quality'].append(f"{duplicates['duplicate_rows']} duplicate rows found (largest group: {largest} identical rows)")
+        
         # Numeric data insights
         if len(numeric_columns) > 0:
+            stats = profile.numeric_stats[numeric_columns]
+            # Outliers by the IQR rule; the report covers every numeric column in one vectorized pass
+            outlier_counts = profile.outliers['iqr']['counts']
+            
             for col in numeric_columns:
-                col_data = data[col].dropna()
-                if len(col_data) > 0:
-                    # Check for outliers using IQR method
-                    Q1 = col_data.quantile(0.25)
-                    Q3 = col_data.quantile(0.75)
-                    IQR = Q3 - Q1
-                    outliers = col_data[(col_data < Q1 - 1.5 * IQR) | (col_data > Q3 + 1.5 * IQR)]
-                    
-                    if len(outliers) > 0:
-                        outlier_percentage = (len(outliers) / len(col_data)) * 100
+                count = stats.at['count', col]
+                if count > 0:
+                    if outlier_counts[col] > 0:
+                        outlier_percentage = (outlier_counts[col] / count) * 100
                         insights['patterns'].append(f"{col}: {outlier_percentage:.1f}% outliers detected")
                     
                     # Check for skewness
-                    skewness = col_data.skew()
+                    skewness = stats.at['skew', col]
                     if abs(skewness) > 1:
                         skew_type = "right" if skewness > 0 else "left"
                         insights['patterns'].append(f"{col}: Highly skewed distribution ({skew_type})")
         
+        if len(numeric_columns) > 1:
+            strong = [pair for pair in profile.correlations()['pairs'] if abs(pair['correlation']) >= STRONG_CORRELATION]
+            for pair in strong[:MAX_CORRELATION_INSIGHTS]:
+                direction = "positively" if pair['correlation'] > 0 else "negatively"
+                insights['patterns'].append(f"{pair['column_1']} and {pair['column_2']}: Strongly {direction} correlated (r = {pair['correlation']:.2f})")
+        
         # Recommendations
         if missing_cells > 0:
             insights['recommendations'].append("Consider data cleaning for missing values")
@@ -454,8 +607,7 @@ def generate_insights(data, numeric_columns):
         if len(numeric_columns) > 1:
             insights['recommendations'].append("Explore correlations between numeric variables")
         
-        categorical_cols = data.select_dtypes(include=['object', 'category']).columns
-        if len(categorical_cols) > 0:
+        if len(profile.categorical_columns) > 0:
             insights['recommendations'].append("Consider encoding categorical variables for ML applications")
         
         if data.shape[0] > 10000:
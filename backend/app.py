@@ -1,21 +1,383 @@
 # Flask server  
 
-from flask import Flask, request, jsonify , render_template , url_for, send_file, make_response
+from flask import Flask, request, jsonify , render_template , url_for, make_response, Response, g, stream_with_context
 import os 
-from analysis import load_data, analyze_data
+from cache import ANALYSIS_VERSION, ResultCache, file_digest
+from metrics import stage, configure_metrics, observe_request, render_metrics, record_startup, process_start_time, log_event
+from report import REPORT_FORMATS, buffered, markdown_report, json_report, html_report
+from sampling import DEFAULT_SAMPLE_SIZE
+from compression import COMPRESSIBLE_FORMATS, DecompressionLimitError, configure_decompression, split_compression
+from jobs import JobStore, run_job
+from store import UploadStore
+from serialization import FastJSONProvider, compress_response
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial, lru_cache
+import threading
+import time
 from werkzeug.exceptions import RequestEntityTooLarge
 import json
+import logging
 from datetime import datetime
-import io
 
-UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), 'uploads')  
+# Modules that load pandas or pyarrow (analysis, profiling, browse, sidecar,
+# sniffing, ...) are imported in the functions that use them, so a new worker
+# serves /, /metrics and /jobs without paying for them
+
+# Uploads and everything derived from them (ANALYZER_UPLOAD_FOLDER moves them, e.g. for tests)
+UPLOAD_FOLDER = os.environ.get('ANALYZER_UPLOAD_FOLDER') or os.path.join(os.path.dirname(__file__), 'uploads')
+CACHE_FOLDER = os.path.join(UPLOAD_FOLDER, '.cache')
+JOBS_DB = os.path.join(UPLOAD_FOLDER, '.jobs.sqlite3')
+# Uploaded files by content hash, and the table mapping upload names to them
+STORE_FOLDER = os.path.join(UPLOAD_FOLDER, '.store')
+STORE_DB = os.path.join(UPLOAD_FOLDER, '.store.sqlite3')
+# Per-process metric snapshots, merged by /metrics
+METRICS_FOLDER = os.path.join(UPLOAD_FOLDER, '.metrics')
+
+logger = logging.getLogger('data_analyzer.app')
 
 app = Flask(__name__,static_folder='../static', static_url_path='/static') 
+# jsonify encodes with orjson (NumPy arrays and scalars natively) when it is installed
+app.json = FastJSONProvider(app)
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 # Set maximum file size to 50MB
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024
+# Compressed uploads (.gz, .bz2, .xz, single-file .zip) may expand to at most this
+# many bytes, and are rejected as decompression bombs past this expansion ratio
+app.config['MAX_DECOMPRESSED_SIZE'] = 50 * 1024 * 1024
+app.config['MAX_COMPRESSION_RATIO'] = 100
+# Disk space for uploads and everything derived from them (sidecars, cached results,
+# sort indexes); past it the least recently used uploads are deleted
+app.config['UPLOAD_QUOTA'] = 2 * 1024 * 1024 * 1024
+# Number of analysis results kept in memory (all results are also kept on disk)
+app.config['RESULT_CACHE_SIZE'] = 32
+# CSV files larger than this are profiled in chunks with bounded memory instead of
+# being loaded whole (streamed results have no visualizations or correlations);
+# derived from the upload limit so it always stays below it
+app.config['STREAMING_PROFILE_THRESHOLD'] = app.config['MAX_CONTENT_LENGTH'] // 2
+# Rows profiled by the opt-in fast (sampled) analysis mode
+app.config['FAST_SAMPLE_SIZE'] = DEFAULT_SAMPLE_SIZE
+# Worker processes that run /analyze jobs in the background
+app.config['ANALYSIS_WORKERS'] = max(1, min(4, (os.cpu_count() or 2) // 2))
+# Processes each analysis may use to profile the columns of a large dataset;
+# small datasets are always profiled serially (1 disables the parallel path)
+app.config['PROFILE_WORKERS'] = max(1, (os.cpu_count() or 1) // app.config['ANALYSIS_WORKERS'])
+# Upper bound on ?top= for the correlated pairs returned by /correlations
+app.config['MAX_CORRELATION_PAIRS'] = 1000
+# Upper bound on ?limit= for the rows of one /data page
+app.config['DATA_PAGE_MAX_ROWS'] = 1000
+# Run a small analysis at import so it happens once in a pre-fork master
+# (gunicorn --preload) and forked workers start warm (ANALYZER_PREWARM=1)
+app.config['PREWARM'] = os.environ.get('ANALYZER_PREWARM', '0') not in ('', '0', 'false')
+
+upload_store = UploadStore(STORE_FOLDER, STORE_DB, quota=app.config['UPLOAD_QUOTA'])
+result_cache = ResultCache(CACHE_FOLDER, max_items=app.config['RESULT_CACHE_SIZE'], version=ANALYSIS_VERSION,
+                           on_write=upload_store.record)
+# Recently loaded datasets, so the chart requests of one results page share a single load
+dataset_cache = ResultCache(CACHE_FOLDER, max_items=2, version=ANALYSIS_VERSION, persist=False, name='dataset')
+# Row browsers of recently viewed datasets, each holding its memory-mapped table and cached sort orders
+browse_cache = ResultCache(CACHE_FOLDER, max_items=4, version=ANALYSIS_VERSION, persist=False, name='browse')
+job_store = JobStore(JOBS_DB)
+configure_metrics(METRICS_FOLDER)
+configure_decompression(app.config['MAX_DECOMPRESSED_SIZE'], app.config['MAX_COMPRESSION_RATIO'])
+record_startup('import', time.time() - process_start_time())
+if app.config['PREWARM']:
+    from warmup import warm_up
+    warm_up()
+
+_executor = None
+_executor_lock = threading.Lock()
+# Whether this process has served a request yet (per process, so forked workers measure their own)
+_first_request_done = False
+
+
+def get_executor():
+    """Return the analysis worker pool, starting it on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=app.config['ANALYSIS_WORKERS'])
+        return _executor
+
+
+def is_excel(filename):
+    return os.path.splitext(filename)[1].lower() in ('.xlsx', '.xls')
+
+
+@lru_cache(maxsize=256)
+def workbook_sheets(filepath):
+    """Sheet names of a stored workbook; stored files are named by content, so they never change"""
+    from excel import list_sheets
+    return list_sheets(filepath)
+
+
+def requested_sheet(filepath, sheet):
+    """Normalize a requested sheet: None for the first sheet and for files that are not workbooks
+
+    Every route calls this before building cache keys or loading, so naming the
+    first sheet shares the default sheet's cache entries and sidecar.
+    """
+    if not sheet or not is_excel(filepath):
+        return None
+    sheets = workbook_sheets(filepath)
+    return None if sheets and sheet == sheets[0] else sheet
+
+
+def sheet_key(sheet):
+    """Cache key parts for an Excel sheet; the default (first) sheet adds none"""
+    return () if sheet is None else ('sheet', sheet)
+
+
+def streams_profile(filepath):
+    """Whether a file is profiled in chunks instead of being loaded whole (large uncompressed CSVs)"""
+    # Compressed CSVs are always loaded whole; MAX_DECOMPRESSED_SIZE bounds them
+    return (os.path.splitext(filepath)[1].lower() == '.csv'
+            and os.path.getsize(filepath) > app.config['STREAMING_PROFILE_THRESHOLD'])
+
+
+def get_analysis(filepath, progress=None, sheet=None):
+    """
+    Return the analysis results for an uploaded file
+    Results are cached by content hash, so an unchanged file is only analyzed once
+    while a re-upload with different contents gets a fresh analysis
+    sheet selects an Excel sheet other than the first
+    """
+    key = result_cache.key_for(file_digest(filepath), *sheet_key(sheet))
+
+    def compute():
+        if streams_profile(filepath):
+            from incremental import profile_csv_incremental, state_path
+            # Resumes from the saved profile when rows were only appended since the last upload
+            chunk_progress = partial(progress, 'profiling') if progress else None
+            with stage('stats', 'streaming') as record:
+                result = profile_csv_incremental(filepath, ANALYSIS_VERSION, progress=chunk_progress)
+                record.rows, record.columns = result['shape']
+            upload_store.record(state_path(filepath))
+            return result
+        from analysis import load_data, analyze_data
+        if progress:
+            progress('loading')
+        df = load_data(filepath, sheet_name=sheet)
+        return analyze_data(df, progress=progress, workers=app.config['PROFILE_WORKERS'])
+
+    return result_cache.get_or_compute(key, compute)
+
+
+def get_fast_analysis(filepath, sheet=None):
+    """
+    Return an approximate analysis computed on a random sample of rows
+    The sample is taken straight from the memory-mapped sidecar when there is one,
+    so only the sampled rows are ever materialized
+    """
+    sample_size = app.config['FAST_SAMPLE_SIZE']
+    key = result_cache.key_for(file_digest(filepath), 'fast', sample_size, *sheet_key(sheet))
+
+    if streams_profile(filepath):
+        # Sampling would load the whole file; the chunked profile already keeps memory bounded
+        return get_analysis(filepath)
+
+    def compute():
+        from analysis import load_data, analyze_data, analyze_sample
+        from sidecar import read_sidecar_sample
+        # Only the default sheet has a sidecar
+        sampled = read_sidecar_sample(filepath, sample_size) if sheet is None else None
+        if sampled is None:
+            return analyze_data(load_data(filepath, sheet_name=sheet), sample_size=sample_size)
+        sample, total_rows = sampled
+        return analyze_sample(sample, total_rows)
+
+    return result_cache.get_or_compute(key, compute)
+
+
+def get_best_analysis(filepath, sheet=None):
+    """
+    Return the exact analysis if it has been computed, otherwise a finished fast-mode
+    result, otherwise compute the exact analysis now
+    """
+    digest = file_digest(filepath)
+    exact = result_cache.get(result_cache.key_for(digest, *sheet_key(sheet)))
+    if exact is not None:
+        return exact
+    approximate = result_cache.get(result_cache.key_for(digest, 'fast', app.config['FAST_SAMPLE_SIZE'], *sheet_key(sheet)))
+    if approximate is not None:
+        return approximate
+    return get_analysis(filepath, sheet=sheet)
+
+
+def get_dataset(filepath, sheet=None):
+    """Return (DataFrame, DatasetProfile) for an uploaded file, reusing a recent load"""
+    key = dataset_cache.key_for(file_digest(filepath), *sheet_key(sheet))
+
+    def compute():
+        from analysis import load_data
+        from profiling import DatasetProfile
+        df = load_data(filepath, sheet_name=sheet)
+        return df, DatasetProfile(df, workers=app.config['PROFILE_WORKERS'])
+
+    return dataset_cache.get_or_compute(key, compute)
+
+
+def get_visualization_json(filepath, chart_id, sheet=None):
+    """Return one chart as a Plotly JSON string, building and caching it on first request"""
+    if streams_profile(filepath):
+        from streaming import UNAVAILABLE
+        raise ValueError(UNAVAILABLE['visualizations'])
+    key = result_cache.key_for(file_digest(filepath), 'viz', chart_id, *sheet_key(sheet))
+
+    def compute():
+        from analysis import build_visualization
+        df, profile = get_dataset(filepath, sheet)
+        fig = build_visualization(df, chart_id, profile)
+        with stage('serialization', 'visualization') as record:
+            figure_json = fig.to_json()
+            record.output_bytes = len(figure_json)
+        return figure_json
+
+    return result_cache.get_or_compute(key, compute)
+
+
+def get_duplicates(filepath, columns, sheet=None):
+    """Return the duplicate report for a set of key columns, computing it on first request"""
+    key = result_cache.key_for(file_digest(filepath), 'duplicates', *columns, *sheet_key(sheet))
+
+    def compute():
+        from duplicates import duplicate_report
+        df, _ = get_dataset(filepath, sheet)
+        return duplicate_report(df, columns)
 
+    return result_cache.get_or_compute(key, compute)
+
+
+def get_correlations(filepath, method, top, sheet=None):
+    """Return the strongest correlated pairs and reduced matrix for a method, computing them on first request"""
+    if streams_profile(filepath):
+        from streaming import UNAVAILABLE
+        raise ValueError(UNAVAILABLE['correlations'])
+    key = result_cache.key_for(file_digest(filepath), 'correlations', method, str(top), *sheet_key(sheet))
+
+    def compute():
+        from correlation import correlation_summary, matrix_to_dict
+        _, profile = get_dataset(filepath, sheet)
+        summary = correlation_summary(profile.numeric, method=method, top_k=top, workers=app.config['PROFILE_WORKERS'])
+        return {
+            'method': method,
+            'columns': summary['columns'],
+            'pairs': summary['pairs'],
+            'matrix': matrix_to_dict(summary['matrix'])
+        }
+
+    return result_cache.get_or_compute(key, compute)
+
+
+def get_outliers(filepath, method, sheet=None):
+    """Return the per-column outliers of one method with their bounds and row labels, computing them on first request"""
+    key = result_cache.key_for(file_digest(filepath), 'outliers', method, *sheet_key(sheet))
+
+    def compute():
+        from outliers import report_to_dict
+        _, profile = get_dataset(filepath, sheet)
+        return report_to_dict(profile.outliers, method)
+
+    return result_cache.get_or_compute(key, compute)
+
+
+def get_browser(filepath, sheet=None):
+    """Return the TableBrowser serving /data pages of a file, reusing a recent one"""
+    key = browse_cache.key_for(file_digest(filepath), *sheet_key(sheet))
+
+    def compute():
+        from browse import TableBrowser, table_from_frame
+        from sidecar import read_sidecar_table
+        # The default sheet is browsed straight from the memory-mapped sidecar;
+        # other sheets and files without one are converted from a fresh load
+        table = read_sidecar_table(filepath) if sheet is None else None
+        if table is None:
+            df, _ = get_dataset(filepath, sheet)
+            table = table_from_frame(df)
+        return TableBrowser(table, os.path.join(CACHE_FOLDER, 'browse', key), on_write=upload_store.record)
+
+    return browse_cache.get_or_compute(key, compute)
+
+
+def analysis_response(payload, status=200):
+    """jsonify a payload carrying an analysis, recording the serialization stage"""
+    with stage('serialization', 'analysis_json') as record:
+        response = jsonify(payload)
+        record.output_bytes = response.content_length
+    return response, status
+
+
+def stream_report(chunks, report_format):
+    """Encode report chunks as they are produced, recording the serialization stage"""
+    with stage('serialization', f'report_{report_format}') as record:
+        record.output_bytes = 0
+        for chunk in chunks:
+            data = chunk.encode('utf-8')
+            record.output_bytes += len(data)
+            yield data
+
+
+@lru_cache(maxsize=None)
+def plotly_js_url():
+    """
+    CDN address of the plotly.js release bundled with the installed plotly
+    Charts carry numeric arrays as base64 typed arrays, which only plotly.js 2.28
+    and later decode (the unversioned plotly-latest is frozen at 1.58)
+    """
+    from plotly.offline import get_plotlyjs_version
+    return f'https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js'
+
+
+def results_url(filename, sheet=None):
+    return url_for('show_results', filename=filename, sheet=sheet)
+
+
+def pinned_digests():
+    """Digests of stored files in use, which the quota must not evict: open browsers and pending jobs"""
+    # Browsers are only known to the process holding them; jobs to every process
+    return browse_cache.digests() | job_store.active_digests()
+
+
+def start_analysis_job(filename, filepath, sheet=None):
+    """Queue a background analysis of an uploaded file and return the job id"""
+    job_id = job_store.create(filename, sheet, digest=file_digest(filepath))
+
+    def on_done(future):
+        # A crashed worker never gets to record its own failure
+        error = future.exception()
+        if error is not None:
+            job_store.update(job_id, status='failed', error=f'Analysis failed: {str(error)}')
+
+    future = get_executor().submit(run_job, JOBS_DB, job_id, partial(get_analysis, sheet=sheet), filepath)
+    future.add_done_callback(on_done)
+    return job_id
+
+
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_latency(response):
+    global _first_request_done
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        observe_request(endpoint, request.method, response.status_code, time.perf_counter() - started)
+    if not _first_request_done:
+        _first_request_done = True
+        record_startup('first_request', time.time() - process_start_time())
+    return response
+
+# Registered after record_latency so it runs first and compression counts towards the latency
+@app.after_request
+def compress(response):
+    return compress_response(response, request.accept_encodings)
+
+@app.route('/metrics')
+def show_metrics():
+    """Stage, cache and request metrics of the web process and analysis workers (Prometheus text format)"""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/')
 def index():
@@ -33,44 +395,85 @@ def upload_file():
             return jsonify({'error': 'No selected file'}), 400
         
         # Validate file extension
-        allowed_extensions = {'.csv', '.json', '.xlsx', '.xls'}
-        file_extension = os.path.splitext(file.filename)[1].lower()
+        allowed_extensions = {'.csv', '.json', '.jsonl', '.ndjson', '.xlsx', '.xls'}
+        file_extension, compression = split_compression(file.filename)
         
-        if file_extension not in allowed_extensions:
+        # A .zip is checked once saved, since its member decides the format
+        if compression is None and file_extension not in allowed_extensions:
             return jsonify({
                 'error': f'Unsupported file format "{file_extension}". Please upload CSV, JSON, or Excel files only.'
             }), 400
+        if compression not in (None, 'zip') and file_extension not in COMPRESSIBLE_FORMATS:
+            return jsonify({
+                'error': f'Unsupported compressed file "{file.filename}". Compressed uploads must contain CSV, JSON or JSON Lines data.'
+            }), 400
         
         if file:
             filename = file.filename
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            print(f"Saving file to: {filepath}")
             
-            # Ensure upload directory exists
-            os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+            with stage('upload_save') as record:
+                # Stored under the hash of its contents, computed as the upload is written
+                filepath, created = upload_store.save(file.stream, filename)
+                file_size = os.path.getsize(filepath)
+                record.output_bytes = file_size
+            log_event(logger, 'upload_saved', filename=filename, size=file_size,
+                      blob=os.path.basename(filepath), deduplicated=not created)
             
-            file.save(filepath)
+            # Validate that the file can be loaded (basic validation); identical
+            # contents already stored were validated when first uploaded
+            if created:
+                try:
+                    if streams_profile(filepath):
+                        # Too large to load whole: only its first rows are parsed here,
+                        # and it is profiled in chunks (no sidecar) when analyzed
+                        from sniffing import read_csv_prefix
+                        with stage('validation_parse', 'prefix') as record:
+                            test_df = record.frame(read_csv_prefix(filepath))
+                        log_event(logger, 'upload_validated', filename=filename, rows=test_df.shape[0],
+                                  columns=test_df.shape[1], prefix_only=True)
+                    else:
+                        from analysis import load_data
+                        from incremental import extend_frame
+                        from sidecar import write_sidecar, sidecar_path
+                        # A re-upload that only appended rows reuses the earlier file's parsed rows;
+                        # anything else is parsed in full. Either way the cleaned frame becomes the sidecar
+                        earlier = upload_store.resolve(filename)
+                        test_df = None
+                        if earlier is not None and earlier != filepath:
+                            with stage('validation_parse', 'append') as record:
+                                test_df = extend_frame(earlier, filepath)
+                                if test_df is not None:
+                                    record.frame(test_df)
+                        if test_df is None:
+                            with stage('validation_parse') as record:
+                                test_df = record.frame(load_data(filepath, use_sidecar=False))
+                        log_event(logger, 'upload_validated', filename=filename, rows=test_df.shape[0],
+                                  columns=test_df.shape[1])
+                        # The sidecar of a compressed upload is compressed too, keeping its disk use down
+                        write_sidecar(test_df, filepath, compression='uncompressed' if compression is None else 'zstd')
+                        upload_store.record(sidecar_path(filepath))
+                except Exception as validation_error:
+                    log_event(logger, 'upload_rejected', logging.WARNING, filename=filename, error=str(validation_error))
+                    # Remove the invalid file with its sidecar and saved profile
+                    upload_store.discard(filepath)
+                    return jsonify({
+                        'error': f'File validation failed: {str(validation_error)}'
+                    }), 413 if isinstance(validation_error, DecompressionLimitError) else 400
             
-            # Check file size after saving
-            file_size = os.path.getsize(filepath)
-            print(f"File saved with size: {file_size} bytes")
+            previous = upload_store.assign(filename, filepath)
+            if previous is not None and previous != filepath:
+                from incremental import carry_state, state_path
+                # A re-upload that only appended rows resumes from the earlier file's profile
+                carry_state(previous, filepath)
+                upload_store.record(state_path(filepath))
+            upload_store.enforce_quota(keep=filepath, pinned=pinned_digests())
             
-            # Validate that the file can be loaded (basic validation)
-            try:
-                from analysis import load_data
-                print(f"Validating file: {filename} (extension: {file_extension})")
-                test_df = load_data(filepath)
-                print(f"File validation successful: {test_df.shape[0]} rows, {test_df.shape[1]} columns")
-            except Exception as validation_error:
-                print(f"File validation failed for {filename}: {str(validation_error)}")
-                # Remove the invalid file
-                if os.path.exists(filepath):
-                    os.remove(filepath)
-                return jsonify({
-                    'error': f'File validation failed: {str(validation_error)}'
-                }), 400
-            
-            return jsonify({'message': 'File uploaded successfully', 'filename': filename}), 200
+            response = {'message': 'File uploaded successfully', 'filename': filename}
+            if is_excel(filename):
+                from excel import list_sheets
+                # Only the first sheet is loaded now; others are read when selected
+                response['sheets'] = list_sheets(filepath)
+            return jsonify(response), 200
             
     except RequestEntityTooLarge:
         return jsonify({'error': 'File too large. Maximum size is 50MB.'}), 413
@@ -85,22 +488,47 @@ def analyze_file():
             return jsonify({'error': 'No file path provided'}), 400
         
         filename = data['file_path']
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        filepath = upload_store.resolve(filename)
         
         # Check if file exists
-        if not os.path.exists(filepath):
+        if filepath is None:
             return jsonify({'error': f'File "{filename}" not found'}), 404
+        sheet = requested_sheet(filepath, data.get('sheet'))
+        
+        # Fast mode answers from a sample right away and fills in exact results in the background
+        if data.get('mode') == 'fast':
+            analysis_results = get_fast_analysis(filepath, sheet)
+            job_id = start_analysis_job(filename, filepath, sheet)
+            return analysis_response({
+                'message': 'Approximate analysis complete; exact analysis running',
+                'filename': filename,
+                'analysis': analysis_results,
+                'job_id': job_id,
+                'status_url': f'/jobs/{job_id}',
+                'redirect_url': results_url(filename, sheet)
+            })
         
-        # Load and analyze the data
-        df = load_data(filepath)
-        analysis_results = analyze_data(df)
+        # Synchronous mode for API clients that want the result in the response
+        if data.get('wait'):
+            analysis_results = get_analysis(filepath, sheet=sheet)
+            return analysis_response({
+                'message': 'File analyzed successfully',
+                'filename': filename,
+                'analysis': analysis_results,
+                'redirect_url': results_url(filename, sheet)
+            })
+        
+        job_id = start_analysis_job(filename, filepath, sheet)
         
         return jsonify({
-            'message': 'File analyzed successfully',
+            'message': 'Analysis started',
             'filename': filename,
-            'analysis': analysis_results,
-            'redirect_url': f'/results/{filename}'
-        }), 200
+            'job_id': job_id,
+            'status_url': f'/jobs/{job_id}',
+            'events_url': f'/jobs/{job_id}/events',
+            'result_url': f'/jobs/{job_id}/result',
+            'redirect_url': results_url(filename, sheet)
+        }), 202
         
     except FileNotFoundError:
         return jsonify({'error': 'File not found'}), 404
@@ -109,117 +537,252 @@ def analyze_file():
     except Exception as e:
         return jsonify({'error': f'Analysis failed: {str(e)}'}), 500
 
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job), 200
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """Stream job progress as Server-Sent Events until the job finishes"""
+    if job_store.get(job_id) is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    def generate():
+        last_update = None
+        while True:
+            job = job_store.get(job_id)
+            if job['updated_at'] != last_update:
+                last_update = job['updated_at']
+                yield f"data: {json.dumps(job)}\n\n"
+            if job['status'] in ('done', 'failed'):
+                break
+            time.sleep(0.5)
+    
+    return Response(generate(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+@app.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    try:
+        job = job_store.get(job_id)
+        if job is None:
+            return jsonify({'error': 'Job not found'}), 404
+        if job['status'] == 'failed':
+            return jsonify({'error': job['error']}), 500
+        if job['status'] != 'done':
+            return jsonify({'error': 'Analysis still in progress', 'stage': job['stage'], 'progress': job['progress']}), 409
+        
+        filepath = upload_store.resolve(job['filename'])
+        if filepath is None:
+            return jsonify({'error': f'File "{job["filename"]}" not found'}), 404
+        analysis_results = get_analysis(filepath, sheet=job['sheet'])
+        
+        return analysis_response({
+            'message': 'File analyzed successfully',
+            'filename': job['filename'],
+            'analysis': analysis_results,
+            'redirect_url': results_url(job['filename'], job['sheet'])
+        })
+        
+    except FileNotFoundError:
+        return jsonify({'error': 'File not found'}), 404
+    except Exception as e:
+        return jsonify({'error': f'Analysis failed: {str(e)}'}), 500
+
 @app.route('/results/<filename>')
 def show_results(filename):
     try:
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        filepath = upload_store.resolve(filename)
         
         # Check if file exists
-        if not os.path.exists(filepath):
+        if filepath is None:
             return render_template('index.html'), 404
         
-        # Load and analyze the data
-        df = load_data(filepath)
-        analysis_results = analyze_data(df)
+        # Load and analyze the data (a fast-mode result is shown until the exact one is ready)
+        sheets = workbook_sheets(filepath) if is_excel(filepath) else []
+        sheet = requested_sheet(filepath, request.args.get('sheet'))
+        analysis_results = get_best_analysis(filepath, sheet)
         
-        return render_template('results.html', 
-                             filename=filename, 
-                             analysis=analysis_results)
+        with stage('serialization', 'results_page') as record:
+            page = render_template('results.html', 
+                                 filename=filename, 
+                                 analysis=analysis_results,
+                                 sheet=sheet,
+                                 sheets=sheets,
+                                 plotly_js_url=plotly_js_url())
+            record.output_bytes = len(page.encode('utf-8'))
+        return page
         
     except FileNotFoundError:
         return render_template('index.html'), 404
     except ValueError as ve:
-        print(f"Data format error for {filename}: {str(ve)}")
+        log_event(logger, 'results_failed', logging.WARNING, filename=filename, error=str(ve))
         return render_template('index.html'), 400
     except Exception as e:
-        print(f"Error processing {filename}: {str(e)}")
+        log_event(logger, 'results_failed', logging.ERROR, filename=filename, error=str(e))
         return render_template('index.html'), 500
 
+@app.route('/viz/<filename>/<chart_id>')
+def get_visualization(filename, chart_id):
+    try:
+        filepath = upload_store.resolve(filename)
+        
+        if filepath is None:
+            return jsonify({'error': f'File "{filename}" not found'}), 404
+        
+        figure_json = get_visualization_json(filepath, chart_id, requested_sheet(filepath, request.args.get('sheet')))
+        return Response(figure_json, mimetype='application/json')
+        
+    except FileNotFoundError:
+        return jsonify({'error': 'File not found'}), 404
+    except ValueError as ve:
+        return jsonify({'error': str(ve)}), 404
+    except Exception as e:
+        return jsonify({'error': f'Visualization failed: {str(e)}'}), 500
+
+@app.route('/duplicates/<filename>')
+def get_duplicate_rows(filename):
+    """Duplicate rows judged on the comma-separated ?columns= (all columns if omitted)"""
+    try:
+        filepath = upload_store.resolve(filename)
+        
+        if filepath is None:
+            return jsonify({'error': f'File "{filename}" not found'}), 404
+        
+        columns = request.args.get('columns')
+        sheet = requested_sheet(filepath, request.args.get('sheet'))
+        if columns:
+            report = get_duplicates(filepath, [col.strip() for col in columns.split(',')], sheet)
+        else:
+            report = get_dataset(filepath, sheet)[1].duplicates
+        return jsonify(report), 200
+        
+    except FileNotFoundError:
+        return jsonify({'error': 'File not found'}), 404
+    except ValueError as ve:
+        return jsonify({'error': str(ve)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Duplicate detection failed: {str(e)}'}), 500
+
+@app.route('/correlations/<filename>')
+def get_correlated_pairs(filename):
+    """Strongest correlated numeric column pairs (?method=pearson|spearman, ?top=N)"""
+    try:
+        filepath = upload_store.resolve(filename)
+        
+        if filepath is None:
+            return jsonify({'error': f'File "{filename}" not found'}), 404
+        
+        from correlation import CORRELATION_METHODS, TOP_PAIRS
+        method = request.args.get('method', 'pearson')
+        if method not in CORRELATION_METHODS:
+            return jsonify({'error': f"Unsupported correlation method '{method}'. Use one of {', '.join(CORRELATION_METHODS)}"}), 400
+        top = request.args.get('top', TOP_PAIRS, type=int)
+        if not 1 <= top <= app.config['MAX_CORRELATION_PAIRS']:
+            return jsonify({'error': f"top must be between 1 and {app.config['MAX_CORRELATION_PAIRS']}"}), 400
+        
+        return jsonify(get_correlations(filepath, method, top, requested_sheet(filepath, request.args.get('sheet')))), 200
+        
+    except FileNotFoundError:
+        return jsonify({'error': 'File not found'}), 404
+    except ValueError as ve:
+        return jsonify({'error': str(ve)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Correlation analysis failed: {str(e)}'}), 500
+
+@app.route('/outliers/<filename>')
+def get_outlier_rows(filename):
+    """Outlier counts, bounds and row labels per numeric column (?method=iqr|zscore|mad)"""
+    try:
+        filepath = upload_store.resolve(filename)
+        
+        if filepath is None:
+            return jsonify({'error': f'File "{filename}" not found'}), 404
+        
+        from outliers import OUTLIER_METHODS
+        method = request.args.get('method', 'iqr')
+        if method not in OUTLIER_METHODS:
+            return jsonify({'error': f"Unsupported outlier method '{method}'. Use one of {', '.join(OUTLIER_METHODS)}"}), 400
+        
+        return jsonify(get_outliers(filepath, method, requested_sheet(filepath, request.args.get('sheet')))), 200
+        
+    except FileNotFoundError:
+        return jsonify({'error': 'File not found'}), 404
+    except ValueError as ve:
+        return jsonify({'error': str(ve)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Outlier detection failed: {str(e)}'}), 500
+
+@app.route('/data/<filename>')
+def browse_data(filename):
+    """A page of rows (?offset=, ?limit=), optionally sorted (?sort=column&order=asc|desc) and filtered (?filters=[[column, op, value], ...])"""
+    try:
+        filepath = upload_store.resolve(filename)
+        
+        if filepath is None:
+            return jsonify({'error': f'File "{filename}" not found'}), 404
+        
+        from browse import DEFAULT_PAGE_SIZE, parse_filters
+        offset = request.args.get('offset', 0, type=int)
+        limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+        if offset < 0:
+            return jsonify({'error': 'offset must not be negative'}), 400
+        if not 1 <= limit <= app.config['DATA_PAGE_MAX_ROWS']:
+            return jsonify({'error': f"limit must be between 1 and {app.config['DATA_PAGE_MAX_ROWS']}"}), 400
+        order = request.args.get('order', 'asc')
+        if order not in ('asc', 'desc'):
+            return jsonify({'error': "order must be 'asc' or 'desc'"}), 400
+        filters = parse_filters(request.args.get('filters'))
+        
+        browser = get_browser(filepath, requested_sheet(filepath, request.args.get('sheet')))
+        with stage('browse', 'page'):
+            page = browser.page(offset, limit, sort=request.args.get('sort') or None,
+                                descending=order == 'desc', filters=filters)
+        return jsonify(page), 200
+        
+    except FileNotFoundError:
+        return jsonify({'error': 'File not found'}), 404
+    except ValueError as ve:
+        return jsonify({'error': str(ve)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Data browsing failed: {str(e)}'}), 500
+
 @app.route('/download-report/<filename>')
 def download_report(filename):
+    """Stream the report for a file as Markdown (default), JSON or self-contained HTML (?format=md|json|html)"""
     try:
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        filepath = upload_store.resolve(filename)
         
-        # Load and analyze the data
-        df = load_data(filepath)
-        analysis_results = analyze_data(df)
+        if filepath is None:
+            return jsonify({'error': f'File "{filename}" not found'}), 404
         
-        # Create a comprehensive report
-        report = {
-            'file_info': {
-                'filename': filename,
-                'analysis_date': datetime.now().isoformat(),
-                'dataset_shape': analysis_results['shape'],
-                'total_columns': analysis_results['shape'][1],
-                'total_rows': analysis_results['shape'][0]
-            },
-            'data_summary': {
-                'columns': analysis_results['columns'],
-                'data_types': analysis_results['dtypes'],
-                'missing_values': analysis_results['missing_values'],
-                'data_quality': analysis_results['data_quality']
-            },
-            'statistical_summary': analysis_results['basic_stats'],
-            'insights': analysis_results.get('insights', {}),
-            'recommendations': analysis_results.get('insights', {}).get('recommendations', [])
-        }
+        report_format = request.args.get('format', 'md')
+        if report_format not in REPORT_FORMATS:
+            return jsonify({'error': f"Unsupported report format '{report_format}'. Use one of {', '.join(REPORT_FORMATS)}"}), 400
         
-        # Convert to JSON string
-        report_json = json.dumps(report, indent=2, default=str)
-        
-        # Create a file-like object
-        output = io.StringIO()
-        output.write(f"# Data Analysis Report for {filename}\n")
-        output.write(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-        output.write("## Dataset Overview\n")
-        output.write(f"- File: {filename}\n")
-        output.write(f"- Shape: {analysis_results['shape'][0]} rows × {analysis_results['shape'][1]} columns\n")
-        output.write(f"- Missing Values: {analysis_results['total_missing']}\n")
-        output.write(f"- Data Quality: {analysis_results['data_quality']['completeness']:.2f}% complete\n\n")
-        
-        output.write("## Column Information\n")
-        for col in analysis_results['columns']:
-            dtype = analysis_results['dtypes'][col]
-            missing = analysis_results['missing_values'][col]
-            output.write(f"- {col}: {dtype} ({missing} missing values)\n")
-        
-        if analysis_results['basic_stats']:
-            output.write("\n## Statistical Summary\n")
-            for col, stats in analysis_results['basic_stats'].items():
-                output.write(f"\n### {col}\n")
-                for stat_name, stat_value in stats.items():
-                    output.write(f"- {stat_name}: {stat_value:.4f}\n")
-        
-        if analysis_results.get('insights'):
-            insights = analysis_results['insights']
-            if insights.get('data_quality'):
-                output.write("\n## Data Quality Insights\n")
-                for insight in insights['data_quality']:
-                    output.write(f"- {insight}\n")
-            
-            if insights.get('patterns'):
-                output.write("\n## Data Patterns\n")
-                for pattern in insights['patterns']:
-                    output.write(f"- {pattern}\n")
-            
-            if insights.get('recommendations'):
-                output.write("\n## Recommendations\n")
-                for rec in insights['recommendations']:
-                    output.write(f"- {rec}\n")
-        
-        output.write(f"\n\n## Raw Analysis Data (JSON)\n```json\n{report_json}\n```")
-        
-        # Create response
-        output_bytes = io.BytesIO()
-        output_bytes.write(output.getvalue().encode('utf-8'))
-        output_bytes.seek(0)
-        
-        return send_file(
-            output_bytes,
-            mimetype='text/plain',
-            as_attachment=True,
-            download_name=f'analysis_report_{filename}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.txt'
-        )
+        # Reuses the cached analysis; only computed here if it never ran
+        sheet = requested_sheet(filepath, request.args.get('sheet'))
+        analysis_results = get_analysis(filepath, sheet=sheet)
+        
+        if report_format == 'md':
+            pieces = markdown_report(filename, analysis_results)
+        elif report_format == 'json':
+            pieces = json_report(filename, analysis_results)
+        else:
+            # Charts come from the chart cache one at a time as the report is sent
+            charts = ((chart['title'], get_visualization_json(filepath, chart_id, sheet))
+                      for chart_id, chart in analysis_results['visualizations'].items())
+            from plotly.offline import get_plotlyjs
+            pieces = html_report(filename, analysis_results, charts, get_plotlyjs())
+        
+        mimetype, extension = REPORT_FORMATS[report_format]
+        response = Response(stream_with_context(stream_report(buffered(pieces), report_format)),
+                            mimetype=mimetype)
+        download_name = f'analysis_report_{filename}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{extension}'
+        response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+        return response
         
     except FileNotFoundError:
         return jsonify({'error': 'File not found'}), 404
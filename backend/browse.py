@@ -0,0 +1,291 @@
+# Paged, sorted and filtered row access over a columnar copy of a dataset
+
+import hashlib
+import json
+import math
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+DEFAULT_PAGE_SIZE = 100
+
+# Filter operators accepted by /data; null and notnull take no value
+FILTER_OPERATORS = ('eq', 'ne', 'lt', 'le', 'gt', 'ge', 'contains', 'startswith', 'null', 'notnull')
+
+_COMPARISONS = {
+    'eq': pc.equal, 'ne': pc.not_equal, 'lt': pc.less,
+    'le': pc.less_equal, 'gt': pc.greater, 'ge': pc.greater_equal
+}
+
+# Sorted or filtered row selections kept per dataset, least recently used dropped first
+MAX_CACHED_VIEWS = 16
+
+
+def parse_filters(text):
+    """
+    Parse the ?filters= JSON list of [column, operator, value] triples
+    Returns a tuple of (column, operator, value) with value None for null/notnull
+    """
+    if not text:
+        return ()
+    try:
+        items = json.loads(text)
+    except ValueError:
+        raise ValueError("filters must be a JSON list of [column, operator, value] triples")
+    if not isinstance(items, list):
+        raise ValueError("filters must be a JSON list of [column, operator, value] triples")
+
+    filters = []
+    for item in items:
+        if not isinstance(item, list) or len(item) not in (2, 3):
+            raise ValueError(f"Invalid filter {item!r}: expected [column, operator, value]")
+        column, operator = str(item[0]), item[1]
+        if operator not in FILTER_OPERATORS:
+            raise ValueError(f"Unsupported filter operator '{operator}'. Use one of {', '.join(FILTER_OPERATORS)}")
+        value = item[2] if len(item) == 3 else None
+        if value is None and operator not in ('null', 'notnull'):
+            raise ValueError(f"Filter operator '{operator}' needs a value")
+        filters.append((column, operator, None if operator in ('null', 'notnull') else str(value)))
+    return tuple(filters)
+
+
+def table_from_frame(data):
+    """Arrow table of a DataFrame, for datasets without a sidecar; mixed-type columns are kept as text"""
+    try:
+        return pa.Table.from_pandas(data, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        data = data.copy()
+        for col in data.columns:
+            if data[col].dtype == object:
+                data[col] = data[col].map(lambda value: value if value is None or value is np.nan else str(value))
+        return pa.Table.from_pandas(data, preserve_index=False)
+
+
+def _decoded(column):
+    # Dictionary (category) columns are compared and sorted by their values
+    if pa.types.is_dictionary(column.type):
+        return column.cast(column.type.value_type)
+    return column
+
+
+def _invalid_count(column):
+    # Rows ordered after every value by sort_indices: nulls, and NaN in float columns
+    invalid = column.null_count
+    if pa.types.is_floating(column.type):
+        invalid += pc.sum(pc.is_nan(column)).as_py() or 0
+    return invalid
+
+
+def _scalar(column, name, value):
+    """Convert a filter value to the type of the named column"""
+    kind = column.type
+    try:
+        if pa.types.is_integer(kind) or pa.types.is_floating(kind):
+            number = float(value)
+            return int(number) if pa.types.is_integer(kind) and number.is_integer() else number
+        if pa.types.is_boolean(kind):
+            lowered = value.strip().lower()
+            if lowered not in ('true', 'false', '1', '0'):
+                raise ValueError(value)
+            return lowered in ('true', '1')
+        if pa.types.is_timestamp(kind):
+            timestamp = pd.Timestamp(value)
+            if kind.tz is not None and timestamp.tzinfo is None:
+                timestamp = timestamp.tz_localize(kind.tz)
+            return pa.scalar(timestamp, type=kind)
+        if pa.types.is_date(kind):
+            return pa.scalar(pd.Timestamp(value).date(), type=kind)
+    except (ValueError, TypeError, pa.ArrowInvalid):
+        raise ValueError(f"Cannot compare column '{name}' with '{value}'")
+    return value
+
+
+def _json_values(array):
+    # One column of a page as JSON-ready Python values
+    array = _decoded(array)
+    values = array.to_pylist()
+    kind = array.type
+    if pa.types.is_floating(kind):
+        return [None if value is None or not math.isfinite(value) else value for value in values]
+    if pa.types.is_integer(kind) or pa.types.is_boolean(kind) or pa.types.is_string(kind) or pa.types.is_large_string(kind):
+        return values
+    if pa.types.is_temporal(kind):
+        return [None if value is None else value.isoformat() for value in values]
+    if pa.types.is_decimal(kind):
+        return [None if value is None else float(value) for value in values]
+    return [None if value is None else str(value) for value in values]
+
+
+class _View:
+    """
+    Row positions of one sort and filter combination
+    positions None means every row in file order; with reverse, the first
+    valid rows are read backwards so one ascending permutation serves both
+    orders while null and NaN rows stay last
+    """
+
+    def __init__(self, positions, size, valid):
+        self.positions = positions
+        self.size = size
+        self.valid = valid
+
+    def take(self, offset, limit, reverse=False):
+        index = np.arange(min(offset, self.size), min(offset + limit, self.size))
+        if reverse:
+            index = np.where(index < self.valid, self.valid - 1 - index, index)
+        if self.positions is None:
+            return index
+        return np.asarray(self.positions[index])
+
+
+class TableBrowser:
+    """
+    Paging, sorting and filtering over one dataset held as an Arrow table
+    The table is normally the upload's memory-mapped sidecar, so a page only
+    touches the rows it returns. The ascending sort permutation of a column is
+    built once, saved as a .npy file under index_dir and memory-mapped when
+    used again; filtered selections of recent requests stay in memory
+    """
+
+    def __init__(self, table, index_dir=None, on_write=None):
+        self.table = table
+        self.index_dir = index_dir
+        # Called with index_dir whenever a permutation is saved in it (disk quota accounting)
+        self.on_write = on_write
+        self.columns = table.column_names
+        # Rows are taken batch by batch: take() on the whole chunked table
+        # concatenates every chunk first, which costs a full pass per page
+        self._batches = table.to_batches()
+        self._batch_starts = np.cumsum([0] + [batch.num_rows for batch in self._batches])
+        self._lock = threading.Lock()
+        self._permutations = {}
+        self._views = OrderedDict()
+
+    def column(self, name):
+        if name not in self.columns:
+            raise ValueError(f"Column '{name}' not found")
+        return _decoded(self.table.column(self.columns.index(name)))
+
+    def take(self, positions):
+        """The rows at the given positions, in that order, as a small Arrow table"""
+        positions = np.asarray(positions, dtype=np.int64)
+        if len(positions) == 0:
+            return self.table.schema.empty_table()
+        which = np.searchsorted(self._batch_starts, positions, side='right') - 1
+        grouped = np.argsort(which, kind='stable')
+        pieces = []
+        for batch in np.unique(which):
+            selected = grouped[which[grouped] == batch]
+            pieces.append(self._batches[batch].take(pa.array(positions[selected] - self._batch_starts[batch])))
+        rows = pa.Table.from_batches(pieces, schema=self.table.schema)
+        restore = np.empty_like(grouped)
+        restore[grouped] = np.arange(len(grouped))
+        return rows.take(pa.array(restore))
+
+    def _permutation_path(self, name):
+        if self.index_dir is None:
+            return None
+        return os.path.join(self.index_dir, hashlib.sha1(name.encode('utf-8')).hexdigest() + '.npy')
+
+    def permutation(self, name):
+        """(ascending row order of a column, number of rows before the nulls and NaNs)"""
+        with self._lock:
+            if name in self._permutations:
+                return self._permutations[name]
+
+        column = self.column(name)
+        path = self._permutation_path(name)
+        if path is not None and os.path.exists(path):
+            order = np.load(path, mmap_mode='r')
+        else:
+            order = pc.array_sort_indices(column, null_placement='at_end').to_numpy()
+            if path is not None:
+                os.makedirs(self.index_dir, exist_ok=True)
+                tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp.npy'
+                np.save(tmp_path, order)
+                os.replace(tmp_path, path)
+                if self.on_write is not None:
+                    self.on_write(self.index_dir)
+        result = (order, len(column) - _invalid_count(column))
+
+        with self._lock:
+            self._permutations[name] = result
+        return result
+
+    def _mask(self, filters):
+        mask = None
+        for name, operator, value in filters:
+            column = self.column(name)
+            if operator == 'null':
+                matched = pc.is_null(column, nan_is_null=True)
+            elif operator == 'notnull':
+                matched = pc.invert(pc.is_null(column, nan_is_null=True))
+            elif operator in ('contains', 'startswith'):
+                text = column if pa.types.is_string(column.type) else column.cast(pa.string())
+                if operator == 'contains':
+                    matched = pc.match_substring(text, value, ignore_case=True)
+                else:
+                    matched = pc.starts_with(text, value, ignore_case=True)
+            else:
+                try:
+                    matched = _COMPARISONS[operator](column, _scalar(column, name, value))
+                except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                    raise ValueError(f"Cannot compare column '{name}' with '{value}'")
+            matched = pc.fill_null(matched, False).to_numpy(zero_copy_only=False)
+            mask = matched if mask is None else mask & matched
+        return mask
+
+    def view(self, sort=None, filters=()):
+        """The _View of rows matching every filter, in the order of the sort column"""
+        key = (sort, filters)
+        with self._lock:
+            if key in self._views:
+                self._views.move_to_end(key)
+                return self._views[key]
+
+        num_rows = self.table.num_rows
+        order, valid = self.permutation(sort) if sort is not None else (None, num_rows)
+        if not filters:
+            view = _View(order, num_rows, valid)
+        else:
+            mask = self._mask(filters)
+            if order is None:
+                positions = np.flatnonzero(mask)
+                view = _View(positions, len(positions), len(positions))
+            else:
+                selected = mask[order]
+                positions = np.asarray(order)[selected]
+                view = _View(positions, len(positions), int(np.count_nonzero(selected[:valid])))
+
+        with self._lock:
+            self._views[key] = view
+            while len(self._views) > MAX_CACHED_VIEWS:
+                self._views.popitem(last=False)
+        return view
+
+    def page(self, offset=0, limit=DEFAULT_PAGE_SIZE, sort=None, descending=False, filters=()):
+        """
+        One page of rows of the sorted, filtered dataset
+        Returns columns, total_rows, matched_rows, offset and limit, plus
+        row_ids (positions in the file) and rows as lists of JSON-ready values
+        """
+        view = self.view(sort, tuple(filters))
+        positions = view.take(offset, limit, reverse=descending and sort is not None)
+        rows = self.take(positions)
+        values = [_json_values(rows.column(i)) for i in range(rows.num_columns)]
+        return {
+            'columns': self.columns,
+            'total_rows': self.table.num_rows,
+            'matched_rows': view.size,
+            'offset': offset,
+            'limit': limit,
+            'sort': sort,
+            'order': 'desc' if descending else 'asc',
+            'row_ids': positions.tolist(),
+            'rows': [list(row) for row in zip(*values)] if values else []
+        }
@@ -0,0 +1,252 @@
+# Content-addressed cache for analysis results
+
+import hashlib
+import logging
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory file locks (Windows): concurrent runs are only merged within a process
+    fcntl = None
+
+from metrics import count_cache, count_shared, log_event
+
+logger = logging.getLogger('data_analyzer.cache')
+
+# Bump whenever the structure or content of analyze_data's output changes so
+# cached results from older versions are not reused
+ANALYSIS_VERSION = '10'
+
+# Files are hashed in 1MB blocks so large uploads never sit in memory whole
+HASH_CHUNK_SIZE = 1024 * 1024
+
+_digest_memo = {}
+_digest_lock = threading.Lock()
+
+
+def file_digest(file_path):
+    """
+    Return the SHA-256 hex digest of a file's contents
+    Digests are memoized on (path, mtime, size) so repeat lookups of an
+    unchanged file skip the re-read
+    """
+    stat = os.stat(file_path)
+    memo_key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+
+    with _digest_lock:
+        digest = _digest_memo.get(memo_key)
+    if digest is not None:
+        return digest
+
+    sha = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            sha.update(block)
+    digest = sha.hexdigest()
+
+    with _digest_lock:
+        _digest_memo[memo_key] = digest
+    return digest
+
+
+def remember_digest(file_path, digest):
+    """Record the digest of a file hashed elsewhere (as it was written) for file_digest"""
+    stat = os.stat(file_path)
+    with _digest_lock:
+        _digest_memo[(os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)] = digest
+
+
+class ResultCache:
+    """
+    Two-level cache for analysis results
+    Recent results are held in memory with LRU eviction, and every result is
+    also written to disk so reloads and restarts can reuse it
+    get_or_compute runs at most one computation per key at a time: other
+    threads, and for persisted caches other processes, wait for it and share
+    its result
+    """
+
+    def __init__(self, cache_dir, max_items=32, version='1', persist=True, name='result', on_write=None):
+        self.cache_dir = cache_dir
+        # Label for the hit/miss metrics
+        self.name = name
+        # Called with the path of every entry written to disk (disk quota accounting)
+        self.on_write = on_write
+        self.max_items = max_items
+        self.version = version
+        # Memory-only caches (persist=False) never touch the disk
+        self.persist = persist
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        # key -> [lock, number of threads using it] for computations in flight
+        self._inflight = {}
+        # Analysis workers are forked from a web process whose other threads
+        # may hold these locks; the child starts with fresh ones
+        os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self):
+        self._lock = threading.Lock()
+        self._inflight = {}
+
+    def key_for(self, digest, *parts):
+        """Build a cache key from a content digest, the analysis version and optional qualifiers"""
+        return '-'.join([f'v{self.version}', digest] + [str(p) for p in parts if p is not None])
+
+    def _path(self, key, suffix='.pkl'):
+        safe_key = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in key)
+        return os.path.join(self.cache_dir, f'{safe_key}{suffix}')
+
+    def get(self, key):
+        """Return the cached value for key, or None if it has not been computed"""
+        value = self._lookup(key)
+        count_cache(self.name, value is not None)
+        return value
+
+    def _lookup(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+        if not self.persist:
+            return None
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except Exception as e:
+            log_event(logger, 'cache_entry_unreadable', logging.WARNING, path=path, error=str(e))
+            return None
+
+        self._remember(key, value)
+        return value
+
+    def set(self, key, value):
+        """Store value in memory and write it to disk"""
+        self._remember(key, value)
+        if not self.persist:
+            return
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            # Atomic rename so readers in other processes never see a partial file
+            os.replace(tmp_path, path)
+            if self.on_write is not None:
+                self.on_write(path)
+        except Exception as e:
+            log_event(logger, 'cache_write_failed', logging.WARNING, path=path, error=str(e))
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def get_or_compute(self, key, compute):
+        """
+        Return the cached value for key, computing and storing it on a miss
+        A caller that finds the same key being computed waits and returns
+        that result instead of starting another run; if that run fails, the
+        next waiter computes it itself
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._single_flight(key):
+            # Whoever held the key before us may have stored the value meanwhile
+            value = self._lookup(key)
+            if value is not None:
+                count_shared(self.name)
+                return value
+            value = compute()
+            self.set(key, value)
+        return value
+
+    @contextmanager
+    def _single_flight(self, key):
+        with self._lock:
+            entry = self._inflight.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                # Only persisted results can be shared with other processes
+                if self.persist and fcntl is not None:
+                    with _file_lock(self._path(key, '.lock')):
+                        yield
+                else:
+                    yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._inflight[key]
+
+    def digests(self):
+        """Content digests of the entries held in memory"""
+        with self._lock:
+            # Keys are built by key_for: v<version>-<digest>-...
+            return {key.split('-')[1] for key in self._memory}
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_items:
+                self._memory.popitem(last=False)
+
+
+# Descriptors of the lock files this process holds
+_held_lock_fds = set()
+
+
+def _close_inherited_locks():
+    # A forked child shares its parent's locks through the inherited descriptors;
+    # closing its copies leaves the parent holding them and lets the child take
+    # them again later
+    for fd in _held_lock_fds:
+        os.close(fd)
+    _held_lock_fds.clear()
+
+
+os.register_at_fork(after_in_child=_close_inherited_locks)
+
+
+@contextmanager
+def _file_lock(path):
+    """
+    Hold an exclusive advisory lock on a lock file for the duration of the block
+    The lock dies with its process, so a crashed run never blocks the others.
+    The holder deletes the file on release; a waiter that then acquires the
+    lock on the deleted file opens the path again
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    while True:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            if os.fstat(fd).st_ino == os.stat(path).st_ino:
+                break
+        except FileNotFoundError:
+            pass
+        except BaseException:
+            os.close(fd)
+            raise
+        os.close(fd)
+    _held_lock_fds.add(fd)
+    try:
+        yield
+    finally:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        _held_lock_fds.discard(fd)
+        os.close(fd)
@@ -0,0 +1,143 @@
+# Compressed uploads: format detection and size-limited streaming decompression
+
+import bz2
+import gzip
+import io
+import lzma
+import os
+import zipfile
+
+COMPRESSION_EXTENSIONS = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz', '.zip': 'zip'}
+
+# Formats accepted inside a compressed upload; workbooks are zip archives
+# already and their readers need random access to the file
+COMPRESSIBLE_FORMATS = ('.csv', '.json', '.jsonl', '.ndjson')
+
+# Bytes read from the decompressed stream at a time
+READ_BUFFER_SIZE = 1024 * 1024
+
+# Set by configure_decompression: the most bytes an upload may expand to, and
+# the expansion ratio past which it is treated as a decompression bomb
+_max_bytes = 50 * 1024 * 1024
+_max_ratio = 100
+
+# Expansion is only compared with the ratio past this many bytes, since small
+# repetitive files can legitimately compress extremely well
+RATIO_GRACE_BYTES = 4 * 1024 * 1024
+
+
+class DecompressionLimitError(ValueError):
+    """A compressed upload expands past the size limit or the bomb ratio"""
+
+
+def configure_decompression(max_bytes, max_ratio):
+    """Set the decompressed size limit and the largest accepted compression ratio"""
+    global _max_bytes, _max_ratio
+    _max_bytes = max_bytes
+    _max_ratio = max_ratio
+
+
+def split_compression(filename):
+    """
+    Return (data extension, compression) from a file name alone
+    'sales.csv.gz' -> ('.csv', 'gzip'), 'sales.csv' -> ('.csv', None); for a
+    .zip the data extension is whatever precedes it, possibly '', since the
+    archive member decides
+    """
+    stem, extension = os.path.splitext(filename.lower())
+    compression = COMPRESSION_EXTENSIONS.get(extension)
+    if compression is None:
+        return extension, None
+    return os.path.splitext(stem)[1], compression
+
+
+def _zip_member(archive):
+    members = [info for info in archive.infolist()
+               if not info.is_dir() and not info.filename.startswith('__MACOSX/')]
+    if len(members) != 1:
+        raise ValueError(f"A .zip upload must contain exactly one file, found {len(members)}")
+    member = members[0]
+    if member.flag_bits & 0x1:
+        raise ValueError("Encrypted .zip archives are not supported")
+    return member
+
+
+def data_format(file_path):
+    """
+    Return (data extension, compression) of an upload, compression None if it has none
+    The data extension of a .zip comes from its single member. Raises
+    ValueError for compressed formats that cannot be read as a stream
+    """
+    extension, compression = split_compression(os.path.basename(file_path))
+    if compression == 'zip':
+        with zipfile.ZipFile(file_path) as archive:
+            extension = os.path.splitext(_zip_member(archive).filename.lower())[1]
+    if compression is not None and extension not in COMPRESSIBLE_FORMATS:
+        raise ValueError(f"Compressed uploads must contain a CSV, JSON or JSON Lines file, not '{extension or 'unknown'}'")
+    return extension, compression
+
+
+class _LimitedReader(io.RawIOBase):
+    """Raw stream over a decompressor that counts the bytes produced and enforces the limits"""
+
+    def __init__(self, stream, compressed_size, closers=()):
+        self.stream = stream
+        self.compressed_size = max(compressed_size, 1)
+        self.closers = closers
+        self.produced = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        count = self.stream.readinto(buffer)
+        self.produced += count
+        if self.produced > _max_bytes:
+            raise DecompressionLimitError(
+                f"File too large: it expands to more than {_max_bytes // (1024 * 1024)}MB when decompressed")
+        if self.produced > RATIO_GRACE_BYTES and self.produced > _max_ratio * self.compressed_size:
+            raise DecompressionLimitError(
+                f"Rejected a possible decompression bomb: the file expands more than {_max_ratio}x")
+        return count
+
+    def close(self):
+        if not self.closed:
+            self.stream.close()
+            for closer in self.closers:
+                closer.close()
+        super().close()
+
+
+def open_data(file_path):
+    """
+    Open an upload for reading as binary, decompressing on the fly if it is compressed
+    Decompressed data is never written anywhere; reading past the configured
+    size limit or compression ratio raises DecompressionLimitError
+    """
+    _, compression = data_format(file_path)
+    if compression is None:
+        return open(file_path, 'rb')
+
+    closers = ()
+    if compression == 'gzip':
+        stream = gzip.open(file_path, 'rb')
+    elif compression == 'bz2':
+        stream = bz2.open(file_path, 'rb')
+    elif compression == 'xz':
+        stream = lzma.open(file_path, 'rb')
+    else:
+        archive = zipfile.ZipFile(file_path)
+        member = _zip_member(archive)
+        # The declared size can be forged, but when honest it rejects the file before any work
+        if member.file_size > _max_bytes:
+            archive.close()
+            raise DecompressionLimitError(
+                f"File too large: it expands to more than {_max_bytes // (1024 * 1024)}MB when decompressed")
+        stream = archive.open(member)
+        closers = (archive,)
+    return io.BufferedReader(_LimitedReader(stream, os.path.getsize(file_path), closers), READ_BUFFER_SIZE)
+
+
+def open_text(file_path, encoding):
+    """open_data decoded as text"""
+    return io.TextIOWrapper(open_data(file_path), encoding=encoding)
@@ -0,0 +1,182 @@
+# Blocked, NaN-aware correlation engine
+
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+CORRELATION_METHODS = ('pearson', 'spearman')
+
+# Strongest column pairs reported
+TOP_PAIRS = 20
+
+# Columns kept in the reduced heatmap matrix
+HEATMAP_MAX_COLUMNS = 25
+
+# Columns per tile; each tile is a few (rows x BLOCK_SIZE) matrix products
+BLOCK_SIZE = 256
+
+
+def _prepare(block, method):
+    if method not in CORRELATION_METHODS:
+        raise ValueError(f"Unsupported correlation method '{method}'. Use one of {', '.join(CORRELATION_METHODS)}")
+    if method == 'spearman':
+        # Each column is ranked once over its own non-null values (missing values
+        # stay NaN) rather than per pair as DataFrame.corr does, which differs
+        # slightly when columns have gaps in different rows
+        block = block.rank(method='average')
+    values = block.to_numpy(dtype=float, na_value=np.nan, copy=True)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        # Pairwise statistics do not depend on a shift, and centring avoids cancellation
+        values -= np.nan_to_num(np.nanmean(values, axis=0))
+    return values
+
+
+def _tile(values, has_nulls, rows, cols):
+    """
+    Correlations and pairwise observation counts between two column ranges
+    With missing values every pair uses only the rows where both are present,
+    like DataFrame.corr; the sums over those rows come from matrix products
+    """
+    x = values[:, rows]
+    y = values[:, cols]
+    if has_nulls:
+        mx = ~np.isnan(x)
+        my = ~np.isnan(y)
+        x = np.where(mx, x, 0.0)
+        y = np.where(my, y, 0.0)
+        mx = mx.astype(float)
+        my = my.astype(float)
+        n = mx.T @ my
+        sx = x.T @ my
+        sy = mx.T @ y
+        sxx = (x * x).T @ my
+        syy = mx.T @ (y * y)
+    else:
+        n = np.full((x.shape[1], y.shape[1]), float(len(values)))
+        sx = x.sum(axis=0)[:, None]
+        sy = y.sum(axis=0)[None, :]
+        sxx = (x * x).sum(axis=0)[:, None]
+        syy = (y * y).sum(axis=0)[None, :]
+    sxy = x.T @ y
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = sxy - sx * sy / n
+        vx = sxx - sx * sx / n
+        vy = syy - sy * sy / n
+        r = cov / np.sqrt(vx * vy)
+    r[(vx <= 0) | (vy <= 0) | (n < 2)] = np.nan
+    return np.clip(r, -1.0, 1.0), n
+
+
+def _tile_ranges(columns, block_size):
+    starts = range(0, columns, block_size)
+    return [(slice(i, min(i + block_size, columns)), slice(j, min(j + block_size, columns)))
+            for i in starts for j in starts if j >= i]
+
+
+def _strongest(r, n, rows, cols, top_k):
+    # Candidate pairs from one tile: strict upper triangle only on the diagonal
+    strength = np.nan_to_num(np.abs(r), nan=-1.0)
+    if rows.start == cols.start:
+        strength[np.tril_indices_from(strength)] = -1.0
+    flat = strength.ravel()
+    take = min(top_k, flat.size)
+    if take == 0:
+        return []
+    idx = np.argpartition(-flat, take - 1)[:take]
+    idx = idx[flat[idx] >= 0]
+    i, j = np.unravel_index(idx, strength.shape)
+    return list(zip(flat[idx], rows.start + i, cols.start + j, r[i, j], n[i, j]))
+
+
+def _cluster_order(matrix):
+    """Leaf order of an average-linkage clustering on 1 - |r|, so related columns sit together"""
+    size = len(matrix)
+    similarity = np.abs(np.nan_to_num(matrix, nan=0.0))
+    clusters = [[i] for i in range(size)]
+    while len(clusters) > 1:
+        best = None
+        for a in range(len(clusters)):
+            for b in range(a + 1, len(clusters)):
+                score = similarity[np.ix_(clusters[a], clusters[b])].mean()
+                if best is None or score > best[0]:
+                    best = (score, a, b)
+        _, a, b = best
+        clusters[a] = clusters[a] + clusters.pop(b)
+    return clusters[0] if clusters else []
+
+
+def correlation_summary(block, method='pearson', top_k=TOP_PAIRS, max_columns=HEATMAP_MAX_COLUMNS,
+                        workers=1, block_size=BLOCK_SIZE):
+    """
+    Correlate every pair of numeric columns without keeping the full matrix
+    The columns are processed in tiles (on worker threads if workers > 1; the
+    matrix products release the GIL). Returns a dict with the top_k most
+    strongly correlated pairs and a reduced, clustered matrix of the
+    max_columns columns with the strongest correlations to any other column
+    """
+    values = _prepare(block, method)
+    names = list(block.columns)
+    count = len(names)
+    has_nulls = bool(np.isnan(values).any())
+
+    strength = np.full(count, -1.0)
+    candidates = []
+
+    def run(tile):
+        rows, cols = tile
+        r, n = _tile(values, has_nulls, rows, cols)
+        return tile, r, n
+
+    tiles = _tile_ranges(count, block_size)
+    if workers > 1 and len(tiles) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run, tiles))
+    else:
+        results = map(run, tiles)
+
+    for (rows, cols), r, n in results:
+        magnitude = np.abs(r)
+        if rows.start == cols.start:
+            np.fill_diagonal(magnitude, np.nan)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            strength[rows] = np.fmax(strength[rows], np.nanmax(magnitude, axis=1, initial=-1.0))
+            strength[cols] = np.fmax(strength[cols], np.nanmax(magnitude, axis=0, initial=-1.0))
+        # Keep the candidate list short as tiles stream in
+        candidates = sorted(candidates + _strongest(r, n, rows, cols, top_k), key=lambda c: (-c[0], c[1], c[2]))[:top_k]
+
+    pairs = [
+        {'column_1': names[i], 'column_2': names[j], 'correlation': float(r), 'observations': int(n)}
+        for _, i, j, r, n in candidates
+    ]
+
+    # Heatmap columns: strongest first, earlier columns first among equals
+    if count > max_columns:
+        selected = sorted(np.argsort(-strength, kind='stable')[:max_columns])
+    else:
+        selected = list(range(count))
+    reduced, _ = _tile(values, has_nulls, selected, selected)
+    np.fill_diagonal(reduced, np.where(np.isnan(np.diag(reduced)), np.nan, 1.0))
+    order = [selected[i] for i in _cluster_order(reduced)]
+    position = {column: i for i, column in enumerate(selected)}
+    reduced = reduced[np.ix_([position[c] for c in order], [position[c] for c in order])]
+    matrix = pd.DataFrame(reduced, index=[names[c] for c in order], columns=[names[c] for c in order])
+
+    return {
+        'method': method,
+        'columns': count,
+        'pairs': pairs,
+        'matrix': matrix
+    }
+
+
+def matrix_to_dict(matrix):
+    """Nested {column: {row: r}} dict of plain floats, None where undefined"""
+    return {
+        col: {row: float(value) if pd.notna(value) else None for row, value in values.items()}
+        for col, values in matrix.items()
+    }
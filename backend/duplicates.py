@@ -0,0 +1,178 @@
+# Duplicate-row detection from 64-bit row hashes
+
+import numpy as np
+import pandas as pd
+
+# Largest duplicate groups reported, and row indices listed for each
+MAX_DUPLICATE_GROUPS = 10
+GROUP_SAMPLE_ROWS = 5
+
+
+def row_hashes(data, columns=None):
+    """
+    One uint64 hash per row of the given columns (all columns by default)
+    Numeric columns are hashed as float64 so that chunks of the same file hash
+    alike whatever numeric dtype each chunk was read or downcast to. Distinct rows
+    collide with probability ~ rows^2 / 2^65, negligible at these sizes
+    """
+    if columns is not None:
+        data = data[list(columns)]
+    widened = {
+        col: np.float64 for col, dtype in data.dtypes.items()
+        if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype) and dtype != np.float64
+    }
+    if widened:
+        data = data.astype(widened)
+    return pd.util.hash_pandas_object(data, index=False).to_numpy()
+
+
+def _group_report(counts, rows):
+    return [{'count': int(count), 'rows': list(sample)} for count, sample in zip(counts, rows)]
+
+
+def duplicate_report(data, columns=None, max_groups=MAX_DUPLICATE_GROUPS, sample_rows=GROUP_SAMPLE_ROWS):
+    """
+    Count rows repeating an earlier row (like data.duplicated().sum()) and list
+    the largest groups of identical rows, each with the index labels of up to
+    sample_rows of its members. columns restricts the comparison to key columns
+    """
+    if columns is not None:
+        missing = [col for col in columns if col not in data.columns]
+        if missing:
+            raise ValueError(f"Unknown duplicate key columns: {', '.join(map(str, missing))}")
+
+    hashes = row_hashes(data, columns)
+    codes, uniques = pd.factorize(hashes)
+    sizes = np.bincount(codes, minlength=len(uniques))
+
+    # Only groups with more than one row are duplicates; take the biggest
+    candidates = np.flatnonzero(sizes > 1)
+    order = candidates[np.argsort(-sizes[candidates], kind='stable')][:max_groups]
+    samples = [data.index[np.flatnonzero(codes == group)[:sample_rows]].tolist() for group in order]
+
+    return {
+        'columns': list(columns) if columns is not None else None,
+        'duplicate_rows': int(len(hashes) - len(uniques)),
+        'approximate': False,
+        'groups': _group_report(sizes[order], samples)
+    }
+
+
+class DuplicateTracker:
+    """
+    Duplicate counting across chunks of a file
+    Each distinct row hash is kept once with its count and first row index, in
+    a few sorted runs merged as they grow (24 bytes per distinct row, no
+    Python objects), so lookups and inserts stay vectorized
+    With a capacity, memory stays bounded: once more than capacity distinct
+    hashes are held, only rows whose hash falls below a halving limit are
+    kept (1 in 2, 1 in 4, ...). Identical rows share a hash, so every kept
+    group is counted exactly, and the duplicate total is scaled up from the
+    kept rows and reported as approximate
+    """
+
+    def __init__(self, columns=None, capacity=None):
+        self.columns = columns
+        self.capacity = capacity
+        self.rows = 0
+        # Rows are kept when their hash is below 2**(64 - sample_bits)
+        self.sample_bits = 0
+        # Sorted (hashes, counts, first_rows) runs, each at most half the size of the previous one
+        self.runs = []
+
+    def _limit(self):
+        return np.uint64(2 ** (64 - self.sample_bits)) if self.sample_bits else None
+
+    def _sample(self, bits):
+        # Raise sample_bits to bits, dropping held hashes above the new limit;
+        # runs are sorted, so each keeps a prefix
+        self.sample_bits = bits
+        limit = self._limit()
+        runs = [tuple(part[:np.searchsorted(run[0], limit)] for part in run) for run in self.runs]
+        self.runs = [run for run in runs if len(run[0])]
+
+    def _bound(self):
+        while self.capacity is not None and sum(len(run[0]) for run in self.runs) > self.capacity:
+            self._sample(self.sample_bits + 1)
+
+    def _count_seen(self, hashes, counts):
+        # Add the counts of hashes already held in a run; returns the mask of new ones.
+        # hashes must be sorted, which keeps the binary searches cache-friendly
+        new = np.ones(len(hashes), dtype=bool)
+        for run_hashes, run_counts, _ in self.runs:
+            positions = np.minimum(np.searchsorted(run_hashes, hashes), len(run_hashes) - 1)
+            found = new & (run_hashes[positions] == hashes)
+            np.add.at(run_counts, positions[found], counts[found])
+            new &= ~found
+        return new
+
+    def _add_run(self, hashes, counts, first_rows):
+        # The arrays arrive sorted by hash
+        if len(hashes) == 0:
+            return
+        self.runs.append((hashes, counts, first_rows))
+        self.runs.sort(key=lambda run: -len(run[0]))
+        # Merge neighbours of similar size, which keeps the number of runs logarithmic
+        while len(self.runs) > 1 and 2 * len(self.runs[-1][0]) > len(self.runs[-2][0]):
+            a, b = self.runs.pop(), self.runs.pop()
+            # Runs hold disjoint hashes, so merging is a concatenate and sort
+            hashes, counts, first_rows = (np.concatenate(parts) for parts in zip(a, b))
+            order = np.argsort(hashes)
+            self.runs.append((hashes[order], counts[order], first_rows[order]))
+
+    def update(self, chunk):
+        """Add the rows of the next chunk (its index holds the file row numbers)"""
+        hashes = row_hashes(chunk, self.columns)
+        self.rows += len(hashes)
+        positions = np.arange(len(hashes))
+        if self.sample_bits:
+            kept = hashes < self._limit()
+            hashes, positions = hashes[kept], positions[kept]
+        codes, uniques = pd.factorize(hashes)
+        counts = np.bincount(codes, minlength=len(uniques))
+        first_rows = np.full(len(uniques), len(chunk), dtype=np.int64)
+        np.minimum.at(first_rows, codes, positions)
+        first_rows = np.asarray(chunk.index[first_rows], dtype=np.int64)
+
+        order = np.argsort(uniques)
+        uniques, counts, first_rows = uniques[order], counts[order], first_rows[order]
+        new = self._count_seen(uniques, counts)
+        self._add_run(uniques[new], counts[new], first_rows[new])
+        self._bound()
+
+    def merge(self, other):
+        """Fold in a tracker that saw a later part of the same file"""
+        self.rows += other.rows
+        if other.sample_bits > self.sample_bits:
+            self._sample(other.sample_bits)
+        limit = self._limit()
+        for hashes, counts, first_rows in other.runs:
+            if limit is not None:
+                end = np.searchsorted(hashes, limit)
+                hashes, counts, first_rows = hashes[:end], counts[:end], first_rows[:end]
+            new = self._count_seen(hashes, counts)
+            self._add_run(hashes[new], counts[new], first_rows[new])
+        self._bound()
+
+    def report(self, max_groups=MAX_DUPLICATE_GROUPS):
+        """
+        Same layout as duplicate_report; each group lists only its first row
+        When rows were sampled, duplicate_rows is an estimate and the groups
+        are the largest among the kept rows
+        """
+        if self.runs:
+            counts = np.concatenate([counts for _, counts, _ in self.runs])
+            first_rows = np.concatenate([rows for _, _, rows in self.runs])
+        else:
+            counts = first_rows = np.array([], dtype=np.int64)
+        # Rows beyond the first of each kept group, scaled up by the sampling rate
+        repeated = int(counts.sum()) - len(counts)
+        candidates = np.flatnonzero(counts > 1)
+        # Largest groups first, earlier rows first among equal sizes
+        order = candidates[np.lexsort((first_rows[candidates], -counts[candidates]))][:max_groups]
+        return {
+            'columns': list(self.columns) if self.columns is not None else None,
+            'duplicate_rows': min(repeated << self.sample_bits, self.rows),
+            'approximate': self.sample_bits > 0,
+            'groups': _group_report(counts[order], [[row] for row in first_rows[order].tolist()])
+        }
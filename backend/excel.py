@@ -0,0 +1,190 @@
+# Streaming Excel ingestion
+
+import importlib
+
+import pandas as pd
+
+# Reader package per workbook format, imported by the first workbook that needs
+# it (openpyxl alone takes about a tenth of a second to import)
+ENGINES = {'xlsx': 'openpyxl', 'xls': 'xlrd'}
+
+# Leading bytes of each workbook format: .xlsx is a zip archive, .xls an OLE2 compound file
+XLSX_MAGIC = b'PK\x03\x04'
+XLS_MAGIC = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+
+# Cell text read as missing, the same defaults pandas.read_excel applies
+NA_STRINGS = {
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND',
+    '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'
+}
+
+
+def detect_excel_format(file_path):
+    """
+    Identify a workbook from its leading bytes rather than its extension
+    Returns 'xlsx', 'xls' or None if the file is neither
+    """
+    with open(file_path, 'rb') as f:
+        header = f.read(len(XLS_MAGIC))
+    if header.startswith(XLSX_MAGIC):
+        return 'xlsx'
+    if header == XLS_MAGIC:
+        return 'xls'
+    return None
+
+
+def _require_engine(excel_format):
+    if excel_format is None:
+        raise ValueError("The file is not a valid Excel workbook. Please save it as .xlsx or .csv format.")
+    try:
+        return importlib.import_module(ENGINES[excel_format])
+    except ImportError:
+        raise ValueError(f"Reading .{excel_format} files requires the {ENGINES[excel_format]} package")
+
+
+def list_sheets(file_path):
+    """Return the sheet names of a workbook without loading any sheet data"""
+    excel_format = detect_excel_format(file_path)
+    engine = _require_engine(excel_format)
+    if excel_format == 'xlsx':
+        with open(file_path, 'rb') as f:
+            workbook = engine.load_workbook(f, read_only=True)
+            try:
+                return list(workbook.sheetnames)
+            finally:
+                workbook.close()
+    workbook = engine.open_workbook(file_path, on_demand=True)
+    try:
+        return workbook.sheet_names()
+    finally:
+        workbook.release_resources()
+
+
+def _resolve_sheet(sheet_names, sheet_name):
+    if sheet_name is None:
+        if not sheet_names:
+            raise ValueError("Excel file contains no sheets")
+        return sheet_names[0]
+    if sheet_name not in sheet_names:
+        raise ValueError(f"Sheet '{sheet_name}' not found. Available sheets: {', '.join(sheet_names)}")
+    return sheet_name
+
+
+def _xlsx_rows(openpyxl, file_path, sheet_name):
+    # Read-only mode parses the sheet XML as a stream instead of building every cell object;
+    # openpyxl is given the open file since it refuses paths without an .xlsx-like extension
+    with open(file_path, 'rb') as f:
+        workbook = openpyxl.load_workbook(f, read_only=True, data_only=True)
+        try:
+            sheet = workbook[_resolve_sheet(workbook.sheetnames, sheet_name)]
+            for row in sheet.iter_rows(values_only=True):
+                yield row
+        finally:
+            workbook.close()
+
+
+def _xls_rows(xlrd, file_path, sheet_name):
+    # on_demand loads only the requested sheet's records
+    workbook = xlrd.open_workbook(file_path, on_demand=True)
+    try:
+        sheet = workbook.sheet_by_name(_resolve_sheet(workbook.sheet_names(), sheet_name))
+        for rowx in range(sheet.nrows):
+            row = []
+            for cell in sheet.row(rowx):
+                if cell.ctype == xlrd.XL_CELL_DATE:
+                    row.append(xlrd.xldate.xldate_as_datetime(cell.value, workbook.datemode))
+                elif cell.ctype == xlrd.XL_CELL_BOOLEAN:
+                    row.append(bool(cell.value))
+                elif cell.ctype in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK, xlrd.XL_CELL_ERROR):
+                    row.append(None)
+                else:
+                    row.append(cell.value)
+            yield row
+    finally:
+        workbook.release_resources()
+
+
+def _cell_value(value):
+    # Whole numbers are stored as floats; report them as integers like read_excel does
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str) and value.strip() in NA_STRINGS:
+        return None
+    return value
+
+
+def _header_names(header):
+    names = []
+    seen = {}
+    for i, value in enumerate(header):
+        name = _cell_value(value)
+        if name is None:
+            name = f'Unnamed: {i}'
+        # Repeated headers get .1, .2, ... suffixes as in pandas
+        if name in seen:
+            seen[name] += 1
+            name = f'{name}.{seen[name]}'
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _column_series(values):
+    series = pd.Series(values, dtype=object)
+    # Numbers stored as text are parsed, as read_excel's parser does
+    if pd.api.types.infer_dtype(series, skipna=True) in ('string', 'mixed-integer', 'mixed-integer-float', 'mixed'):
+        try:
+            return pd.to_numeric(series)
+        except (ValueError, TypeError):
+            pass
+    return series.infer_objects()
+
+
+def rows_to_frame(rows):
+    """
+    Build a DataFrame from an iterator of row tuples, first non-blank row as header
+    Values are appended straight into per-column lists, so no intermediate list
+    of rows (or cell objects) is ever held in memory
+    """
+    header = None
+    columns = []
+    row_count = 0
+    for row in rows:
+        if header is None:
+            if all(value is None for value in row):
+                continue
+            header = list(row)
+            continue
+        # Rows can run wider than the header row
+        while len(columns) < len(row):
+            columns.append([None] * row_count)
+        for i, value in enumerate(row):
+            columns[i].append(_cell_value(value))
+        for i in range(len(row), len(columns)):
+            columns[i].append(None)
+        row_count += 1
+
+    if header is None:
+        return pd.DataFrame()
+    header.extend([None] * (len(columns) - len(header)))
+    while len(columns) < len(header):
+        columns.append([None] * row_count)
+
+    # Keyed by position first, since repeated header values would otherwise collide
+    data = pd.DataFrame({i: _column_series(values) for i, values in enumerate(columns)})
+    data.columns = _header_names(header)
+    return data
+
+
+def read_excel_sheet(file_path, sheet_name=None):
+    """
+    Load one sheet of a workbook (the first sheet by default) as a DataFrame
+    The engine is picked from the file's magic bytes, and only the requested
+    sheet is read
+    """
+    excel_format = detect_excel_format(file_path)
+    engine = _require_engine(excel_format)
+    if excel_format == 'xlsx':
+        return rows_to_frame(_xlsx_rows(engine, file_path, sheet_name))
+    return rows_to_frame(_xls_rows(engine, file_path, sheet_name))
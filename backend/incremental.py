@@ -0,0 +1,334 @@
+# Incremental re-parsing and re-profiling of CSV files that only grow between uploads
+
+import codecs
+import hashlib
+import io
+import logging
+import os
+import pickle
+import shutil
+
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype, is_string_dtype, union_categoricals
+
+from cache import HASH_CHUNK_SIZE, file_digest
+from compression import data_format
+from metrics import log_event
+from sidecar import read_sidecar
+from sniffing import SNIFF_BYTES, downcast_numeric, sniff_csv
+from streaming import DEFAULT_CHUNKSIZE, stream_csv
+
+logger = logging.getLogger('data_analyzer.incremental')
+
+# Saved profile state is stored next to the uploaded file, like the sidecar
+STATE_SUFFIX = '.profile'
+
+
+class AppendState:
+    """
+    A streamed profile together with the exact bytes of the file it covers
+    size and digest identify that prefix, so a later upload that starts with
+    the same bytes only needs its appended rows profiled
+    """
+
+    def __init__(self, profile, size, digest, ends_with_newline, encoding, delimiter, version):
+        self.profile = profile
+        self.size = size
+        self.digest = digest
+        self.ends_with_newline = ends_with_newline
+        self.encoding = encoding
+        self.delimiter = delimiter
+        self.version = version
+
+
+def state_path(file_path):
+    """Return the path of the profile state stored next to an uploaded file"""
+    return file_path + STATE_SUFFIX
+
+
+def prefix_digest(file_path, size):
+    """SHA-256 hex digest of the first size bytes of a file"""
+    sha = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        remaining = size
+        while remaining > 0:
+            block = f.read(min(HASH_CHUNK_SIZE, remaining))
+            if not block:
+                break
+            sha.update(block)
+            remaining -= len(block)
+    return sha.hexdigest()
+
+
+def _last_byte(file_path, offset):
+    if offset <= 0:
+        return b''
+    with open(file_path, 'rb') as f:
+        f.seek(offset - 1)
+        return f.read(1)
+
+
+def load_state(file_path, version):
+    """Return the saved AppendState for a file, or None if there is none usable"""
+    path = state_path(file_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+    except Exception as e:
+        log_event(logger, 'profile_state_unreadable', logging.WARNING, path=path, error=str(e))
+        return None
+    return state if getattr(state, 'version', None) == version else None
+
+
+def save_state(state, file_path):
+    """Write the profile state for a file; failures only cost the next run its head start"""
+    path = state_path(file_path)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        log_event(logger, 'profile_state_skipped', logging.WARNING, file=os.path.basename(file_path), error=str(e))
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def carry_state(source_path, file_path):
+    """
+    Give a file the profile state of the file it replaces under the same upload name
+    Uploads are stored by content, so a grown file is a new file; when it is the
+    old one with rows appended, its profile resumes from the copied state
+    """
+    source, path = state_path(source_path), state_path(file_path)
+    if not os.path.exists(source) or os.path.exists(path):
+        return
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        log_event(logger, 'profile_state_skipped', logging.WARNING, file=os.path.basename(file_path), error=str(e))
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def is_append(state, file_path):
+    """
+    Whether the file is the state's file with rows appended
+    Its first state.size bytes must be unchanged, and if the old file ended
+    without a newline, the new bytes must start with one so the old last row
+    was not extended
+    """
+    size = os.path.getsize(file_path)
+    if state.profile.rows == 0 or size < state.size:
+        return False
+    if not state.ends_with_newline and size > state.size:
+        with open(file_path, 'rb') as f:
+            f.seek(state.size)
+            if f.read(1) not in (b'\n', b'\r'):
+                return False
+    return prefix_digest(file_path, state.size) == state.digest
+
+
+def _starts_new_row(file_path, offset):
+    # Appended bytes after a file that ended mid-line would extend its last row
+    if _last_byte(file_path, offset) in (b'\n', b'\r'):
+        return True
+    with open(file_path, 'rb') as f:
+        f.seek(offset)
+        return f.read(1) in (b'\n', b'\r', b'')
+
+
+def _decodes(file_path, encoding):
+    # Whether the whole file is valid in the encoding (read_csv_lean falls back to latin-1 otherwise)
+    decoder = codecs.getincrementaldecoder(encoding)()
+    try:
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                decoder.decode(block)
+            decoder.decode(b'', final=True)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def _last_row_is_empty(file_path, csv_format, columns):
+    # load_data drops all-empty rows, so the earlier frame's last label only gives the
+    # number of rows read when its last line held values; unparseable tails count as empty
+    with open(file_path, 'rb') as f:
+        f.seek(max(0, os.path.getsize(file_path) - 64 * 1024))
+        tail = f.read().decode(csv_format.encoding, errors='replace').rstrip('\r\n')
+    last_line = tail.rsplit('\n', 1)[-1].rstrip('\r')
+    try:
+        row = pd.read_csv(io.StringIO(last_line), sep=csv_format.delimiter, header=None, dtype=str)
+    except (ValueError, pd.errors.ParserError):
+        return True
+    return len(row.columns) != len(columns) or bool(row.isna().all(axis=None))
+
+
+def _string_dtype(dtype):
+    return is_string_dtype(dtype) and dtype != object and not isinstance(dtype, pd.CategoricalDtype)
+
+
+def _extend_column(earlier, appended):
+    """
+    The column a full parse of both parts would give, before downcasting, or None
+    when the appended values could change how the whole column is inferred
+    (numbers appended to text, text appended to numbers)
+    """
+    if isinstance(earlier.dtype, pd.CategoricalDtype):
+        merged = union_categoricals([earlier, appended.astype('category')], sort_categories=True)
+        # The union holds its categories in pieces; a parse stores them in one array
+        categories = pd.Index(merged.categories.to_numpy(), dtype=merged.categories.dtype)
+        return pd.Series(pd.Categorical.from_codes(merged.codes, categories),
+                         index=earlier.index.append(appended.index), name=earlier.name)
+    if appended.isna().all():
+        if _string_dtype(earlier.dtype):
+            appended = appended.astype(earlier.dtype)
+        elif is_bool_dtype(earlier.dtype):
+            appended = appended.astype(object)
+    elif is_numeric_dtype(earlier.dtype) and not is_bool_dtype(earlier.dtype):
+        if not is_numeric_dtype(appended.dtype) or is_bool_dtype(appended.dtype):
+            return None
+    elif _string_dtype(earlier.dtype):
+        if not _string_dtype(appended.dtype):
+            return None
+    elif is_bool_dtype(earlier.dtype) or earlier.dtype == object:
+        if not (is_bool_dtype(appended.dtype) or appended.dtype == object):
+            return None
+    else:
+        return None
+    return pd.concat([earlier, appended])
+
+
+def extend_frame(previous_path, file_path):
+    """
+    Load a CSV upload that is an earlier upload with rows appended, parsing only the new rows
+    The earlier file's sidecar supplies its parsed rows; the appended bytes are
+    parsed with the same sniffed format and joined column by column, widening
+    dtypes and merging categories as a parse of the whole file would. The
+    result equals load_data(file_path), so analyze_data gives the same output.
+    Returns None, and the file is loaded in full, whenever that equality cannot
+    be guaranteed: compressed files, a changed prefix or header, or appended
+    values of a kind that would change a column's inferred type
+    """
+    size, previous_size = os.path.getsize(file_path), os.path.getsize(previous_path)
+    if size <= previous_size:
+        return None
+    if data_format(file_path) != ('.csv', None) or data_format(previous_path) != ('.csv', None):
+        return None
+    # Stored files are named by the digest of their contents
+    if prefix_digest(file_path, previous_size) != os.path.basename(previous_path)[:64]:
+        return None
+    if not _starts_new_row(file_path, previous_size):
+        return None
+
+    earlier = read_sidecar(previous_path)
+    if earlier is None:
+        return None
+    csv_format = sniff_csv(file_path)
+    # Column types are sniffed from the leading bytes, which the appended rows only reach in small files
+    if previous_size < SNIFF_BYTES and csv_format != sniff_csv(previous_path):
+        return None
+    columns = [str(col) for col in earlier.columns]
+    with open(file_path, 'rb') as f:
+        header = pd.read_csv(f, encoding=csv_format.encoding, sep=csv_format.delimiter, nrows=0).columns
+    # A column left empty by the earlier rows was dropped from its frame
+    if [str(col) for col in header] != columns or _last_row_is_empty(previous_path, csv_format, columns):
+        return None
+
+    encoding = 'utf-8' if csv_format.encoding == 'utf-8-sig' else csv_format.encoding
+    try:
+        with open(file_path, 'rb') as f:
+            f.seek(previous_size)
+            tail = f.read()
+        if encoding == 'utf-8' and not tail.isascii() and not _decodes(previous_path, encoding):
+            return None
+        appended = pd.read_csv(io.BytesIO(tail), encoding=encoding, sep=csv_format.delimiter, header=None,
+                               names=columns, index_col=False, dtype=csv_format.dtype)
+    except pd.errors.EmptyDataError:
+        return None
+    except (UnicodeDecodeError, ValueError, pd.errors.ParserError) as e:
+        log_event(logger, 'append_parse_skipped', logging.WARNING, file=os.path.basename(file_path), error=str(e))
+        return None
+    # Row labels continue from the earlier file's rows, as in a full parse
+    appended.index += int(earlier.index[-1]) + 1
+
+    extended = {}
+    for col in columns:
+        column = _extend_column(earlier[col], appended[col])
+        if column is None:
+            return None
+        extended[col] = column
+    data = downcast_numeric(pd.DataFrame(extended)).dropna(how='all')
+    log_event(logger, 'frame_extended', file=os.path.basename(file_path), appended_rows=len(appended))
+    return data
+
+
+def _profile_tail(state, file_path, chunksize, progress=None):
+    # The appended rows have no header line of their own, so the known columns are reused;
+    # their index continues from the rows already profiled (the duplicate tracker records it)
+    profile = state.profile
+    # A BOM can only be at the start of the file
+    encoding = 'utf-8' if state.encoding == 'utf-8-sig' else state.encoding
+    size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as f:
+        f.seek(state.size)
+        try:
+            reader = pd.read_csv(f, encoding=encoding, sep=state.delimiter, header=None, names=profile.columns,
+                                 index_col=False, chunksize=chunksize)
+        except pd.errors.EmptyDataError:
+            # Nothing appended beyond a line break
+            return
+        with reader:
+            for chunk in reader:
+                chunk.index += profile.rows_read
+                profile.update(chunk)
+                if progress and size > state.size:
+                    progress((f.tell() - state.size) / (size - state.size))
+
+
+def profile_csv_incremental(file_path, version, chunksize=DEFAULT_CHUNKSIZE, progress=None):
+    """
+    Profile a CSV file like profile_csv, reusing the state saved by a previous run
+    This is the append path for files too large to load whole (uploads loaded
+    in memory use extend_frame instead). When the file is the previously
+    profiled one with rows appended (e.g. a daily export re-uploaded under the
+    same name), only the new rows are read and merged into the saved
+    per-column state. Counts, moments, null counts, exact value counts and
+    duplicates come out as profile_csv gives them for the whole file;
+    quartiles, capped value counts and distinct-count estimates stay within the
+    usual sketch error, as the merged sketches saw the rows in different chunks
+    progress, if given, is called after each chunk with the share of the bytes to read
+    """
+    size = os.path.getsize(file_path)
+    state = load_state(file_path, version)
+
+    resumed = False
+    if state is not None and is_append(state, file_path):
+        try:
+            _profile_tail(state, file_path, chunksize, progress)
+            resumed = True
+            log_event(logger, 'profile_resumed', file=os.path.basename(file_path), appended_bytes=size - state.size)
+        except (UnicodeDecodeError, ValueError, pd.errors.ParserError) as e:
+            log_event(logger, 'profile_restarted', logging.WARNING, file=os.path.basename(file_path), error=str(e))
+
+    if resumed:
+        profile = state.profile
+        encoding, delimiter = state.encoding, state.delimiter
+    else:
+        profile, encoding, delimiter = stream_csv(file_path, chunksize, progress)
+
+    if profile.rows == 0:
+        raise ValueError("The file appears to be empty or contains no readable data")
+
+    # Only record state that matches the file as it is now
+    if os.path.getsize(file_path) == size:
+        ends_with_newline = _last_byte(file_path, size) in (b'\n', b'\r')
+        save_state(AppendState(profile, size, file_digest(file_path), ends_with_newline, encoding, delimiter, version),
+                   file_path)
+
+    return profile.result()
@@ -0,0 +1,125 @@
+# Background analysis jobs with progress reporting
+
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+
+# Progress percentage reported when each stage starts
+STAGE_PROGRESS = {
+    'queued': 0,
+    'loading': 10,
+    'stats': 30,
+    'visualizations': 60,
+    'insights': 85,
+    # Large CSVs are analyzed in one chunked pass, reported by the share of bytes read
+    'profiling': 10,
+    'done': 100
+}
+
+
+class JobStore:
+    """
+    SQLite-backed job status table
+    Every Flask worker process and every analysis worker opens the same file,
+    so any process can report on a job started by another
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                ' id TEXT PRIMARY KEY,'
+                ' filename TEXT NOT NULL,'
+                ' sheet TEXT,'
+                ' digest TEXT,'
+                ' status TEXT NOT NULL,'
+                ' stage TEXT NOT NULL,'
+                ' progress INTEGER NOT NULL,'
+                ' error TEXT,'
+                ' created_at REAL NOT NULL,'
+                ' updated_at REAL NOT NULL)'
+            )
+
+    @contextmanager
+    def _connect(self):
+        # Commits (or rolls back on error) and closes, unlike a bare sqlite3 connection
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def create(self, filename, sheet=None, digest=None):
+        """Register a new queued job and return its id; digest identifies the analyzed contents"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO jobs (id, filename, sheet, digest, status, stage, progress, error, created_at, updated_at)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?, NULL, ?, ?)',
+                (job_id, filename, sheet, digest, 'queued', 'queued', STAGE_PROGRESS['queued'], now, now)
+            )
+        return job_id
+
+    def update(self, job_id, **fields):
+        """Update status, stage, progress or error for a job"""
+        fields['updated_at'] = time.time()
+        assignments = ', '.join(f'{name} = ?' for name in fields)
+        with self._connect() as conn:
+            conn.execute(f'UPDATE jobs SET {assignments} WHERE id = ?', list(fields.values()) + [job_id])
+
+    def get(self, job_id):
+        """Return a job as a dict, or None if it does not exist"""
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def active_digests(self):
+        """Content digests of the files that queued or running jobs analyze"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT DISTINCT digest FROM jobs"
+                                " WHERE status IN ('queued', 'running') AND digest IS NOT NULL").fetchall()
+        return {row[0] for row in rows}
+
+
+def run_job(db_path, job_id, analyze, filepath):
+    """
+    Run one analysis job inside a worker process
+    analyze(filepath, progress=callback) calls callback(stage) as each stage
+    starts, or callback(stage, fraction) within a long stage, and must store its result where the web
+    processes can fetch it (the result cache); only status is written here
+    """
+    store = JobStore(db_path)
+    store.update(job_id, status='running', stage='loading', progress=STAGE_PROGRESS['loading'])
+
+    stages = list(STAGE_PROGRESS)
+    reported = {}
+
+    def progress(stage, fraction=None):
+        # fraction moves the percentage from this stage's start towards the next stage's
+        percent = STAGE_PROGRESS[stage]
+        if fraction is not None:
+            following = STAGE_PROGRESS[stages[stages.index(stage) + 1]]
+            percent += int(min(max(fraction, 0.0), 1.0) * (following - percent))
+        if reported.get('stage') == (stage, percent):
+            return
+        reported['stage'] = (stage, percent)
+        store.update(job_id, stage=stage, progress=percent)
+
+    try:
+        analyze(filepath, progress=progress)
+    except ValueError as ve:
+        store.update(job_id, status='failed', error=f'Data format error: {str(ve)}')
+        return
+    except Exception as e:
+        store.update(job_id, status='failed', error=f'Analysis failed: {str(e)}')
+        return
+
+    store.update(job_id, status='done', stage='done', progress=STAGE_PROGRESS['done'])
@@ -0,0 +1,252 @@
+# Streaming JSON record ingestion: JSON Lines and top-level arrays, flattened in batches
+
+import json
+import re
+
+import numpy as np
+import pandas as pd
+
+from sniffing import read_sample, detect_encoding
+from compression import open_text
+
+JSON_LINES_EXTENSIONS = ('.jsonl', '.ndjson')
+
+# Records flattened into one DataFrame at a time; only one batch of parsed
+# dicts is ever held in memory
+RECORD_BATCH_SIZE = 10_000
+
+# Characters read from the file per refill of the array parser's buffer
+READ_SIZE = 1024 * 1024
+
+# Separator between the keys of a nested field in its flattened column name
+FLATTEN_SEPARATOR = '.'
+
+# Leading text inspected to tell a top-level array or JSON Lines from a single document
+LAYOUT_SAMPLE_BYTES = 64 * 1024
+
+_WHITESPACE = ' \t\n\r'
+_SKIP_WHITESPACE = re.compile(r'[ \t\n\r]*').match
+
+
+def json_layout(file_path):
+    """
+    Classify a .json file from its leading text without parsing all of it
+    'array' for a top-level array, 'lines' for one object per line (JSON Lines
+    saved as .json) and 'document' for anything else
+    """
+    sample = read_sample(file_path, LAYOUT_SAMPLE_BYTES)
+    text = sample.decode(detect_encoding(sample), errors='replace').lstrip('\ufeff' + _WHITESPACE)
+    if text.startswith('['):
+        return 'array'
+    if not text.startswith('{'):
+        return 'document'
+    lines = [line for line in text.splitlines() if line.strip()]
+    # A pretty-printed or single-line document has no complete object on its first line followed by another
+    if len(lines) < 2 or not lines[1].lstrip().startswith('{'):
+        return 'document'
+    try:
+        return 'lines' if isinstance(json.loads(lines[0]), dict) else 'document'
+    except ValueError:
+        return 'document'
+
+
+def iter_json_lines(f):
+    """Yield the value on each non-blank line of a JSON Lines file"""
+    for number, line in enumerate(f, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON on line {number}: {e.msg}")
+
+
+def iter_json_array(f, read_size=READ_SIZE):
+    """
+    Yield the elements of a top-level JSON array one at a time
+    The file is read in read_size pieces and each element decoded with
+    raw_decode as soon as it is complete, so memory holds one buffer and one
+    element rather than the whole document
+    """
+    decoder = json.JSONDecoder()
+    skip = _SKIP_WHITESPACE
+    buffer = f.read(read_size).lstrip('\ufeff')
+    eof = not buffer
+    pos = skip(buffer, 0).end()
+    # Leading whitespace may fill the first reads
+    while pos >= len(buffer) and not eof:
+        buffer = f.read(read_size)
+        eof = not buffer
+        pos = skip(buffer, 0).end()
+    if pos >= len(buffer) or buffer[pos] != '[':
+        raise ValueError("Invalid JSON format: expected a top-level array")
+    pos += 1
+    size = len(buffer)
+    # Whether the next token is an element (after '[' or ',') or a separator
+    expect_value = True
+    first = True
+
+    while True:
+        pos = skip(buffer, pos).end()
+        if pos >= size - 1 and not eof:
+            # Refill before a separator or value could be cut off by the end of the buffer
+            chunk = f.read(read_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            size = len(buffer)
+            continue
+        if pos >= size:
+            raise ValueError("Invalid JSON format: unexpected end of file inside the top-level array")
+
+        if not expect_value:
+            char = buffer[pos]
+            if char == ']':
+                return
+            if char != ',':
+                raise ValueError(f"Invalid JSON format: expected ',' or ']' between array elements, found {char!r}")
+            pos = skip(buffer, pos + 1).end()
+            expect_value = True
+            if pos >= size - 1 and not eof:
+                continue
+        elif first and buffer[pos] == ']':
+            return
+
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError as e:
+            if eof:
+                raise ValueError(f"Invalid JSON format: {e.msg}")
+            end = size
+        # A value reaching the end of the buffer may be cut short (e.g. a number), so it is decoded again with more text
+        if end >= size and not eof:
+            chunk = f.read(max(read_size, size - pos))
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            size = len(buffer)
+            continue
+        yield value
+        pos = end
+        expect_value = first = False
+
+
+def _cell(value):
+    # Lists (and objects json_normalize leaves inside them) become JSON text, which can be counted and compared
+    return json.dumps(value, default=str) if isinstance(value, (list, dict)) else value
+
+
+def _expand(frame, sep):
+    # Columns holding objects are replaced by one column per key, recursively;
+    # scalars sharing a column with objects stay under the column's own name
+    columns = {}
+    for col in frame.columns:
+        values = frame[col]
+        if values.dtype == object:
+            is_object = [isinstance(value, dict) and bool(value) for value in values]
+            if any(is_object):
+                if not all(is_object):
+                    scalars = values.where(~np.array(is_object))
+                    if scalars.notna().any():
+                        columns[col] = scalars.map(_cell)
+                nested = pd.DataFrame([value if flag else {} for value, flag in zip(values, is_object)],
+                                      index=frame.index)
+                for key, nested_values in _expand(nested, sep).items():
+                    columns[f'{col}{sep}{key}'] = nested_values
+                continue
+            values = values.map(_cell)
+        columns[col] = values
+    return pd.DataFrame(columns, index=frame.index)
+
+
+def flatten_batch(records, sep=FLATTEN_SEPARATOR):
+    """
+    One DataFrame from a list of records, nested objects flattened into
+    sep-joined columns ({'user': {'id': 1}} -> 'user.id', as pandas.json_normalize
+    names them); records that are not objects go in a 'value' column
+    The records are turned into a DataFrame first and only columns holding
+    objects are expanded, which is much faster than flattening record by record
+    """
+    if not all(isinstance(record, dict) for record in records):
+        records = [record if isinstance(record, dict) else {'value': record} for record in records]
+    return _expand(pd.DataFrame(records), sep)
+
+
+def is_date_column(name):
+    """Whether pandas.read_json would parse a column of this name as dates (its keep_default_dates rule)"""
+    name = str(name).rsplit(FLATTEN_SEPARATOR, 1)[-1].lower()
+    return name.endswith(('_at', '_time')) or name.startswith('timestamp') or name in ('modified', 'date', 'datetime')
+
+
+def _convert_dates(data):
+    for col in data.columns:
+        if is_date_column(col) and pd.api.types.is_string_dtype(data[col]):
+            try:
+                data[col] = pd.to_datetime(data[col], format='ISO8601')
+            except (ValueError, TypeError):
+                pass
+    return data
+
+
+def records_to_frame(records, batch_size=RECORD_BATCH_SIZE):
+    """
+    Flatten an iterator of records into a DataFrame batch by batch
+    Columns appear in the order first seen; a column missing from some
+    records is missing (NaN) there. ISO dates in date-named columns are
+    parsed, as pandas.read_json does
+    Each flattened batch is split into per-column pieces, and each column is
+    joined once at the end with its pieces released as it goes, so peak memory
+    is about the final frame plus one column rather than twice the frame
+    """
+    pieces = {}
+    rows = 0
+    batch = []
+    flattened = False
+
+    def split(batch):
+        nonlocal rows
+        frame = flatten_batch(batch)
+        positions = pd.RangeIndex(rows, rows + len(frame))
+        for col in frame.columns:
+            # Copied out of the batch's consolidated blocks, so those are freed with the batch
+            pieces.setdefault(col, []).append(frame[col].set_axis(positions).copy())
+        rows += len(frame)
+
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            split(batch)
+            flattened = True
+            batch = []
+    if batch or not flattened:
+        split(batch)
+
+    columns = {}
+    for col in list(pieces):
+        parts = pieces.pop(col)
+        column = parts[0] if len(parts) == 1 else pd.concat(parts)
+        # Batches without the column leave gaps, filled with NaN as pd.concat of the batches would
+        columns[col] = column if len(column) == rows else column.reindex(pd.RangeIndex(rows))
+    # copy=False keeps the columns as built instead of consolidating them into a second copy
+    data = pd.DataFrame(columns, index=pd.RangeIndex(rows), copy=False)
+    return _convert_dates(data)
+
+
+def read_json_records(file_path, lines=False, batch_size=RECORD_BATCH_SIZE):
+    """
+    Load a JSON Lines file (lines=True) or a top-level JSON array as a flat DataFrame
+    Records are parsed as the file is read and flattened batch_size at a time.
+    Files that are not valid UTF-8 are read again as latin-1
+    """
+    encoding = detect_encoding(read_sample(file_path, LAYOUT_SAMPLE_BYTES))
+    try:
+        return _read_records(file_path, 'utf-8-sig' if encoding.startswith('utf-8') else encoding, lines, batch_size)
+    except UnicodeDecodeError:
+        # The sample was valid UTF-8 but a later part of the file is not
+        return _read_records(file_path, 'latin-1', lines, batch_size)
+
+
+def _read_records(file_path, encoding, lines, batch_size):
+    with open_text(file_path, encoding) as f:
+        records = iter_json_lines(f) if lines else iter_json_array(f)
+        return records_to_frame(records, batch_size)
@@ -0,0 +1,435 @@
+# Stage instrumentation: structured stage logs and Prometheus metrics
+
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# Parent of every module logger; configure_metrics gives it a handler
+root_logger = logging.getLogger('data_analyzer')
+logger = logging.getLogger('data_analyzer.stages')
+metrics_logger = logging.getLogger('data_analyzer.metrics')
+
+# Histogram bucket upper bounds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+MEMORY_BUCKETS = tuple(float(2 ** i * 1024 ** 2) for i in range(13))  # 1MB .. 4GB
+
+# Interval between resident set size samples while a stage runs, in seconds
+MEMORY_SAMPLE_INTERVAL = 0.01
+
+# name -> (type, help) for every exported metric
+METRICS = {
+    'analyzer_stage_duration_seconds': ('histogram', 'Time spent in each processing stage'),
+    'analyzer_stage_memory_delta_bytes': ('histogram', 'Peak resident memory growth during each stage'),
+    'analyzer_stage_rows_total': ('counter', 'Rows processed by each stage'),
+    'analyzer_stage_output_bytes_total': ('counter', 'Bytes produced by each stage'),
+    'analyzer_cache_requests_total': ('counter', 'Result cache lookups by outcome'),
+    'analyzer_cache_shared_total': ('counter', 'Cache misses answered by a computation already in flight'),
+    'analyzer_upload_files_total': ('counter', 'Upload store events: new file stored, duplicate of a stored file, file evicted'),
+    'analyzer_cache_hit_ratio': ('gauge', 'Share of cache lookups that were hits'),
+    'analyzer_http_request_duration_seconds': ('histogram', 'HTTP request latency by endpoint'),
+    'analyzer_startup_seconds': ('gauge', 'Seconds from process start to each start-up milestone (slowest process)'),
+}
+
+
+def current_rss():
+    """Resident set size of this process in bytes (high-water mark where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Kilobytes on Linux, bytes on macOS
+        return usage if sys.platform == 'darwin' else usage * 1024
+
+
+def process_start_time():
+    """
+    Wall-clock time this process started (a forked process: when it was forked)
+    Read from /proc; elsewhere falls back to when this module was imported
+    """
+    try:
+        with open('/proc/self/stat') as f:
+            # The command name in parentheses may itself contain spaces
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open('/proc/stat') as f:
+            boot_time = next(int(line.split()[1]) for line in f if line.startswith('btime '))
+        return boot_time + int(fields[19]) / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError, StopIteration):
+        return _imported_at
+
+
+_imported_at = time.time()
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+class Registry:
+    """
+    Counters, histograms and gauges of one process
+    Series are keyed by (metric name, sorted label pairs); snapshots are plain
+    JSON so the registries of analysis worker processes can be merged. Merged
+    gauges keep the largest value
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.gauges = {}
+
+    def inc(self, name, labels, value=1):
+        key = (name, _label_key(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, labels, value, buckets):
+        key = (name, _label_key(labels))
+        with self.lock:
+            series = self.histograms.get(key)
+            if series is None:
+                series = self.histograms[key] = {'buckets': list(buckets), 'counts': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+            # Counts are cumulative, as Prometheus buckets are
+            for i, bound in enumerate(series['buckets']):
+                if value <= bound:
+                    series['counts'][i] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def set(self, name, labels, value):
+        with self.lock:
+            self.gauges[(name, _label_key(labels))] = value
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'counters': [[name, list(map(list, labels)), value] for (name, labels), value in self.counters.items()],
+                'histograms': [[name, list(map(list, labels)), dict(series, counts=list(series['counts']))]
+                               for (name, labels), series in self.histograms.items()],
+                'gauges': [[name, list(map(list, labels)), value] for (name, labels), value in self.gauges.items()]
+            }
+
+    def merge(self, snapshot):
+        """Add the series of another registry's snapshot"""
+        with self.lock:
+            for name, labels, value in snapshot['counters']:
+                key = (name, tuple(map(tuple, labels)))
+                self.counters[key] = self.counters.get(key, 0) + value
+            for name, labels, series in snapshot['histograms']:
+                key = (name, tuple(map(tuple, labels)))
+                mine = self.histograms.get(key)
+                if mine is None:
+                    self.histograms[key] = dict(series, counts=list(series['counts']))
+                else:
+                    mine['counts'] = [a + b for a, b in zip(mine['counts'], series['counts'])]
+                    mine['sum'] += series['sum']
+                    mine['count'] += series['count']
+            for name, labels, value in snapshot.get('gauges', []):
+                key = (name, tuple(map(tuple, labels)))
+                self.gauges[key] = max(self.gauges.get(key, value), value)
+
+
+registry = Registry()
+# Directory where each process keeps a snapshot of its registry (None: this process only)
+_snapshot_dir = None
+
+
+def _reset_after_fork():
+    # A forked worker must not report its parent's observations a second time
+    global registry
+    registry = Registry()
+    _sampler.reset()
+    _depth.value = 0
+
+
+def discard_observations():
+    """Forget the stages and requests recorded so far, e.g. those of a warm-up run that was not real traffic"""
+    with registry.lock:
+        registry.counters.clear()
+        registry.histograms.clear()
+    flush()
+
+
+def configure_metrics(snapshot_dir):
+    """
+    Share metrics between the web process and analysis workers through snapshot_dir
+    Snapshots of processes that are no longer running are discarded, and stage
+    and module logs go to stderr as one JSON object per line unless logging is configured
+    """
+    global _snapshot_dir
+    _snapshot_dir = snapshot_dir
+    os.makedirs(snapshot_dir, exist_ok=True)
+    for name in os.listdir(snapshot_dir):
+        pid = _snapshot_pid(name)
+        if pid is not None and not _is_running(pid):
+            try:
+                os.remove(os.path.join(snapshot_dir, name))
+            except OSError:
+                pass
+
+    if not root_logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        root_logger.addHandler(handler)
+        root_logger.setLevel(logging.INFO)
+        root_logger.propagate = False
+
+
+def _snapshot_pid(name):
+    stem, ext = os.path.splitext(name)
+    return int(stem) if ext == '.json' and stem.isdigit() else None
+
+
+def _is_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def flush():
+    """Write this process's snapshot so other processes can include it"""
+    if _snapshot_dir is None:
+        return
+    path = os.path.join(_snapshot_dir, f'{os.getpid()}.json')
+    tmp_path = f'{path}.{threading.get_ident()}.tmp'
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(registry.snapshot(), f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        log_event(metrics_logger, 'metrics_snapshot_failed', logging.WARNING, path=path, error=str(e))
+
+
+class _MemorySampler:
+    """One background thread sampling RSS while any stage is running, tracking each stage's peak"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.lock = threading.Lock()
+        self.active = set()
+        self.thread = None
+
+    def start(self, record):
+        with self.lock:
+            self.active.add(record)
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+
+    def stop(self, record):
+        with self.lock:
+            self.active.discard(record)
+
+    def _run(self):
+        while True:
+            time.sleep(MEMORY_SAMPLE_INTERVAL)
+            with self.lock:
+                if not self.active:
+                    self.thread = None
+                    return
+                records = list(self.active)
+            rss = current_rss()
+            for record in records:
+                record.peak_rss = max(record.peak_rss, rss)
+
+
+_sampler = _MemorySampler()
+os.register_at_fork(after_in_child=_reset_after_fork)
+_depth = threading.local()
+
+
+class StageRecord:
+    """What a stage reports; the code inside the stage fills in rows, columns and output_bytes"""
+
+    def __init__(self, name, detail):
+        self.name = name
+        self.detail = detail
+        self.rows = None
+        self.columns = None
+        self.output_bytes = None
+        self.start_rss = self.peak_rss = current_rss()
+
+    def frame(self, data):
+        """Record the shape of a DataFrame the stage processed; returns it unchanged"""
+        self.rows, self.columns = data.shape
+        return data
+
+
+@contextmanager
+def stage(name, detail=None):
+    """
+    Time a processing stage and record its peak memory growth
+    Emits one structured log line and updates the stage metrics, also when the
+    stage raises (status 'error'). detail distinguishes variants such as the
+    loader attempt or the chart being built
+    """
+    record = StageRecord(name, detail)
+    _depth.value = getattr(_depth, 'value', 0) + 1
+    _sampler.start(record)
+    started = time.perf_counter()
+    status = 'ok'
+    error = None
+    try:
+        yield record
+    except BaseException as e:
+        status = 'error'
+        error = str(e)
+        raise
+    finally:
+        duration = time.perf_counter() - started
+        _sampler.stop(record)
+        memory_delta = max(0, max(record.peak_rss, current_rss()) - record.start_rss)
+        _depth.value -= 1
+
+        labels = {'stage': name, 'detail': detail}
+        registry.observe('analyzer_stage_duration_seconds', dict(labels, status=status), duration, DURATION_BUCKETS)
+        registry.observe('analyzer_stage_memory_delta_bytes', labels, memory_delta, MEMORY_BUCKETS)
+        if record.rows is not None:
+            registry.inc('analyzer_stage_rows_total', labels, record.rows)
+        if record.output_bytes is not None:
+            registry.inc('analyzer_stage_output_bytes_total', labels, record.output_bytes)
+
+        entry = {
+            'timestamp': datetime.now().isoformat(),
+            'event': 'stage',
+            'stage': name,
+            'detail': detail,
+            'status': status,
+            'duration_ms': round(duration * 1000, 3),
+            'memory_delta_bytes': memory_delta,
+            'rows': record.rows,
+            'columns': record.columns,
+            'output_bytes': record.output_bytes,
+            'pid': os.getpid()
+        }
+        if error is not None:
+            entry['error'] = error
+        logger.info(json.dumps({k: v for k, v in entry.items() if v is not None}, default=str))
+
+        # Only whole top-level stages are flushed, which keeps snapshot writes rare
+        if _depth.value == 0:
+            flush()
+
+
+def count_cache(cache, hit):
+    """Record one cache lookup"""
+    registry.inc('analyzer_cache_requests_total', {'cache': cache, 'result': 'hit' if hit else 'miss'})
+
+
+def count_shared(cache):
+    """Record a miss that waited for another run of the same computation instead of repeating it"""
+    registry.inc('analyzer_cache_shared_total', {'cache': cache})
+
+
+def count_upload(event):
+    """Record an upload store event: 'stored', 'deduplicated' or 'evicted'"""
+    registry.inc('analyzer_upload_files_total', {'event': event})
+
+
+def observe_request(endpoint, method, status, duration):
+    """Record the latency of one HTTP request"""
+    registry.observe('analyzer_http_request_duration_seconds',
+                     {'endpoint': endpoint, 'method': method, 'status': status}, duration, DURATION_BUCKETS)
+
+
+def log_event(module_logger, event, level=logging.INFO, **fields):
+    """Log one event of a module as a JSON line, like the stage logs"""
+    entry = {'timestamp': datetime.now().isoformat(), 'event': event, **fields, 'pid': os.getpid()}
+    module_logger.log(level, json.dumps({k: v for k, v in entry.items() if v is not None}, default=str))
+
+
+def record_startup(milestone, seconds):
+    """Record how long this process took to reach a start-up milestone and log it"""
+    registry.set('analyzer_startup_seconds', {'milestone': milestone}, seconds)
+    logger.info(json.dumps({
+        'timestamp': datetime.now().isoformat(),
+        'event': 'startup',
+        'milestone': milestone,
+        'seconds': round(seconds, 3),
+        'pid': os.getpid()
+    }))
+    flush()
+
+
+def _collect():
+    # This process's live registry plus the latest snapshot of every other process
+    merged = Registry()
+    merged.merge(registry.snapshot())
+    if _snapshot_dir is not None and os.path.isdir(_snapshot_dir):
+        for name in os.listdir(_snapshot_dir):
+            pid = _snapshot_pid(name)
+            if pid is None or pid == os.getpid():
+                continue
+            try:
+                with open(os.path.join(_snapshot_dir, name)) as f:
+                    merged.merge(json.load(f))
+            except (OSError, ValueError):
+                continue
+    return merged
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_metrics():
+    """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+    merged = _collect()
+
+    # Hit ratio per cache, derived from the lookup counters
+    lookups = {}
+    for (name, labels), value in merged.counters.items():
+        if name == 'analyzer_cache_requests_total':
+            label_map = dict(labels)
+            hits, total = lookups.get(label_map['cache'], (0, 0))
+            lookups[label_map['cache']] = (hits + (value if label_map['result'] == 'hit' else 0), total + value)
+    gauges = dict(merged.gauges)
+    gauges.update({('analyzer_cache_hit_ratio', (('cache', cache),)): hits / total
+                   for cache, (hits, total) in lookups.items() if total})
+
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        if kind == 'histogram':
+            series = sorted((labels, s) for (n, labels), s in merged.histograms.items() if n == name)
+        elif kind == 'counter':
+            series = sorted((labels, v) for (n, labels), v in merged.counters.items() if n == name)
+        else:
+            series = sorted((labels, v) for (n, labels), v in gauges.items() if n == name)
+        if not series:
+            continue
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in series:
+            if kind == 'histogram':
+                for bound, count in zip(value['buckets'], value['counts']):
+                    lines.append(f'{name}_bucket{_format_labels(labels, [("le", repr(bound))])} {count}')
+                lines.append(f'{name}_bucket{_format_labels(labels, [("le", "+Inf")])} {value["count"]}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(value["sum"])}')
+                lines.append(f'{name}_count{_format_labels(labels)} {value["count"]}')
+            else:
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+    return '\n'.join(lines) + '\n'
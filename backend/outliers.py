@@ -0,0 +1,161 @@
+# Vectorized outlier detection over the numeric block: IQR fences, z-scores and MAD
+
+import numpy as np
+import pandas as pd
+
+OUTLIER_METHODS = ('iqr', 'zscore', 'mad')
+
+# Tukey fences at this many interquartile ranges beyond the quartiles
+IQR_FACTOR = 1.5
+# Standard deviations from the mean
+ZSCORE_THRESHOLD = 3.0
+# Modified z-score cut-off (Iglewicz and Hoaglin); the MAD of a normal
+# distribution is 0.6745 standard deviations
+MAD_THRESHOLD = 3.5
+MAD_SCALE = 0.6745
+# When more than half of a column is one value its MAD is 0; the mean absolute
+# deviation, scaled to match the MAD of a normal distribution, is used instead
+MEAN_AD_SCALE = 1.2533
+
+# Row labels listed per column and method for drill-down
+MAX_OUTLIER_ROWS = 100
+
+# Columns are converted to floats this many cells at a time, bounding the
+# working copy (and the sorts made of it) on wide or long frames
+CHUNK_CELLS = 4_000_000
+
+
+def sorted_quantiles(sorted_values, counts, q):
+    """
+    Quantile q of every column of a column-sorted 2-D array with NaNs last
+    Linear interpolation between order statistics, as numpy.nanquantile and
+    pandas compute it; NaN for columns with no values
+    """
+    if len(sorted_values) == 0:
+        return np.full(sorted_values.shape[1], np.nan)
+    position = (counts - 1) * q
+    lower = np.clip(np.floor(position).astype(np.int64), 0, None)
+    upper = np.clip(np.minimum(lower + 1, counts - 1), 0, None)
+    columns = np.arange(sorted_values.shape[1])
+    low_values = sorted_values[lower, columns]
+    high_values = sorted_values[upper, columns]
+    with np.errstate(invalid='ignore'):
+        result = low_values + (position - lower) * (high_values - low_values)
+    return np.where(counts > 0, result, np.nan)
+
+
+def _column_sums(values, missing):
+    # Per-column sums skipping NaN; missing is None when the block has none
+    return values.sum(axis=0) if missing is None else np.where(missing, 0.0, values).sum(axis=0)
+
+
+def _bounds(values):
+    # (lower, upper) per method for every column of a 2-D float array
+    missing = np.isnan(values)
+    counts = values.shape[0] - missing.sum(axis=0)
+    if counts.sum() == values.size:
+        missing = None
+    ordered = np.sort(values, axis=0)
+    q1, median, q3 = (sorted_quantiles(ordered, counts, q) for q in (0.25, 0.5, 0.75))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        iqr = q3 - q1
+        mean = _column_sums(values, missing) / counts
+        # ordered is reused as scratch space for the deviations from here on
+        deviations = np.subtract(values, mean, out=ordered)
+        std = np.sqrt(_column_sums(np.square(deviations, out=deviations), missing) / (counts - 1))
+
+        absolute = np.abs(np.subtract(values, median, out=ordered), out=ordered)
+        mean_ad = _column_sums(absolute, missing) / counts * MEAN_AD_SCALE
+        absolute.sort(axis=0)
+        mad = sorted_quantiles(absolute, counts, 0.5) / MAD_SCALE
+        scale = np.where(mad > 0, mad, mean_ad)
+        # A constant column has no outliers by any measure
+        scale = np.where(scale > 0, scale, np.inf)
+        std = np.where(std > 0, std, np.inf)
+
+        return {
+            'iqr': (q1 - IQR_FACTOR * iqr, q3 + IQR_FACTOR * iqr),
+            'zscore': (mean - ZSCORE_THRESHOLD * std, mean + ZSCORE_THRESHOLD * std),
+            'mad': (median - MAD_THRESHOLD * scale, median + MAD_THRESHOLD * scale)
+        }, counts
+
+
+def _capped_rows(mask, counts, max_rows):
+    # Positions of the first max_rows True entries of each column of a 2-D mask
+    return [np.flatnonzero(mask[:, i])[:max_rows] if count else None for i, count in enumerate(counts)]
+
+
+def _labels(index, positions):
+    # Index labels at positions; a default RangeIndex needs no lookup
+    if isinstance(index, pd.RangeIndex):
+        return (index.start + index.step * positions).tolist()
+    return index[positions].tolist()
+
+
+def outlier_report(block, methods=OUTLIER_METHODS, max_rows=MAX_OUTLIER_ROWS):
+    """
+    Outliers of every column of a numeric DataFrame by each method
+    iqr: outside Q1 - 1.5 IQR .. Q3 + 1.5 IQR; zscore: more than 3 standard
+    deviations from the mean; mad: modified z-score above 3.5
+    Columns are processed as 2-D arrays, many at once, instead of one by one.
+    Returns {method: {'counts', 'lower', 'upper': Series by column, 'rows':
+    {column: index labels of up to max_rows outliers}}} plus 'values', the
+    non-null count of each column
+    """
+    unknown = [method for method in methods if method not in OUTLIER_METHODS]
+    if unknown:
+        raise ValueError(f"Unsupported outlier method '{unknown[0]}'. Use one of {', '.join(OUTLIER_METHODS)}")
+
+    num_rows, num_columns = block.shape
+    found = {method: {'counts': np.zeros(num_columns, dtype=np.int64), 'lower': np.full(num_columns, np.nan),
+                      'upper': np.full(num_columns, np.nan), 'rows': [None] * num_columns} for method in methods}
+    values_count = np.zeros(num_columns, dtype=np.int64)
+
+    step = max(1, CHUNK_CELLS // max(num_rows, 1))
+    for start in range(0, num_columns, step):
+        stop = min(start + step, num_columns)
+        values = block.iloc[:, start:stop].to_numpy(dtype=np.float64, na_value=np.nan)
+        bounds, values_count[start:stop] = _bounds(values)
+        for method in methods:
+            lower, upper = bounds[method]
+            # NaN compares False, so missing values and columns without bounds never count
+            mask = (values < lower) | (values > upper)
+            result = found[method]
+            counts = mask.sum(axis=0)
+            result['counts'][start:stop] = counts
+            result['lower'][start:stop] = lower
+            result['upper'][start:stop] = upper
+            result['rows'][start:stop] = _capped_rows(mask, counts, max_rows)
+
+    report = {'values': pd.Series(values_count, index=block.columns)}
+    for method, result in found.items():
+        report[method] = {
+            'counts': pd.Series(result['counts'], index=block.columns),
+            'lower': pd.Series(result['lower'], index=block.columns),
+            'upper': pd.Series(result['upper'], index=block.columns),
+            'rows': {col: _labels(block.index, rows) for col, rows in zip(block.columns, result['rows']) if rows is not None}
+        }
+    return report
+
+
+def _finite(value):
+    return float(value) if np.isfinite(value) else None
+
+
+def report_to_dict(report, method):
+    """JSON-ready summary of one method of an outlier_report, columns with the most outliers first"""
+    result = report[method]
+    columns = []
+    for col, count in result['counts'].items():
+        values = int(report['values'][col])
+        columns.append({
+            'column': str(col),
+            'outliers': int(count),
+            'percentage': round(count / values * 100, 2) if values else 0.0,
+            'lower': _finite(result['lower'][col]),
+            'upper': _finite(result['upper'][col]),
+            'rows': result['rows'].get(col, [])
+        })
+    columns.sort(key=lambda item: -item['outliers'])
+    return {'method': method, 'columns': columns}
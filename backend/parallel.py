@@ -0,0 +1,152 @@
+# Multi-core column-parallel profiling
+
+import math
+import os
+import threading
+import warnings
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+# Frames smaller than this many numeric cells are profiled serially; below it
+# the cost of starting workers and copying into shared memory outweighs the gain
+PARALLEL_MIN_CELLS = 5_000_000
+
+# Same layout as DatasetProfile.numeric_stats
+STAT_ROWS = ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max', 'skew']
+
+_pool = None
+_pool_workers = None
+_pool_lock = threading.Lock()
+
+
+def default_workers():
+    """Worker count used when none is configured: one per CPU"""
+    return os.cpu_count() or 1
+
+
+def should_parallelize(rows, columns, workers):
+    """True when a block is large enough for the process pool to pay off"""
+    return workers > 1 and columns > 1 and rows * columns >= PARALLEL_MIN_CELLS
+
+
+def _get_pool(workers):
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers)
+            _pool_workers = workers
+        return _pool
+
+
+def _attach(name):
+    # The parent creates and unlinks every segment; pool workers share its
+    # resource tracker, so attaching here does not change who cleans up
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # track was added in Python 3.13
+        return shared_memory.SharedMemory(name=name)
+
+
+def column_block_stats(values):
+    """
+    Statistics for every column of a 2-D float array (NaN = missing)
+    Returns an array with one row per STAT_ROWS entry; matches what pandas
+    reports for count/mean/std/min/quantiles/max/skew
+    """
+    mask = np.isnan(values)
+    count = (~mask).sum(axis=0).astype(float)
+    with np.errstate(invalid='ignore', divide='ignore'), warnings.catch_warnings():
+        # nanmin/nanquantile warn on all-NaN columns; those simply yield NaN
+        warnings.simplefilter('ignore', RuntimeWarning)
+        total = np.where(mask, 0.0, values).sum(axis=0)
+        mean = total / count
+        adjusted = np.where(mask, 0.0, values - mean)
+        adjusted2 = adjusted * adjusted
+        m2 = adjusted2.sum(axis=0)
+        m3 = (adjusted2 * adjusted).sum(axis=0)
+        std = np.sqrt(m2 / (count - 1))
+        std[count < 2] = np.nan
+
+        # Same skew estimator and float-error clean-up as pandas nanskew
+        m2 = np.where(np.abs(m2) < 1e-14, 0.0, m2)
+        m3 = np.where(np.abs(m3) < 1e-14, 0.0, m3)
+        skew = (count * (count - 1) ** 0.5 / (count - 2)) * (m3 / m2 ** 1.5)
+        skew = np.where(m2 == 0, 0.0, skew)
+        skew[count < 3] = np.nan
+
+        minimum = np.nanmin(values, axis=0)
+        maximum = np.nanmax(values, axis=0)
+        q1, median, q3 = np.nanquantile(values, [0.25, 0.5, 0.75], axis=0)
+
+    return np.vstack([count, mean, std, minimum, q1, median, q3, maximum, skew])
+
+
+def _stats_worker(shm_name, shape, start, stop):
+    shm = _attach(shm_name)
+    try:
+        block = np.ndarray(shape, dtype=np.float64, buffer=shm.buf, order='F')
+        return start, column_block_stats(block[:, start:stop])
+    finally:
+        shm.close()
+
+
+def parallel_numeric_stats(block, workers=None):
+    """
+    Per-column statistics for a numeric DataFrame, computed across a process pool
+    The block is copied once into shared memory in column-major order, and each
+    worker reads its own range of columns from it without pickling any data.
+    Returns a DataFrame indexed by STAT_ROWS with one column per input column
+    """
+    workers = workers or default_workers()
+    rows, columns = block.shape
+    if not should_parallelize(rows, columns, workers):
+        return pd.DataFrame(column_block_stats(block.to_numpy(dtype=float, na_value=np.nan)),
+                            index=STAT_ROWS, columns=block.columns)
+
+    shm = shared_memory.SharedMemory(create=True, size=max(rows * columns * 8, 1))
+    try:
+        shared = np.ndarray((rows, columns), dtype=np.float64, buffer=shm.buf, order='F')
+        for i, col in enumerate(block.columns):
+            shared[:, i] = block[col].to_numpy(dtype=float, na_value=np.nan)
+
+        # Several ranges per worker keep the pool busy when columns differ in cost
+        step = max(1, math.ceil(columns / (workers * 4)))
+        pool = _get_pool(workers)
+        futures = [
+            pool.submit(_stats_worker, shm.name, (rows, columns), start, min(start + step, columns))
+            for start in range(0, columns, step)
+        ]
+        result = np.empty((len(STAT_ROWS), columns))
+        for future in futures:
+            start, stats = future.result()
+            result[:, start:start + stats.shape[1]] = stats
+        del shared
+    finally:
+        shm.close()
+        shm.unlink()
+
+    return pd.DataFrame(result, index=STAT_ROWS, columns=block.columns)
+
+
+def parallel_value_counts(data, columns, workers=None):
+    """
+    Non-null value counts for several columns at once
+    Threads are used here: Arrow-backed string columns count values in kernels
+    that release the GIL, and threads read the columns without copying them
+    """
+    workers = workers or default_workers()
+
+    def count(col):
+        counts = data[col].value_counts()
+        return col, counts[counts > 0]
+
+    if workers <= 1 or len(columns) <= 1:
+        return dict(count(col) for col in columns)
+    with ThreadPoolExecutor(max_workers=min(workers, len(columns))) as pool:
+        return dict(pool.map(count, columns))
@@ -0,0 +1,198 @@
+# Shared per-column profile computed once per dataset
+
+import numpy as np
+import pandas as pd
+from parallel import should_parallelize, parallel_numeric_stats, parallel_value_counts
+from duplicates import duplicate_report
+from correlation import correlation_summary
+from outliers import outlier_report
+
+# Values sampled from an object column to estimate its memory use
+MEMORY_SAMPLE_SIZE = 10_000
+
+
+def column_kind(dtype):
+    """
+    Classify a dtype the way analyze_data groups columns
+    Returns 'numeric', 'categorical', 'datetime' or None (e.g. booleans)
+    """
+    if pd.api.types.is_bool_dtype(dtype):
+        return None
+    if pd.api.types.is_numeric_dtype(dtype):
+        return 'numeric'
+    if isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+        return 'categorical'
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return 'datetime'
+    return None
+
+
+def column_memory(values):
+    """
+    Bytes held by a column's values
+    Only object columns need a per-value scan; for those it is estimated from a sample
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Counted from the category values themselves: memory_usage would add the
+        # categories' hash table once a lookup has built it, and their buffer layout
+        categories = values.dtype.categories
+        if pd.api.types.is_string_dtype(categories.dtype):
+            # String bytes plus 64-bit offsets
+            size = sum(len(str(v).encode('utf-8')) for v in categories) + 8 * (len(categories) + 1)
+        else:
+            size = pd.Series(categories).memory_usage(deep=True, index=False)
+        return int(values.cat.codes.to_numpy().nbytes + size)
+    if pd.api.types.is_object_dtype(values.dtype) and len(values) > MEMORY_SAMPLE_SIZE:
+        sample = values.iloc[np.random.default_rng(0).choice(len(values), MEMORY_SAMPLE_SIZE, replace=False)]
+        return int(sample.memory_usage(deep=True, index=False) * len(values) / MEMORY_SAMPLE_SIZE)
+    return int(values.memory_usage(deep=True, index=False))
+
+
+def default_memory(values):
+    """
+    Estimated bytes the column would take with the dtypes of a plain pd.read_csv
+    (64-bit numbers and Arrow strings) instead of downcast or category dtypes
+    """
+    dtype = values.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy()
+        counts = np.bincount(codes[codes >= 0], minlength=len(dtype.categories))
+        lengths = np.array([len(str(v).encode('utf-8')) for v in dtype.categories], dtype=np.int64)
+        # String bytes plus 64-bit offsets and a validity bitmap
+        return int(lengths @ counts) + 8 * (len(values) + 1) + (len(values) + 7) // 8
+    if isinstance(dtype, np.dtype) and dtype.kind in 'iuf' and dtype.itemsize < 8:
+        return 8 * len(values)
+    return column_memory(values)
+
+
+def memory_footprint(data):
+    """Bytes used by a DataFrame's columns and index"""
+    return sum(column_memory(data.iloc[:, i]) for i in range(data.shape[1])) + int(data.index.memory_usage())
+
+
+def memory_saved(data):
+    """Bytes saved by narrow numeric and category dtypes compared to default ones"""
+    return sum(default_memory(data.iloc[:, i]) - column_memory(data.iloc[:, i]) for i in range(data.shape[1]))
+
+
+class DatasetProfile:
+    """
+    Column-level statistics for one DataFrame, each computed at most once
+    analyze_data, generate_visualizations and generate_insights all read from
+    the same profile instead of rescanning the frame for null masks, quantiles,
+    value counts or correlations
+    workers > 1 lets large frames be profiled column-parallel (see parallel.py)
+    """
+
+    def __init__(self, data, workers=1):
+        self.data = data
+        self.shape = data.shape
+        self.workers = workers
+
+        # One pass over the dtypes replaces repeated select_dtypes calls
+        self.numeric_columns = []
+        self.categorical_columns = []
+        self.datetime_columns = []
+        for col, dtype in data.dtypes.items():
+            kind = column_kind(dtype)
+            if kind == 'numeric':
+                self.numeric_columns.append(col)
+            elif kind == 'categorical':
+                self.categorical_columns.append(col)
+            elif kind == 'datetime':
+                self.datetime_columns.append(col)
+
+        self.null_counts = data.isnull().sum()
+        self.total_missing = int(self.null_counts.sum())
+
+        self._numeric_stats = None
+        self._outliers = None
+        self._value_counts = {}
+        self._correlations = {}
+        self._duplicates = None
+
+    @property
+    def numeric(self):
+        """
+        The numeric columns as one DataFrame block
+        Downcast float32 columns are widened again so statistics accumulate in float64
+        """
+        block = self.data[self.numeric_columns]
+        narrow = [col for col, dtype in block.dtypes.items() if dtype == np.float32]
+        if narrow:
+            block = block.astype({col: np.float64 for col in narrow})
+        return block
+
+    @property
+    def numeric_stats(self):
+        """
+        DataFrame of per-column statistics for the numeric block, indexed by
+        count, mean, std, min, 25%, 50%, 75%, max and skew
+        """
+        if self._numeric_stats is None:
+            block = self.numeric
+            if should_parallelize(len(block), len(block.columns), self.workers):
+                self._numeric_stats = parallel_numeric_stats(block, self.workers)
+                return self._numeric_stats
+            quartiles = block.quantile([0.25, 0.5, 0.75])
+            quartiles.index = ['25%', '50%', '75%']
+            self._numeric_stats = pd.concat([
+                block.count().to_frame('count').T,
+                block.mean().to_frame('mean').T,
+                block.std().to_frame('std').T,
+                block.min().to_frame('min').T,
+                quartiles,
+                block.max().to_frame('max').T,
+                block.skew().to_frame('skew').T
+            ])
+        return self._numeric_stats
+
+    @property
+    def outliers(self):
+        """IQR, z-score and MAD outlier counts, bounds and row labels per numeric column (see outlier_report)"""
+        if self._outliers is None:
+            self._outliers = outlier_report(self.numeric)
+        return self._outliers
+
+    @property
+    def outlier_counts(self):
+        """Number of values outside the 1.5 * IQR fences, per numeric column"""
+        return self.outliers['iqr']['counts']
+
+    def count_values(self, columns):
+        """Compute the value counts of several columns up front, in parallel for large frames"""
+        pending = [col for col in columns if col not in self._value_counts]
+        if should_parallelize(self.shape[0], len(pending), self.workers):
+            self._value_counts.update(parallel_value_counts(self.data, pending, self.workers))
+
+    def value_counts(self, col):
+        """Non-null value counts for a column, most frequent first"""
+        if col not in self._value_counts:
+            counts = self.data[col].value_counts()
+            # Unused categories of a categorical dtype show up with a zero count
+            self._value_counts[col] = counts[counts > 0]
+        return self._value_counts[col]
+
+    def mode(self, col):
+        """Most frequent non-null value, ties broken by sort order like Series.mode"""
+        counts = self.value_counts(col)
+        if len(counts) == 0:
+            return None
+        candidates = counts.index[counts == counts.iloc[0]]
+        try:
+            return sorted(candidates)[0]
+        except TypeError:
+            return candidates[0]
+
+    @property
+    def duplicates(self):
+        """Full-row duplicate count and largest duplicate groups (see duplicate_report)"""
+        if self._duplicates is None:
+            self._duplicates = duplicate_report(self.data)
+        return self._duplicates
+
+    def correlations(self, method='pearson'):
+        """Strongest column pairs and the reduced heatmap matrix (see correlation_summary)"""
+        if method not in self._correlations:
+            self._correlations[method] = correlation_summary(self.numeric, method=method, workers=self.workers)
+        return self._correlations[method]
@@ -0,0 +1,189 @@
+# Streaming report export (Markdown, JSON, self-contained HTML)
+
+import html
+import json
+from datetime import datetime
+
+REPORT_FORMATS = {
+    'md': ('text/markdown', 'md'),
+    'json': ('application/json', 'json'),
+    'html': ('text/html', 'html'),
+}
+
+# Pieces are collected into chunks of about this many characters before being sent
+REPORT_CHUNK_SIZE = 64 * 1024
+
+
+def report_summary(filename, analysis):
+    """The structured report: file info, data summary, statistics and insights"""
+    insights = analysis.get('insights', {})
+    return {
+        'file_info': {
+            'filename': filename,
+            'analysis_date': datetime.now().isoformat(),
+            'dataset_shape': analysis['shape'],
+            'total_columns': analysis['shape'][1],
+            'total_rows': analysis['shape'][0]
+        },
+        'data_summary': {
+            'columns': analysis['columns'],
+            'data_types': analysis['dtypes'],
+            'missing_values': analysis['missing_values'],
+            'data_quality': analysis['data_quality']
+        },
+        'statistical_summary': analysis['basic_stats'],
+        'insights': insights,
+        'recommendations': insights.get('recommendations', []),
+        'unavailable': analysis.get('unavailable', {})
+    }
+
+
+def _json_chunks(value, indent=None):
+    # iterencode yields the document piece by piece instead of building one string
+    return json.JSONEncoder(indent=indent, default=str).iterencode(value)
+
+
+def buffered(pieces, size=REPORT_CHUNK_SIZE):
+    """Join small string pieces into chunks of about size characters"""
+    buffer = []
+    length = 0
+    for piece in pieces:
+        buffer.append(piece)
+        length += len(piece)
+        if length >= size:
+            yield ''.join(buffer)
+            buffer = []
+            length = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def markdown_report(filename, analysis):
+    """Yield the Markdown report section by section"""
+    yield f"# Data Analysis Report for {filename}\n"
+    yield f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
+    yield "## Dataset Overview\n"
+    yield f"- File: {filename}\n"
+    yield f"- Shape: {analysis['shape'][0]} rows × {analysis['shape'][1]} columns\n"
+    yield f"- Missing Values: {analysis['total_missing']}\n"
+    yield f"- Data Quality: {analysis['data_quality']['completeness']:.2f}% complete\n\n"
+
+    yield "## Column Information\n"
+    for col in analysis['columns']:
+        yield f"- {col}: {analysis['dtypes'][col]} ({analysis['missing_values'][col]} missing values)\n"
+
+    if analysis['basic_stats']:
+        yield "\n## Statistical Summary\n"
+        for col, stats in analysis['basic_stats'].items():
+            yield f"\n### {col}\n"
+            for stat_name, stat_value in stats.items():
+                yield f"- {stat_name}: {stat_value:.4f}\n"
+
+    insights = analysis.get('insights')
+    if insights:
+        for key, heading in (('data_quality', 'Data Quality Insights'), ('patterns', 'Data Patterns'),
+                             ('recommendations', 'Recommendations')):
+            if insights.get(key):
+                yield f"\n## {heading}\n"
+                for item in insights[key]:
+                    yield f"- {item}\n"
+
+    if analysis.get('unavailable'):
+        yield "\n## Not Available\n"
+        for reason in analysis['unavailable'].values():
+            yield f"- {reason}\n"
+
+    yield "\n\n## Raw Analysis Data (JSON)\n```json\n"
+    yield from _json_chunks(report_summary(filename, analysis), indent=2)
+    yield "\n```"
+
+
+def json_report(filename, analysis):
+    """Yield the structured report as one JSON document"""
+    yield from _json_chunks(report_summary(filename, analysis), indent=2)
+
+
+def _html_list(items):
+    yield "<ul>"
+    for item in items:
+        yield f"<li>{html.escape(str(item))}</li>"
+    yield "</ul>"
+
+
+def _script_json(text):
+    # Keeps a '</script>' inside chart data from ending the script element
+    return text.replace('</', '<\\/')
+
+
+HTML_STYLE = """
+body { font-family: -apple-system, 'Segoe UI', Roboto, sans-serif; margin: 2rem auto; max-width: 1100px; color: #1f2937; }
+h1, h2 { color: #111827; }
+table { border-collapse: collapse; margin: 1rem 0; width: 100%; }
+th, td { border: 1px solid #e5e7eb; padding: 0.4rem 0.6rem; text-align: left; font-size: 0.9rem; }
+th { background: #f3f4f6; }
+.chart { margin: 1.5rem 0; min-height: 350px; }
+"""
+
+
+def html_report(filename, analysis, charts=(), plotly_js=''):
+    """
+    Yield a self-contained HTML report
+    charts is an iterable of (title, Plotly figure JSON) pairs consumed one at a
+    time, and plotly_js the library source inlined so the file renders offline
+    """
+    name = html.escape(filename)
+    yield f"<!DOCTYPE html>\n<html lang=\"en\">\n<head>\n<meta charset=\"UTF-8\">\n<title>Analysis Report - {name}</title>\n"
+    yield f"<style>{HTML_STYLE}</style>\n"
+    if plotly_js:
+        yield "<script type=\"text/javascript\">"
+        yield plotly_js
+        yield "</script>\n"
+    yield "</head>\n<body>\n"
+    yield f"<h1>Data Analysis Report for {name}</h1>\n"
+    yield f"<p>Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>\n"
+
+    yield "<h2>Dataset Overview</h2>\n<ul>"
+    yield f"<li>Shape: {analysis['shape'][0]} rows × {analysis['shape'][1]} columns</li>"
+    yield f"<li>Missing Values: {analysis['total_missing']}</li>"
+    yield f"<li>Data Quality: {analysis['data_quality']['completeness']:.2f}% complete</li></ul>\n"
+
+    yield "<h2>Column Information</h2>\n<table><tr><th>Column</th><th>Type</th><th>Missing</th></tr>"
+    for col in analysis['columns']:
+        yield (f"<tr><td>{html.escape(str(col))}</td><td>{html.escape(analysis['dtypes'][col])}</td>"
+               f"<td>{analysis['missing_values'][col]}</td></tr>")
+    yield "</table>\n"
+
+    if analysis['basic_stats']:
+        stat_names = list(next(iter(analysis['basic_stats'].values())))
+        yield "<h2>Statistical Summary</h2>\n<table><tr><th>Column</th>"
+        yield ''.join(f"<th>{html.escape(stat)}</th>" for stat in stat_names)
+        yield "</tr>"
+        for col, stats in analysis['basic_stats'].items():
+            yield f"<tr><td>{html.escape(str(col))}</td>"
+            yield ''.join(f"<td>{stats[stat]:.4f}</td>" for stat in stat_names)
+            yield "</tr>"
+        yield "</table>\n"
+
+    insights = analysis.get('insights')
+    if insights:
+        for key, heading in (('data_quality', 'Data Quality Insights'), ('patterns', 'Data Patterns'),
+                             ('recommendations', 'Recommendations')):
+            if insights.get(key):
+                yield f"<h2>{heading}</h2>\n"
+                yield from _html_list(insights[key])
+
+    if analysis.get('unavailable'):
+        yield "<h2>Not Available</h2>\n"
+        yield from _html_list(analysis['unavailable'].values())
+
+    first = True
+    for i, (title, figure_json) in enumerate(charts):
+        if first:
+            yield "<h2>Visualizations</h2>\n"
+            first = False
+        yield f"<h3>{html.escape(title)}</h3>\n<div id=\"chart-{i}\" class=\"chart\"></div>\n"
+        yield f"<script type=\"text/javascript\">(function () {{ var fig = "
+        yield _script_json(figure_json)
+        yield f"; Plotly.newPlot('chart-{i}', fig.data, fig.layout, {{responsive: true}}); }})();</script>\n"
+
+    yield "</body>\n</html>\n"
@@ -0,0 +1,147 @@
+# Row sampling and error bounds for approximate analysis
+
+import math
+
+import numpy as np
+
+# Rows profiled in fast mode; large enough for ~1% error on means and rates
+DEFAULT_SAMPLE_SIZE = 50_000
+
+# Two-sided standard normal critical values for the supported confidence levels
+Z_SCORES = {0.90: 1.6449, 0.95: 1.9600, 0.99: 2.5758}
+
+
+def sample_positions(population_size, sample_size, seed=0):
+    """Sorted row positions of a uniform sample without replacement"""
+    rng = np.random.default_rng(seed)
+    return np.sort(rng.choice(population_size, size=sample_size, replace=False))
+
+
+def sample_rows(data, sample_size, seed=0):
+    """Draw a uniform random sample of rows"""
+    if len(data) <= sample_size:
+        return data
+    return data.iloc[sample_positions(len(data), sample_size, seed)]
+
+
+def _bounds(estimate, low, high):
+    return {'estimate': float(estimate), 'low': float(low), 'high': float(high)}
+
+
+def mean_interval(values, population_size, z):
+    """Normal-approximation interval for a mean, with finite population correction"""
+    n = len(values)
+    mean = float(values.mean())
+    if n < 2:
+        return _bounds(mean, mean, mean)
+    fpc = math.sqrt(max(population_size - n, 0) / max(population_size - 1, 1))
+    margin = z * float(values.std(ddof=1)) / math.sqrt(n) * fpc
+    return _bounds(mean, mean - margin, mean + margin)
+
+
+def quantile_interval(sorted_values, q, z):
+    """Distribution-free interval for a quantile from order statistics of the sample"""
+    n = len(sorted_values)
+    estimate = float(np.quantile(sorted_values, q))
+    spread = z * math.sqrt(n * q * (1 - q))
+    low = int(max(math.floor(n * q - spread), 0))
+    high = int(min(math.ceil(n * q + spread), n - 1))
+    return _bounds(estimate, sorted_values[low], sorted_values[high])
+
+
+def proportion_interval(successes, n, z):
+    """Wilson score interval for a proportion"""
+    if n == 0:
+        return _bounds(0.0, 0.0, 0.0)
+    p = successes / n
+    denominator = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+    return _bounds(p, max(centre - margin, 0.0), min(centre + margin, 1.0))
+
+
+def estimate_distinct(value_counts, sample_rows, population_rows):
+    """
+    Guaranteed-error estimator (GEE) of the distinct values in the full column
+    Values seen once in the sample are scaled up by sqrt(N / n); values seen
+    more often are assumed to have been found already
+    """
+    singletons = int((value_counts == 1).sum())
+    repeated = int((value_counts > 1).sum())
+    if sample_rows == 0:
+        return 0
+    return int(round(math.sqrt(population_rows / sample_rows) * singletons + repeated))
+
+
+def approximation_report(sample, population_size, profile, confidence=0.95):
+    """
+    Error bounds for statistics computed on a sample of population_size rows
+    Returns confidence intervals for means, quartiles and missing-value rates,
+    and estimated distinct counts for categorical columns
+    """
+    z = Z_SCORES.get(confidence)
+    if z is None:
+        raise ValueError(f"Unsupported confidence level {confidence}. Use one of {sorted(Z_SCORES)}")
+
+    n = len(sample)
+    means = {}
+    quantiles = {}
+    for col in profile.numeric_columns:
+        values = sample[col].dropna().to_numpy(dtype=float)
+        if len(values) == 0:
+            continue
+        means[col] = mean_interval(values, population_size, z)
+        values = np.sort(values)
+        quantiles[col] = {
+            label: quantile_interval(values, q, z)
+            for label, q in (('25%', 0.25), ('50%', 0.5), ('75%', 0.75))
+        }
+
+    missing_rates = {
+        col: proportion_interval(int(count), n, z)
+        for col, count in profile.null_counts.items()
+    }
+
+    distinct_counts = {
+        col: estimate_distinct(profile.value_counts(col), n - int(profile.null_counts[col]),
+                               population_size * (1 - missing_rates[col]['estimate']))
+        for col in profile.categorical_columns
+    }
+
+    return {
+        'sample_size': n,
+        'population_size': int(population_size),
+        'confidence': confidence,
+        'means': means,
+        'quantiles': quantiles,
+        'missing_rates': missing_rates,
+        'distinct_counts': distinct_counts
+    }
+
+
+def scale_to_population(analysis, report):
+    """
+    Rescale the count-like fields of a sample analysis to full-data estimates
+    Means, spreads and quantiles are left as measured on the sample
+    """
+    n = report['sample_size']
+    population = report['population_size']
+    factor = population / n if n else 0
+
+    analysis['shape'] = (population, analysis['shape'][1])
+    analysis['missing_values'] = {
+        col: int(round(report['missing_rates'][col]['estimate'] * population))
+        for col in analysis['missing_values']
+    }
+    analysis['total_missing'] = sum(analysis['missing_values'].values())
+    for stats in analysis['basic_stats'].values():
+        stats['count'] = float(round(stats['count'] * factor))
+    for col, stats in analysis['categorical_stats'].items():
+        stats['frequency'] = int(round(stats['frequency'] * factor))
+        stats['unique_count'] = report['distinct_counts'].get(col, stats['unique_count'])
+    # Duplicates do not scale linearly with sample size, so no estimate is given
+    analysis['data_quality']['duplicate_rows'] = None
+    analysis['data_quality']['duplicate_groups'] = []
+    analysis['data_quality']['memory_usage'] = float(analysis['data_quality']['memory_usage'] * factor)
+    analysis['data_quality']['memory_saved'] = float(analysis['data_quality']['memory_saved'] * factor)
+    return analysis
@@ -0,0 +1,97 @@
+# Columnar sidecar files for parsed uploads
+
+import logging
+import os
+
+from metrics import log_event
+
+try:
+    import pyarrow.feather as feather
+except ImportError:
+    # Sidecars are only an optimization, loading falls back to re-parsing the upload
+    feather = None
+
+logger = logging.getLogger('data_analyzer.sidecar')
+
+SIDECAR_SUFFIX = '.feather'
+
+
+def sidecar_path(file_path):
+    """Return the path of the sidecar stored next to an uploaded file"""
+    return file_path + SIDECAR_SUFFIX
+
+
+def write_sidecar(data, file_path, compression='uncompressed'):
+    """
+    Save a cleaned DataFrame next to its source file in Arrow IPC (Feather) format
+    Uncompressed by default so the file can be memory-mapped on read; 'lz4' or
+    'zstd' trade that for disk space. Returns the sidecar path, or None if the
+    frame could not be stored
+    """
+    if feather is None:
+        return None
+
+    path = sidecar_path(file_path)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        feather.write_feather(data, tmp_path, compression=compression)
+        os.replace(tmp_path, path)
+        return path
+    except Exception as e:
+        # Mixed-type object columns and similar cannot be represented in Arrow
+        log_event(logger, 'sidecar_skipped', logging.WARNING, file=os.path.basename(file_path), error=str(e))
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return None
+
+
+def read_sidecar_table(file_path):
+    """
+    Return a file's sidecar as a memory-mapped Arrow table
+    Returns None if there is no sidecar or it is older than the source file
+    """
+    if feather is None:
+        return None
+
+    path = sidecar_path(file_path)
+    try:
+        if os.stat(path).st_mtime_ns < os.stat(file_path).st_mtime_ns:
+            return None
+        return feather.read_table(path, memory_map=True)
+    except OSError:
+        return None
+    except Exception as e:
+        log_event(logger, 'sidecar_unreadable', logging.WARNING, path=path, error=str(e))
+        return None
+
+
+def read_sidecar(file_path):
+    """
+    Return the DataFrame stored in a file's sidecar
+    Returns None if there is no sidecar or it is older than the source file
+    """
+    table = read_sidecar_table(file_path)
+    if table is None:
+        return None
+    try:
+        return table.to_pandas()
+    except Exception as e:
+        log_event(logger, 'sidecar_unreadable', logging.WARNING, path=sidecar_path(file_path), error=str(e))
+        return None
+
+
+def read_sidecar_sample(file_path, sample_size, seed=0):
+    """
+    Return (sample DataFrame, total rows) drawn from a file's sidecar
+    Only the sampled rows are converted to pandas; the rest of the memory-mapped
+    table is never touched. Returns None if there is no usable sidecar
+    """
+    table = read_sidecar_table(file_path)
+    if table is None:
+        return None
+
+    total_rows = table.num_rows
+    if total_rows > sample_size:
+        from sampling import sample_positions
+        table = table.take(sample_positions(total_rows, sample_size, seed))
+    return table.to_pandas(), total_rows
@@ -0,0 +1,167 @@
+# CSV format detection and memory-lean parsing
+
+import codecs
+import csv
+import io
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from metrics import stage
+from compression import open_data
+
+# Bytes read from the start of a file to detect its format
+SNIFF_BYTES = 4 * 1024 * 1024
+
+# Delimiters tried in order; the first that splits every sample line evenly wins
+CANDIDATE_DELIMITERS = [',', ';', '\t', '|']
+
+# String columns are stored as category when the sample has at most this many
+# distinct values and they make up at most this share of the non-null values
+CATEGORY_MAX_UNIQUE = 1000
+CATEGORY_MAX_RATIO = 0.5
+
+CsvFormat = namedtuple('CsvFormat', ['encoding', 'delimiter', 'dtype'])
+
+
+def read_sample(file_path, size=SNIFF_BYTES):
+    """Return the first size bytes of a file (decompressed, for a compressed upload)"""
+    with open_data(file_path) as f:
+        return f.read(size)
+
+
+def detect_encoding(sample):
+    """
+    Pick the encoding of a byte sample: UTF-8 (with or without BOM) if it
+    decodes, otherwise latin-1, which accepts any byte sequence
+    """
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    try:
+        # Not final: the sample may end in the middle of a multi-byte character
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'latin-1'
+
+
+def _complete_lines(text, truncated):
+    lines = text.splitlines()
+    # The last line of a truncated sample is usually cut short
+    if truncated and len(lines) > 1:
+        lines = lines[:-1]
+    return lines
+
+
+def detect_delimiter(lines):
+    """Return the first candidate delimiter giving every line the same number (> 1) of fields"""
+    for delimiter in CANDIDATE_DELIMITERS:
+        widths = {len(row) for row in csv.reader(lines, delimiter=delimiter) if row}
+        if len(widths) == 1 and widths.pop() > 1:
+            return delimiter
+    return ','
+
+
+def detect_dtypes(sample_frame):
+    """Column dtypes to request up front: category for low-cardinality strings"""
+    dtype = {}
+    for col in sample_frame.columns:
+        values = sample_frame[col]
+        if not (pd.api.types.is_object_dtype(values.dtype) or pd.api.types.is_string_dtype(values.dtype)):
+            continue
+        non_null = values.dropna()
+        if len(non_null) == 0:
+            continue
+        unique = non_null.nunique()
+        if unique <= CATEGORY_MAX_UNIQUE and unique / len(non_null) <= CATEGORY_MAX_RATIO:
+            dtype[col] = 'category'
+    return dtype
+
+
+def _sample_lines(file_path, sample_size):
+    # (encoding, complete text lines) of the first sample_size bytes
+    sample = read_sample(file_path, sample_size)
+    encoding = detect_encoding(sample)
+    truncated = len(sample) == sample_size
+    text = codecs.getincrementaldecoder(encoding)(errors='replace').decode(sample, final=not truncated)
+    return encoding, _complete_lines(text, truncated)
+
+
+def sniff_csv(file_path, sample_size=SNIFF_BYTES):
+    """
+    Detect a CSV file's encoding, delimiter and column types from its first bytes
+    Returns a CsvFormat(encoding, delimiter, dtype) for a single pd.read_csv call
+    """
+    encoding, lines = _sample_lines(file_path, sample_size)
+    delimiter = detect_delimiter(lines[:100])
+
+    try:
+        sample_frame = pd.read_csv(io.StringIO('\n'.join(lines)), sep=delimiter)
+    except (ValueError, pd.errors.ParserError):
+        # Let the full parse report the problem
+        return CsvFormat(encoding, delimiter, {})
+    return CsvFormat(encoding, delimiter, detect_dtypes(sample_frame))
+
+
+def read_csv_prefix(file_path, sample_size=SNIFF_BYTES):
+    """
+    Parse the complete lines among the first sample_size bytes of a CSV file
+    Checks that a file too large to load whole is a readable CSV without
+    reading past its start; raises ValueError if it is not
+    """
+    _, lines = _sample_lines(file_path, sample_size)
+    try:
+        data = pd.read_csv(io.StringIO('\n'.join(lines)), sep=detect_delimiter(lines[:100]))
+    except (ValueError, pd.errors.ParserError) as e:
+        raise ValueError(f"Unable to parse CSV file: {str(e)}")
+    data = data.dropna(how='all').dropna(axis=1, how='all')
+    if data.empty:
+        raise ValueError("The file appears to be empty or contains no readable data")
+    return data
+
+
+def downcast_numeric(data):
+    """
+    Store numeric columns in the narrowest dtype that holds their values exactly
+    Integers shrink to the smallest integer type; floats become float32 only
+    when every value survives the round trip unchanged
+    """
+    downcast = {}
+    for col, dtype in data.dtypes.items():
+        if pd.api.types.is_bool_dtype(dtype) or not isinstance(dtype, np.dtype):
+            continue
+        if dtype.kind in 'iu':
+            narrow = pd.to_numeric(data[col], downcast='integer')
+            if narrow.dtype != dtype:
+                downcast[col] = narrow
+        elif dtype == np.float64:
+            values = data[col].to_numpy()
+            narrow = values.astype(np.float32)
+            with np.errstate(over='ignore', invalid='ignore'):
+                if np.array_equal(narrow.astype(np.float64), values, equal_nan=True):
+                    downcast[col] = pd.Series(narrow, index=data.index, name=col)
+    if downcast:
+        data = data.copy(deep=False)
+        for col, values in downcast.items():
+            data[col] = values
+    return data
+
+
+def read_csv_lean(file_path):
+    """
+    Parse a CSV file once with sniffed encoding, delimiter and column types
+    Low-cardinality strings are read straight into category columns and numeric
+    columns are downcast afterwards
+    """
+    csv_format = sniff_csv(file_path)
+    try:
+        with stage('load', 'csv') as record, open_data(file_path) as f:
+            data = record.frame(pd.read_csv(f, encoding=csv_format.encoding, sep=csv_format.delimiter,
+                                            dtype=csv_format.dtype))
+    except UnicodeDecodeError:
+        # Invalid UTF-8 beyond the sniffed sample
+        with stage('load', 'csv_latin1') as record, open_data(file_path) as f:
+            data = record.frame(pd.read_csv(f, encoding='latin-1', sep=csv_format.delimiter,
+                                            dtype=csv_format.dtype))
+    return downcast_numeric(data)
@@ -0,0 +1,277 @@
+# Content-addressed upload store: each distinct file kept once, named uploads mapped to it
+
+import hashlib
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from cache import HASH_CHUNK_SIZE, remember_digest
+from compression import split_compression
+from metrics import count_upload, log_event
+
+logger = logging.getLogger('data_analyzer.store')
+
+# A blob's last use is only rewritten when older than this, so reads rarely write
+TOUCH_INTERVAL = 60
+
+# Stored files and everything derived from them carry the content digest in their names
+DIGEST_PATTERN = re.compile(r'[0-9a-f]{64}')
+
+
+def blob_suffix(filename):
+    """
+    Extension a stored file keeps, since loaders pick the format from it
+    'Sales.CSV.gz' -> '.csv.gz', 'sales.json' -> '.json', 'sales.zip' -> '.zip'
+    """
+    extension, compression = split_compression(filename)
+    if compression is None:
+        return extension
+    compressed = os.path.splitext(filename.lower())[1]
+    # The member of a .zip decides its format, not whatever precedes the extension
+    return compressed if compression == 'zip' else extension + compressed
+
+
+def _disk_usage(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        total = 0
+        for directory, _, files in os.walk(path):
+            for name in files:
+                try:
+                    total += os.lstat(os.path.join(directory, name)).st_size
+                except OSError:
+                    pass
+        return total
+    try:
+        return os.lstat(path).st_size
+    except OSError:
+        return 0
+
+
+def _remove(path):
+    # Files may already be gone (another process evicted them first)
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class UploadStore:
+    """
+    Uploaded files stored by the SHA-256 of their contents
+    Files live in blob_dir as <digest><extension>; their sidecars and saved
+    profiles sit next to them under the same prefix, and cache entries carry
+    the digest in their names. SQLite tables map each upload name to its
+    file, so identical uploads share one copy and a re-upload under an
+    existing name leaves the earlier file (and its cached results) intact,
+    and hold the size and last use of every file and recorded artifact, so
+    checking the quota never walks the disk. Past quota bytes, the least
+    recently used files are deleted together with everything derived from them
+    """
+
+    def __init__(self, blob_dir, db_path, quota=None):
+        self.blob_dir = blob_dir
+        self.db_path = db_path
+        # None for no limit
+        self.quota = quota
+        os.makedirs(blob_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS blobs ('
+                ' blob TEXT PRIMARY KEY,'
+                ' digest TEXT NOT NULL,'
+                ' size INTEGER NOT NULL,'
+                ' created_at REAL NOT NULL,'
+                ' last_used REAL NOT NULL)'
+            )
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS names ('
+                ' name TEXT PRIMARY KEY,'
+                ' blob TEXT NOT NULL,'
+                ' uploaded_at REAL NOT NULL)'
+            )
+            # Files and directories derived from stored contents (see record())
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS artifacts ('
+                ' path TEXT PRIMARY KEY,'
+                ' digest TEXT NOT NULL,'
+                ' size INTEGER NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS artifacts_by_digest ON artifacts (digest)')
+            conn.execute('CREATE INDEX IF NOT EXISTS blobs_by_use ON blobs (last_used)')
+
+    @contextmanager
+    def _connect(self):
+        # Commits (or rolls back on error) and closes, unlike a bare sqlite3 connection
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _blob_path(self, blob):
+        return os.path.join(self.blob_dir, blob)
+
+    def save(self, stream, filename):
+        """
+        Write an upload stream into the store, hashing it as it is written
+        Returns (path, created): created is False when identical contents with
+        the same extension were already stored, in which case the new copy is
+        dropped. The name is not mapped until assign() is called
+        """
+        sha = hashlib.sha256()
+        tmp_path = os.path.join(self.blob_dir, f'.upload.{os.getpid()}.{threading.get_ident()}.tmp')
+        try:
+            with open(tmp_path, 'wb') as f:
+                for block in iter(lambda: stream.read(HASH_CHUNK_SIZE), b''):
+                    sha.update(block)
+                    f.write(block)
+            digest = sha.hexdigest()
+            blob = digest + blob_suffix(filename)
+            path = self._blob_path(blob)
+            created = not os.path.exists(path)
+            if created:
+                os.replace(tmp_path, path)
+            else:
+                os.remove(tmp_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        # The digest just computed spares the first cache lookup a re-read
+        remember_digest(path, digest)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO blobs (blob, digest, size, created_at, last_used) VALUES (?, ?, ?, ?, ?)'
+                ' ON CONFLICT (blob) DO UPDATE SET last_used = excluded.last_used',
+                (blob, digest, os.path.getsize(path), now, now)
+            )
+        count_upload('stored' if created else 'deduplicated')
+        return path, created
+
+    def assign(self, name, path):
+        """Map an upload name to a stored file; returns the file it mapped to before, or None"""
+        blob = os.path.basename(path)
+        with self._connect() as conn:
+            row = conn.execute('SELECT blob FROM names WHERE name = ?', (name,)).fetchone()
+            conn.execute(
+                'INSERT INTO names (name, blob, uploaded_at) VALUES (?, ?, ?)'
+                ' ON CONFLICT (name) DO UPDATE SET blob = excluded.blob, uploaded_at = excluded.uploaded_at',
+                (name, blob, time.time())
+            )
+        return self._blob_path(row[0]) if row else None
+
+    def resolve(self, name):
+        """Return the path of the file uploaded under name, or None, marking it as used"""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute('SELECT blob FROM names WHERE name = ?', (name,)).fetchone()
+            if row is None:
+                return None
+            conn.execute('UPDATE blobs SET last_used = ? WHERE blob = ? AND last_used < ?',
+                         (now, row[0], now - TOUCH_INTERVAL))
+        path = self._blob_path(row[0])
+        return path if os.path.exists(path) else None
+
+    def record(self, path):
+        """
+        Charge a file or directory derived from stored contents against the quota
+        Called whenever one is written or grows (sidecars, saved profiles, cache
+        entries, sort indexes); paths without a digest in their name are ignored
+        """
+        match = DIGEST_PATTERN.search(os.path.basename(path))
+        if match is None or not os.path.exists(path):
+            return
+        size = _disk_usage(path)
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO artifacts (path, digest, size) VALUES (?, ?, ?)'
+                ' ON CONFLICT (path) DO UPDATE SET size = excluded.size',
+                (os.path.abspath(path), match.group(), size)
+            )
+
+    def _delete(self, conn, blob, digest):
+        # The file with its sidecar and saved profile, plus the other artifacts
+        # of its digest unless another stored file has the same contents
+        shared = conn.execute('SELECT COUNT(*) FROM blobs WHERE digest = ? AND blob != ?',
+                              (digest, blob)).fetchone()[0] > 0
+        blob_path = os.path.abspath(self._blob_path(blob))
+        freed = conn.execute('SELECT size FROM blobs WHERE blob = ?', (blob,)).fetchone()[0]
+        _remove(blob_path)
+        for path, size in conn.execute('SELECT path, size FROM artifacts WHERE digest = ?', (digest,)).fetchall():
+            if os.path.dirname(path) == os.path.dirname(blob_path):
+                if not path.startswith(blob_path):
+                    continue
+            elif shared:
+                continue
+            _remove(path)
+            conn.execute('DELETE FROM artifacts WHERE path = ?', (path,))
+            freed += size
+        conn.execute('DELETE FROM names WHERE blob = ?', (blob,))
+        conn.execute('DELETE FROM blobs WHERE blob = ?', (blob,))
+        return freed
+
+    def discard(self, path):
+        """Delete a stored file and everything derived from it, and any names mapped to it"""
+        blob = os.path.basename(path)
+        with self._connect() as conn:
+            row = conn.execute('SELECT digest FROM blobs WHERE blob = ?', (blob,)).fetchone()
+            if row is not None:
+                self._delete(conn, blob, row[0])
+
+    def usage(self, conn=None):
+        """Bytes used by stored files and their recorded artifacts"""
+        if conn is None:
+            with self._connect() as conn:
+                return self.usage(conn)
+        return (conn.execute('SELECT COALESCE(SUM(size), 0) FROM blobs').fetchone()[0]
+                + conn.execute('SELECT COALESCE(SUM(size), 0) FROM artifacts').fetchone()[0])
+
+    def enforce_quota(self, keep=None, pinned=()):
+        """
+        Delete least recently used files until usage is within the quota
+        keep and the files whose digest is in pinned (open browsers, queued or
+        running jobs) are never deleted. Returns the number of files deleted
+        """
+        if self.quota is None:
+            return 0
+        keep_blob = os.path.basename(keep) if keep else None
+        pinned = set(pinned)
+        evicted = 0
+        with self._connect() as conn:
+            # One eviction at a time across processes; the others then see the freed space
+            conn.execute('BEGIN IMMEDIATE')
+            # Artifacts written after their file was evicted belong to nothing
+            for (path,) in conn.execute('SELECT path FROM artifacts'
+                                        ' WHERE digest NOT IN (SELECT digest FROM blobs)').fetchall():
+                _remove(path)
+                conn.execute('DELETE FROM artifacts WHERE path = ?', (path,))
+            used = self.usage(conn)
+            if used > self.quota:
+                # Files no name maps to any more (replaced by a re-upload) go first
+                candidates = conn.execute(
+                    'SELECT blob, digest FROM blobs'
+                    ' ORDER BY blob IN (SELECT blob FROM names), last_used'
+                ).fetchall()
+                for blob, digest in candidates:
+                    if used <= self.quota:
+                        break
+                    if blob == keep_blob or digest in pinned:
+                        continue
+                    freed = self._delete(conn, blob, digest)
+                    used -= freed
+                    evicted += 1
+                    count_upload('evicted')
+                    log_event(logger, 'upload_evicted', blob=blob, freed_bytes=freed, quota=self.quota)
+        return evicted
@@ -0,0 +1,599 @@
+# Bounded-memory streaming profiler for large CSV files
+
+import math
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from profiling import column_kind, memory_footprint
+from sniffing import sniff_csv
+from compression import open_data
+from duplicates import DuplicateTracker
+
+# Rows read per chunk; memory use is proportional to this, not to the file size
+DEFAULT_CHUNKSIZE = 100_000
+
+# Sections of analyze_data's output a chunked profile cannot produce, with the reason shown for each
+UNAVAILABLE = {
+    'visualizations': "Charts need the whole file in memory; this file was profiled in chunks",
+    'correlations': "Correlations need the whole file in memory; this file was profiled in chunks"
+}
+
+# Distinct row hashes the duplicate tracker holds (24 bytes each) before it
+# samples rows and estimates the duplicate count
+DUPLICATE_CAPACITY = 1_000_000
+
+# Tukey fences for the estimated outlier share, as in outliers.IQR_FACTOR
+IQR_FACTOR = 1.5
+
+
+class RunningStats:
+    """
+    Mergeable count, mean, central moments, min and max
+    Batches are folded in with Welford/Chan updates, so the mean and variance
+    stay numerically stable however many chunks are combined
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.m3 = 0.0
+        self.m4 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values):
+        """Fold a 1-D float array without NaNs into the running statistics"""
+        if len(values) == 0:
+            return
+        batch = RunningStats()
+        batch.count = len(values)
+        batch.mean = float(values.mean())
+        centered = values - batch.mean
+        squared = centered * centered
+        batch.m2 = float(squared.sum())
+        batch.m3 = float((squared * centered).sum())
+        batch.m4 = float((squared * squared).sum())
+        batch.min = float(values.min())
+        batch.max = float(values.max())
+        self.merge(batch)
+
+    def merge(self, other):
+        """Combine another RunningStats into this one (Pebay's pairwise formulas)"""
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.__dict__.update(other.__dict__)
+            return
+
+        na, nb = self.count, other.count
+        n = na + nb
+        delta = other.mean - self.mean
+        delta2 = delta * delta
+
+        m2 = self.m2 + other.m2 + delta2 * na * nb / n
+        m3 = (self.m3 + other.m3
+              + delta * delta2 * na * nb * (na - nb) / (n * n)
+              + 3.0 * delta * (na * other.m2 - nb * self.m2) / n)
+        m4 = (self.m4 + other.m4
+              + delta2 * delta2 * na * nb * (na * na - na * nb + nb * nb) / (n ** 3)
+              + 6.0 * delta2 * (na * na * other.m2 + nb * nb * self.m2) / (n * n)
+              + 4.0 * delta * (na * other.m3 - nb * self.m3) / n)
+
+        self.mean += delta * nb / n
+        self.m2, self.m3, self.m4 = m2, m3, m4
+        self.count = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def std(self):
+        """Sample standard deviation (ddof=1, as pandas reports it)"""
+        if self.count < 2:
+            return float('nan')
+        return math.sqrt(max(self.m2, 0.0) / (self.count - 1))
+
+    @property
+    def skew(self):
+        """Bias-adjusted sample skewness (matches pandas Series.skew)"""
+        n = self.count
+        if n < 3 or self.m2 <= 0:
+            return float('nan')
+        g1 = math.sqrt(n) * self.m3 / self.m2 ** 1.5
+        return g1 * math.sqrt(n * (n - 1)) / (n - 2)
+
+
+class QuantileSketch:
+    """
+    KLL-style mergeable quantile sketch
+    Values are held in a stack of compactors; when a level overflows it is
+    sorted and every other item is promoted with double weight. Rank error is
+    roughly 1/k of the stream length, with memory O(k log n)
+    """
+
+    def __init__(self, k=1024, seed=0):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(8, int(math.ceil(self.k * (2.0 / 3.0) ** depth)))
+
+    def update(self, values):
+        """Add a 1-D float array without NaNs"""
+        if len(values) == 0:
+            return
+        self.levels[0] = np.concatenate([self.levels[0], np.asarray(values, dtype=float)])
+        self._compress()
+
+    def merge(self, other):
+        """Combine another sketch into this one"""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self._compress()
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                items = np.sort(items)
+                # An odd leftover stays behind so total weight is preserved exactly
+                keep = items[-1:] if len(items) % 2 else items[:0]
+                pairs = items[:len(items) - len(keep)]
+                promoted = pairs[self._rng.integers(2)::2]
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                self.levels[level] = keep
+            level += 1
+
+    def quantiles(self, qs):
+        """Return estimated quantiles for the probabilities in qs"""
+        if len(self.levels) == 1:
+            # Nothing has been compacted yet, so the answer is exact
+            if len(self.levels[0]) == 0:
+                return [float('nan')] * len(qs)
+            return [float(v) for v in np.quantile(self.levels[0], qs)]
+
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        values = values[order]
+        cumulative = np.cumsum(weights[order])
+        total = cumulative[-1]
+        if total == 0:
+            return [float('nan')] * len(qs)
+        # Same position convention as linear interpolation: rank q * (n - 1)
+        positions = np.searchsorted(cumulative, np.asarray(qs) * (total - 1) + 1, side='left')
+        positions = np.clip(positions, 0, len(values) - 1)
+        return [float(values[p]) for p in positions]
+
+    def count_outside(self, lower, upper):
+        """Estimated number of values below lower or above upper (exact until the first compaction)"""
+        total = 0.0
+        for level, items in enumerate(self.levels):
+            total += 2.0 ** level * (np.count_nonzero(items < lower) + np.count_nonzero(items > upper))
+        return total
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct-count estimator over 64-bit value hashes
+    With the default precision (2**14 registers) the standard error is about 0.8%
+    """
+
+    def __init__(self, precision=14):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, values):
+        """Add the distinct values of a pandas Series or array"""
+        if len(values) == 0:
+            return
+        self.update_hashes(pd.util.hash_array(np.asarray(values, dtype=object)))
+
+    def update_hashes(self, hashes):
+        """Add precomputed uint64 hashes"""
+        p = self.precision
+        width = 64 - p
+        index = (hashes >> np.uint64(width)).astype(np.int64)
+        rest = hashes & np.uint64((1 << width) - 1)
+        # frexp gives exact bit lengths for integers below 2**53
+        _, bit_length = np.frexp(rest.astype(np.float64))
+        rank = (width - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other):
+        """Combine another sketch with the same precision"""
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self):
+        """Return the estimated number of distinct values"""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            return m * math.log(m / zeros)
+        return float(raw)
+
+
+class HeavyHitters:
+    """
+    Value counter that is exact for low-cardinality columns
+    Once more than capacity distinct values have been seen it degrades to a
+    Misra-Gries top-k summary, whose counts are lower bounds off by at most n/capacity
+    """
+
+    def __init__(self, capacity=10_000):
+        self.capacity = capacity
+        self.counts = pd.Series(dtype='int64')
+        self.exact = True
+
+    def update(self, values):
+        """Add a pandas Series of non-null values"""
+        if len(values) == 0:
+            return
+        self._add(values.value_counts(sort=False))
+
+    def merge(self, other):
+        """Combine another counter into this one"""
+        self.exact = self.exact and other.exact
+        self._add(other.counts)
+
+    def _add(self, counts):
+        counts = counts.astype('int64')
+        # Index alignment does the merge as one vectorized hash join
+        merged = self.counts.add(counts, fill_value=0).astype('int64') if len(self.counts) else counts
+        if len(merged) > self.capacity:
+            self.exact = False
+            threshold = merged.nlargest(self.capacity + 1).iloc[-1]
+            merged = merged[merged > threshold] - threshold
+        self.counts = merged
+
+    def most_frequent(self):
+        """Return (value, count) for the most common value, ties broken like Series.mode"""
+        if len(self.counts) == 0:
+            return None, 0
+        top = int(self.counts.max())
+        candidates = list(self.counts.index[self.counts == top])
+        try:
+            value = min(candidates)
+        except TypeError:
+            value = candidates[0]
+        return value, top
+
+
+class ColumnAccumulator:
+    """Mergeable per-column state for one column of a streamed file"""
+
+    def __init__(self, kind, dtype):
+        self.kind = kind
+        self.dtype = dtype
+        self.nulls = 0
+        if kind == 'numeric':
+            self.stats = RunningStats()
+            self.sketch = QuantileSketch()
+            # Whether every value so far survives a float32 round trip, as downcast_numeric checks
+            self.float32_exact = True
+        elif kind == 'categorical':
+            self.values = HeavyHitters()
+            self.distinct = HyperLogLog()
+
+    def update(self, series):
+        """Fold one chunk of the column into the accumulator"""
+        mask = series.isna().to_numpy()
+        self.nulls += int(mask.sum())
+        if self.kind == 'numeric':
+            values = series.to_numpy(dtype=float, na_value=np.nan)[~mask]
+            self.stats.update(values)
+            self.sketch.update(values)
+            if self.float32_exact and len(values):
+                with np.errstate(over='ignore', invalid='ignore'):
+                    self.float32_exact = np.array_equal(values.astype(np.float32).astype(np.float64), values)
+        elif self.kind == 'categorical':
+            values = series[~mask]
+            self.values.update(values)
+            self.distinct.update(values.to_numpy(dtype=object))
+
+    def merge(self, other):
+        """Combine another accumulator for the same column"""
+        self.nulls += other.nulls
+        if self.kind == 'numeric':
+            self.stats.merge(other.stats)
+            self.sketch.merge(other.sketch)
+            self.float32_exact = self.float32_exact and other.float32_exact
+        elif self.kind == 'categorical':
+            self.values.merge(other.values)
+            self.distinct.merge(other.distinct)
+
+    def result_dtype(self):
+        """
+        The dtype load_data gives the column: integers in the narrowest type holding
+        their range and floats as float32 when that is exact (sniffing.downcast_numeric)
+        """
+        if self.kind != 'numeric' or self.stats.count == 0:
+            return self.dtype
+        dtype = np.dtype(self.dtype)
+        if dtype.kind == 'i':
+            for narrow in (np.int8, np.int16, np.int32):
+                info = np.iinfo(narrow)
+                if info.min <= self.stats.min and self.stats.max <= info.max:
+                    return np.dtype(narrow).name
+        elif dtype == np.float64 and self.float32_exact:
+            return 'float32'
+        return self.dtype
+
+    def outlier_count(self):
+        """Estimated number of values outside the 1.5 IQR fences, from the quantile sketch"""
+        q25, q75 = self.sketch.quantiles([0.25, 0.75])
+        if self.stats.count == 0 or math.isnan(q25):
+            return 0
+        iqr = q75 - q25
+        return int(round(self.sketch.count_outside(q25 - IQR_FACTOR * iqr, q75 + IQR_FACTOR * iqr)))
+
+    def basic_stats(self):
+        """Return the analyze_data basic_stats entry for a numeric column"""
+        q25, q50, q75 = self.sketch.quantiles([0.25, 0.5, 0.75])
+        stats = self.stats
+        empty = stats.count == 0
+        return {
+            'count': float(stats.count),
+            'mean': float('nan') if empty else float(stats.mean),
+            'std': stats.std,
+            'min': float('nan') if empty else float(stats.min),
+            '25%': q25,
+            '50%': q50,
+            '75%': q75,
+            'max': float('nan') if empty else float(stats.max)
+        }
+
+    def categorical_stats(self):
+        """Return the analyze_data categorical_stats entry for a categorical column"""
+        value, frequency = self.values.most_frequent()
+        if value is None:
+            return {'unique_count': 0, 'most_frequent': 'N/A', 'frequency': 0}
+        if self.values.exact:
+            unique_count = len(self.values.counts)
+        else:
+            unique_count = int(round(self.distinct.estimate()))
+        return {
+            'unique_count': unique_count,
+            'most_frequent': str(value),
+            'frequency': int(frequency)
+        }
+
+
+def _column_kind(dtype):
+    # Datetimes are not parsed from CSV chunks, so anything else is left unprofiled
+    return column_kind(dtype) if column_kind(dtype) in ('numeric', 'categorical') else 'other'
+
+
+class StreamingProfile:
+    """
+    Mergeable profile of a tabular dataset built one chunk at a time
+    Column kinds are fixed by the first chunk; later values in a numeric column
+    that do not parse as numbers are counted as missing. category_columns are the
+    string columns load_data would read as category (sniffing.sniff_csv).
+    Duplicates are counted exactly up to duplicate_capacity distinct rows and
+    estimated past it (None counts exactly, with memory growing with the file)
+    """
+
+    def __init__(self, category_columns=(), duplicate_capacity=DUPLICATE_CAPACITY):
+        self.category_columns = set(category_columns)
+        self.columns = []
+        self.accumulators = {}
+        self.rows = 0
+        # Rows taken from the file, including all-empty ones, i.e. the next row's index
+        self.rows_read = 0
+        self.head = None
+        self.peak_chunk_bytes = 0
+        self.duplicates = DuplicateTracker(capacity=duplicate_capacity)
+
+    def update(self, chunk):
+        """Fold a DataFrame chunk into the profile"""
+        self.rows_read += len(chunk)
+        chunk = chunk.dropna(how='all')
+        if chunk.empty:
+            return
+
+        if not self.columns:
+            self.columns = [str(c) for c in chunk.columns]
+            for col, name in zip(chunk.columns, self.columns):
+                dtype = chunk[col].dtype
+                kind = _column_kind(dtype)
+                label = 'category' if kind == 'categorical' and col in self.category_columns else str(dtype)
+                self.accumulators[name] = ColumnAccumulator(kind, label)
+        chunk.columns = [str(c) for c in chunk.columns]
+
+        if self.head is None or len(self.head) < 5:
+            head = chunk.head(5) if self.head is None else pd.concat([self.head, chunk.head(5)]).head(5)
+            self.head = head
+
+        self.rows += len(chunk)
+        self.peak_chunk_bytes = max(self.peak_chunk_bytes, memory_footprint(chunk))
+        self.duplicates.update(chunk)
+
+        for name, acc in self.accumulators.items():
+            series = chunk[name]
+            if acc.kind == 'numeric':
+                if not pd.api.types.is_numeric_dtype(series.dtype):
+                    series = pd.to_numeric(series, errors='coerce')
+                if acc.dtype != str(series.dtype):
+                    acc.dtype = str(np.result_type(np.dtype(acc.dtype), series.dtype))
+                if series.hasnans and acc.dtype.startswith('int'):
+                    acc.dtype = 'float64'
+            acc.update(series)
+
+    def merge(self, other):
+        """Combine a profile of a later block of the same dataset"""
+        if not other.columns:
+            return
+        if not self.columns:
+            self.__dict__.update(other.__dict__)
+            return
+        for name, acc in self.accumulators.items():
+            acc.merge(other.accumulators[name])
+            if acc.dtype != other.accumulators[name].dtype and acc.kind == 'numeric':
+                acc.dtype = str(np.result_type(np.dtype(acc.dtype), np.dtype(other.accumulators[name].dtype)))
+        self.rows += other.rows
+        self.rows_read += other.rows_read
+        self.peak_chunk_bytes = max(self.peak_chunk_bytes, other.peak_chunk_bytes)
+        self.duplicates.merge(other.duplicates)
+
+    def result(self):
+        """Return a result dict with the same summary keys as analyze_data"""
+        # Like load_data, columns with no values at all are dropped
+        columns = [c for c in self.columns if self.accumulators[c].nulls < self.rows]
+        accs = {c: self.accumulators[c] for c in columns}
+        shape = (self.rows, len(columns))
+
+        dtypes = {c: acc.result_dtype() for c, acc in accs.items()}
+        missing_values = {c: acc.nulls for c, acc in accs.items()}
+        total_missing = sum(missing_values.values())
+        numeric_columns = [c for c, acc in accs.items() if acc.kind == 'numeric']
+        categorical_columns = [c for c, acc in accs.items() if acc.kind == 'categorical']
+
+        basic_stats = {c: accs[c].basic_stats() for c in numeric_columns}
+        categorical_stats = {c: accs[c].categorical_stats() for c in categorical_columns}
+
+        duplicates = self.duplicates.report()
+        total_cells = shape[0] * shape[1]
+        data_quality = {
+            'completeness': ((total_cells - total_missing) / total_cells) * 100 if total_cells > 0 else 0,
+            'missing_percentage': (total_missing / total_cells) * 100 if total_cells > 0 else 0,
+            'duplicate_rows': duplicates['duplicate_rows'],
+            'duplicate_groups': duplicates['groups'],
+            'duplicates_approximate': duplicates['approximate'],
+            # Peak size of a single chunk, which bounds the profiler's working set
+            'memory_usage': float(self.peak_chunk_bytes / 1024**2),
+            # Chunks keep the parser's default dtypes
+            'memory_saved': 0.0
+        }
+
+        dtype_counts = {}
+        for dtype in dtypes.values():
+            dtype_counts[dtype] = dtype_counts.get(dtype, 0) + 1
+
+        head = self.head[columns].to_dict('records') if self.head is not None else []
+
+        return {
+            'shape': shape,
+            'columns': columns,
+            'dtypes': dtypes,
+            'dtype_counts': dtype_counts,
+            'missing_values': missing_values,
+            'total_missing': total_missing,
+            'basic_stats': basic_stats,
+            'categorical_stats': categorical_stats,
+            'head': head,
+            'data_quality': data_quality,
+            'numeric_columns': numeric_columns,
+            'categorical_columns': categorical_columns,
+            'datetime_columns': [],
+            # Empty because they could not be computed, as 'unavailable' says
+            'visualizations': {},
+            'correlations': {},
+            'top_correlations': [],
+            'insights': self._insights(shape, total_missing, numeric_columns, categorical_columns, duplicates),
+            'unavailable': dict(UNAVAILABLE),
+            'streaming': True,
+            'analysis_timestamp': datetime.now().isoformat()
+        }
+
+    def _insights(self, shape, total_missing, numeric_columns, categorical_columns, duplicates):
+        # Mirrors generate_insights using only what the accumulators can answer: outlier
+        # shares come from the quantile sketches, and correlation insights are left out
+        insights = {
+            'data_quality': [],
+            'patterns': [],
+            'recommendations': []
+        }
+        total_cells = shape[0] * shape[1]
+        completeness = ((total_cells - total_missing) / total_cells) * 100 if total_cells else 0
+        if completeness >= 95:
+            insights['data_quality'].append("Excellent data quality - very few missing values")
+        elif completeness >= 80:
+            insights['data_quality'].append("Good data quality - some missing values to address")
+        else:
+            insights['data_quality'].append("Poor data quality - significant missing values detected")
+
+        if duplicates['duplicate_rows'] > 0:
+            largest = duplicates['groups'][0]['count']
+            if duplicates['approximate']:
+                insights['data_quality'].append(f"About {duplicates['duplicate_rows']} duplicate rows, estimated from a sample of rows (largest group found: {largest} identical rows)")
+            else:
+                insights['data_quality'].append(f"{duplicates['duplicate_rows']} duplicate rows found (largest group: {largest} identical rows)")
+
+        for col in numeric_columns:
+            acc = self.accumulators[col]
+            if acc.stats.count == 0:
+                continue
+            outliers = acc.outlier_count()
+            if outliers > 0:
+                insights['patterns'].append(f"{col}: {outliers / acc.stats.count * 100:.1f}% outliers detected")
+            skewness = acc.stats.skew
+            if not math.isnan(skewness) and abs(skewness) > 1:
+                skew_type = "right" if skewness > 0 else "left"
+                insights['patterns'].append(f"{col}: Highly skewed distribution ({skew_type})")
+
+        if total_missing > 0:
+            insights['recommendations'].append("Consider data cleaning for missing values")
+        if len(numeric_columns) > 1:
+            insights['recommendations'].append("Explore correlations between numeric variables")
+        if len(categorical_columns) > 0:
+            insights['recommendations'].append("Consider encoding categorical variables for ML applications")
+        if shape[0] > 10000:
+            insights['recommendations'].append("Large dataset - consider sampling for initial exploration")
+        return insights
+
+
+def stream_csv(file_path, chunksize=DEFAULT_CHUNKSIZE, progress=None):
+    """
+    Build a StreamingProfile of a whole CSV file, one chunk at a time
+    progress, if given, is called after each chunk with the share of the file read
+    Returns (profile, encoding, delimiter), with the encoding that decoded the file
+    """
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"File not found: {file_path}")
+
+    csv_format = sniff_csv(file_path)
+    size = os.path.getsize(file_path)
+    for encoding in [csv_format.encoding, 'latin-1']:
+        profile = StreamingProfile(category_columns=csv_format.dtype)
+        try:
+            with open_data(file_path) as f, \
+                    pd.read_csv(f, encoding=encoding, sep=csv_format.delimiter, chunksize=chunksize) as reader:
+                for chunk in reader:
+                    profile.update(chunk)
+                    if progress and size:
+                        progress(f.tell() / size)
+            break
+        except UnicodeDecodeError:
+            # latin-1 decodes any byte sequence, so this retries at most once
+            continue
+
+    return profile, encoding, csv_format.delimiter
+
+
+def profile_csv(file_path, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Profile a CSV file in fixed-size chunks
+    Memory use stays flat as the file grows; means, variances, min/max, null
+    counts and low-cardinality value counts are exact, quartiles and high
+    cardinality distinct counts come from sketches
+    """
+    profile, _, _ = stream_csv(file_path, chunksize)
+
+    if profile.rows == 0:
+        raise ValueError("The file appears to be empty or contains no readable data")
+
+    return profile.result()
@@ -0,0 +1,62 @@
+# Optional pre-warming of the analysis path
+
+import importlib
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from analysis import load_data, analyze_data, build_visualization, visualization_manifest
+from profiling import DatasetProfile
+from excel import ENGINES
+from metrics import discard_observations, record_startup
+
+# Rows of the synthetic dataset analyzed by the warm-up
+WARMUP_ROWS = 500
+
+
+def warmup_frame(rows=WARMUP_ROWS):
+    """Small seeded dataset with a column of every kind the analysis treats differently"""
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({
+        'value': rng.normal(size=rows),
+        'count': rng.poisson(5, size=rows),
+        'ratio': rng.random(rows),
+        'label': rng.choice(['a', 'b', 'c', 'd'], size=rows),
+        'flag': rng.random(rows) < 0.5,
+        'date': pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 1000, size=rows), unit='D')
+    })
+    data.loc[::17, 'ratio'] = np.nan
+    return data
+
+
+def warm_up():
+    """
+    Import and run the analysis path once so the first real request finds it ready
+    Meant for a pre-fork master (e.g. gunicorn --preload): workers forked
+    afterwards share the imported modules and touched code instead of each
+    loading them again. Nothing is written to the result caches and the
+    warm-up's stage metrics are discarded. Returns the seconds taken
+    """
+    started = time.perf_counter()
+    for module in ENGINES.values():
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            pass
+
+    data = warmup_frame()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'warmup.csv')
+        data.to_csv(path, index=False)
+        data = load_data(path, use_sidecar=False)
+    analyze_data(data)
+    profile = DatasetProfile(data)
+    for chart_id in visualization_manifest(data, profile.numeric_columns, profile.categorical_columns, profile):
+        build_visualization(data, chart_id, profile).to_json()
+
+    discard_observations()
+    elapsed = time.perf_counter() - started
+    record_startup('warmup', elapsed)
+    return elapsed
@@ -0,0 +1,95 @@
+# Seeded synthetic datasets for the benchmark suite
+
+import os
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+FORMATS = ('csv', 'json', 'jsonl', 'xlsx')
+
+DatasetSpec = namedtuple('DatasetSpec', [
+    'rows', 'numeric', 'categorical', 'datetime', 'missing_rate', 'cardinality', 'format', 'seed'
+])
+
+
+def spec(rows=10_000, numeric=8, categorical=4, datetime=1, missing_rate=0.05, cardinality=50,
+         format='csv', seed=0):
+    """Build a DatasetSpec, checking the values are usable"""
+    if format not in FORMATS:
+        raise ValueError(f"Unsupported format '{format}'. Use one of {', '.join(FORMATS)}")
+    if not 0 <= missing_rate < 1:
+        raise ValueError("missing_rate must be in [0, 1)")
+    if rows < 1 or cardinality < 1 or min(numeric, categorical, datetime) < 0:
+        raise ValueError("rows and cardinality must be positive and column counts non-negative")
+    return DatasetSpec(rows, numeric, categorical, datetime, missing_rate, cardinality, format, seed)
+
+
+def spec_name(dataset):
+    """Short stable name for a spec, used for file names and result keys"""
+    return (f"{dataset.format}-r{dataset.rows}-n{dataset.numeric}-c{dataset.categorical}-d{dataset.datetime}"
+            f"-m{dataset.missing_rate:g}-k{dataset.cardinality}-s{dataset.seed}")
+
+
+def generate_frame(dataset):
+    """
+    DataFrame for a spec; the same spec always gives the same frame
+    Numeric columns mix distributions (normal, skewed, integer counts, and
+    columns correlated with the first one); categorical columns draw from
+    cardinality labels with Zipf-like frequencies; missing values are spread
+    uniformly over all columns at missing_rate
+    """
+    rng = np.random.default_rng(dataset.seed)
+    rows = dataset.rows
+    columns = {}
+
+    base = rng.normal(size=rows)
+    for i in range(dataset.numeric):
+        kind = i % 4
+        if kind == 0:
+            values = rng.normal(loc=i, scale=1 + i, size=rows)
+        elif kind == 1:
+            values = rng.lognormal(mean=0, sigma=1, size=rows)
+        elif kind == 2:
+            values = rng.poisson(lam=5 + i, size=rows).astype(float)
+        else:
+            values = base * rng.uniform(0.5, 2) + rng.normal(scale=0.5, size=rows)
+        columns[f'num_{i}'] = values
+
+    labels = np.array([f'label_{j}' for j in range(dataset.cardinality)], dtype=object)
+    weights = 1.0 / np.arange(1, dataset.cardinality + 1)
+    weights /= weights.sum()
+    for i in range(dataset.categorical):
+        columns[f'cat_{i}'] = labels[rng.choice(dataset.cardinality, size=rows, p=weights)]
+
+    start = np.datetime64('2020-01-01T00:00:00')
+    for i in range(dataset.datetime):
+        offsets = rng.integers(0, 5 * 365 * 24 * 3600, size=rows)
+        columns[f'date_{i}'] = start + offsets.astype('timedelta64[s]')
+
+    frame = pd.DataFrame(columns)
+    if dataset.missing_rate > 0:
+        mask = rng.random(frame.shape) < dataset.missing_rate
+        frame = frame.mask(mask)
+    return frame
+
+
+def write_dataset(dataset, directory):
+    """Write the spec's frame in its format under directory (reusing an existing file); returns the path"""
+    path = os.path.join(directory, f'{spec_name(dataset)}.{dataset.format}')
+    if os.path.exists(path):
+        return path
+    os.makedirs(directory, exist_ok=True)
+    frame = generate_frame(dataset)
+    # The temporary name keeps the extension, which pandas uses to pick the Excel writer
+    tmp_path = os.path.join(directory, f'.{os.getpid()}.{os.path.basename(path)}')
+    if dataset.format == 'csv':
+        frame.to_csv(tmp_path, index=False)
+    elif dataset.format == 'json':
+        frame.to_json(tmp_path, orient='records', date_format='iso')
+    elif dataset.format == 'jsonl':
+        frame.to_json(tmp_path, orient='records', date_format='iso', lines=True)
+    else:
+        frame.to_excel(tmp_path, index=False, engine='openpyxl')
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,304 @@
+# Benchmark runner for the load and analysis hot paths
+#
+#   python benchmarks/run.py                        run the quick preset, save benchmarks/results/latest.json
+#   python benchmarks/run.py --preset full          the larger grid of rows, columns, formats, ...
+#   python benchmarks/run.py --update-baseline      also store the results as benchmarks/baseline.json
+#   python benchmarks/run.py --compare              fail (exit 1) on regressions against the baseline
+
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(os.path.dirname(BENCH_DIR), 'backend')
+sys.path.insert(0, BENCH_DIR)
+
+from generate import spec, spec_name, write_dataset
+
+DATA_DIR = os.path.join(BENCH_DIR, 'data')
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+
+STAGES = ['load_data', 'analyze_data', 'generate_visualizations', 'generate_insights']
+STARTUP_STAGES = ['import_app', 'first_request', 'first_chart']
+
+PRESETS = {
+    # A couple of minutes; one dimension varied at a time from a common default
+    'quick': [
+        spec(rows=5_000),
+        spec(rows=50_000),
+        spec(rows=20_000, numeric=40, categorical=10),
+        spec(rows=20_000, numeric=2, categorical=12, datetime=3),
+        spec(rows=20_000, missing_rate=0.3),
+        spec(rows=20_000, cardinality=5_000),
+        spec(rows=5_000, format='json'),
+        spec(rows=5_000, format='jsonl'),
+        spec(rows=5_000, format='xlsx'),
+    ],
+    # Scaling curves for rows and columns in every format
+    'full': [
+        spec(rows=rows, numeric=numeric, categorical=numeric // 2, format=format)
+        for format, sizes in (('csv', [10_000, 100_000, 1_000_000]),
+                              ('json', [10_000, 100_000]),
+                              ('xlsx', [10_000, 50_000]))
+        for rows in sizes
+        for numeric in (8, 64)
+    ] + [
+        spec(rows=100_000, missing_rate=missing_rate) for missing_rate in (0.0, 0.2, 0.5)
+    ] + [
+        spec(rows=100_000, cardinality=cardinality) for cardinality in (10, 1_000, 50_000)
+    ],
+}
+
+# Allowed growth over the baseline before a measurement counts as a regression
+THRESHOLDS = {'wall_seconds': 0.25, 'peak_rss_mb': 0.20, 'payload_bytes': 0.10}
+
+# Smaller absolute differences are treated as noise whatever the ratio
+MIN_DELTAS = {'wall_seconds': 0.1, 'peak_rss_mb': 16, 'payload_bytes': 1024}
+
+# Interval between resident set size samples, in seconds
+RSS_SAMPLE_INTERVAL = 0.002
+
+
+def current_rss():
+    """Resident set size of this process in bytes (high-water mark where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Kilobytes on Linux, bytes on macOS
+        return usage if sys.platform == 'darwin' else usage * 1024
+
+
+class PeakRSS:
+    """Context manager recording the peak resident set size while its block runs"""
+
+    def __enter__(self):
+        self.start = self.peak = current_rss()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(RSS_SAMPLE_INTERVAL):
+            self.peak = max(self.peak, current_rss())
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss())
+        return False
+
+
+def payload_size(value):
+    """Bytes of the JSON the app would send for a stage result (None for DataFrames)"""
+    if value is None or hasattr(value, 'to_numpy'):
+        return None
+    if isinstance(value, dict) and all(isinstance(item, str) for item in value.values()):
+        # Charts are already JSON text and are sent as they are
+        return sum(len(item.encode('utf-8')) for item in value.values())
+    return len(json.dumps(value, default=str).encode('utf-8'))
+
+
+def measure(stage, run):
+    gc.collect()
+    with PeakRSS() as rss:
+        started = time.perf_counter()
+        value = run()
+        wall = time.perf_counter() - started
+    return value, {
+        'stage': stage,
+        'wall_seconds': wall,
+        'peak_rss_mb': rss.peak / 1024**2,
+        'rss_growth_mb': (rss.peak - rss.start) / 1024**2,
+        'payload_bytes': payload_size(value)
+    }
+
+
+def run_scenario(path):
+    """
+    Run every stage once on one dataset file and return the stage measurements
+    Called in a fresh process so stages of earlier scenarios do not inflate
+    the memory figures
+    """
+    sys.path.insert(0, BACKEND_DIR)
+    from analysis import load_data, analyze_data, generate_visualizations, generate_insights
+    from profiling import column_kind
+
+    data, load = measure('load_data', lambda: load_data(path, use_sidecar=False))
+    numeric_columns = [col for col, dtype in data.dtypes.items() if column_kind(dtype) == 'numeric']
+    categorical_columns = [col for col, dtype in data.dtypes.items() if column_kind(dtype) == 'categorical']
+
+    # Each stage builds its own profile, so it pays for everything it needs
+    _, analyze = measure('analyze_data', lambda: analyze_data(data))
+    _, visualize = measure('generate_visualizations',
+                           lambda: generate_visualizations(data, numeric_columns, categorical_columns))
+    _, insights = measure('generate_insights', lambda: generate_insights(data, numeric_columns))
+    return [load, analyze, visualize, insights]
+
+
+# Runs in a fresh interpreter (argv[1] is the backend directory) and prints the
+# cold start timings; pandas must not be imported before app is
+STARTUP_PROBE = """
+import json, resource, sys, time
+sys.path.insert(0, sys.argv[1])
+timings = {}
+started = time.perf_counter()
+from app import app
+timings['import_app'] = time.perf_counter() - started
+started = time.perf_counter()
+app.test_client().get('/')
+timings['first_request'] = time.perf_counter() - started
+from analysis import build_visualization
+from warmup import warmup_frame
+data = warmup_frame()
+started = time.perf_counter()
+build_visualization(data, 'data_types_pie').to_json()
+timings['first_chart'] = time.perf_counter() - started
+print(json.dumps({'timings': timings, 'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))
+"""
+
+
+def run_startup(repeat=1):
+    """
+    Time a cold start of the web app, keeping the fastest of repeat runs:
+    importing it, serving the first request and building the first chart
+    (which pays for Plotly's import)
+    """
+    print("startup")
+    best = {}
+    for _ in range(repeat):
+        probe = subprocess.run([sys.executable, '-c', STARTUP_PROBE, BACKEND_DIR],
+                               capture_output=True, text=True, check=True)
+        measured = json.loads(probe.stdout.strip().splitlines()[-1])
+        peak_rss_mb = measured['peak_rss_kb'] / (1024**2 if sys.platform == 'darwin' else 1024)
+        for stage, wall in measured['timings'].items():
+            if stage not in best or wall < best[stage]['wall_seconds']:
+                best[stage] = {'stage': stage, 'wall_seconds': wall, 'peak_rss_mb': peak_rss_mb,
+                               'rss_growth_mb': None, 'payload_bytes': None}
+    results = []
+    for stage in STARTUP_STAGES:
+        row = best[stage]
+        print(f"  {stage:<24} {row['wall_seconds']:8.3f} s {row['peak_rss_mb']:8.1f} MB")
+        results.append({'dataset': 'startup', 'params': {}, **row})
+    return results
+
+
+def run_preset(datasets, repeat=1):
+    """Measure every dataset, keeping the fastest of repeat runs of each stage"""
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for dataset in datasets:
+        name = spec_name(dataset)
+        path = write_dataset(dataset, DATA_DIR)
+        print(f"{name} ({os.path.getsize(path) / 1024**2:.1f} MB)")
+        best = {}
+        for _ in range(repeat):
+            with context.Pool(1) as pool:
+                for row in pool.apply(run_scenario, (path,)):
+                    if row['stage'] not in best or row['wall_seconds'] < best[row['stage']]['wall_seconds']:
+                        best[row['stage']] = row
+        for stage in STAGES:
+            row = best[stage]
+            payload = '-' if row['payload_bytes'] is None else f"{row['payload_bytes'] / 1024:.1f} KB"
+            print(f"  {stage:<24} {row['wall_seconds']:8.3f} s {row['peak_rss_mb']:8.1f} MB  {payload}")
+            results.append({'dataset': name, 'params': dataset._asdict(), **row})
+    return results
+
+
+def environment():
+    import numpy
+    import pandas
+    return {
+        'python': platform.python_version(),
+        'pandas': pandas.__version__,
+        'numpy': numpy.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count()
+    }
+
+
+def compare(results, baseline, thresholds=THRESHOLDS):
+    """
+    Measurements that grew past their threshold relative to the baseline
+    Returns a list of (dataset, stage, metric, baseline value, new value)
+    """
+    previous = {(row['dataset'], row['stage']): row for row in baseline['results']}
+    regressions = []
+    for row in results:
+        old = previous.get((row['dataset'], row['stage']))
+        if old is None:
+            continue
+        for metric, threshold in thresholds.items():
+            before, after = old.get(metric), row.get(metric)
+            if before is None or after is None:
+                continue
+            if after - before > MIN_DELTAS[metric] and after > before * (1 + threshold):
+                regressions.append((row['dataset'], row['stage'], metric, before, after))
+    return regressions
+
+
+def save(report, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved {path}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark load_data and the analysis stages on synthetic data')
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='quick')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per dataset; the fastest is kept')
+    parser.add_argument('--output', default=os.path.join(RESULTS_DIR, 'latest.json'))
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--compare', action='store_true', help='exit 1 if any measurement regressed')
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args(argv)
+
+    report = {
+        'preset': args.preset,
+        'timestamp': datetime.now().isoformat(),
+        'environment': environment(),
+        'thresholds': THRESHOLDS,
+        'results': run_startup(repeat=args.repeat) + run_preset(PRESETS[args.preset], repeat=args.repeat)
+    }
+    save(report, args.output)
+
+    status = 0
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"No baseline at {args.baseline}; run with --update-baseline first")
+            status = 2
+        else:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+            if baseline.get('environment') != report['environment']:
+                print("Warning: baseline was recorded in a different environment")
+            regressions = compare(report['results'], baseline)
+            for dataset, stage, metric, before, after in regressions:
+                growth = f"+{(after / before - 1) * 100:.0f}%" if before else "new"
+                print(f"REGRESSION {dataset} {stage} {metric}: {before:.3f} -> {after:.3f} "
+                      f"({growth}, limit {THRESHOLDS[metric] * 100:.0f}%)")
+            if regressions:
+                status = 1
+            else:
+                print("No regressions against the baseline")
+
+    if args.update_baseline:
+        save(report, args.baseline)
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -37,6 +37,59 @@ document.addEventListener('DOMContentLoaded', function() {
         observer.observe(card);
     });
 
+    // Lazy chart loading: each figure is fetched only when its container nears the viewport
+    const chartError = '<div class="chart-error"><i class="fas fa-exclamation-triangle"></i> Error loading visualization</div>';
+    const chartRequests = new Map();
+
+    function loadChart(chartDiv) {
+        if (chartRequests.has(chartDiv)) {
+            return chartRequests.get(chartDiv);
+        }
+        
+        const request = fetch(chartDiv.dataset.chartUrl)
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error(`Chart request failed with status ${response.status}`);
+                }
+                return response.json();
+            })
+            .then(plotData => {
+                chartDiv.innerHTML = '';
+                if (plotData && plotData.data && plotData.layout) {
+                    return Plotly.newPlot(chartDiv, plotData.data, plotData.layout, {
+                        responsive: true,
+                        displayModeBar: true,
+                        displaylogo: false
+                    });
+                }
+                chartDiv.innerHTML = '<div class="chart-error"><i class="fas fa-exclamation-triangle"></i> Chart data not available</div>';
+            })
+            .catch(error => {
+                console.error('Error rendering chart:', error);
+                chartDiv.innerHTML = chartError;
+            });
+        
+        chartRequests.set(chartDiv, request);
+        return request;
+    }
+
+    const lazyCharts = document.querySelectorAll('.chart-container[data-chart-url]');
+    const chartObserver = new IntersectionObserver(function(entries) {
+        entries.forEach(entry => {
+            if (entry.isIntersecting) {
+                chartObserver.unobserve(entry.target);
+                loadChart(entry.target);
+            }
+        });
+    }, { rootMargin: '200px 0px' });
+    
+    lazyCharts.forEach(chartDiv => chartObserver.observe(chartDiv));
+
+    // Load every chart that has not been scrolled to yet (used before exporting)
+    function loadAllCharts() {
+        return Promise.all(Array.from(lazyCharts).map(loadChart));
+    }
+
     // Table responsiveness helper
     const tables = document.querySelectorAll('.data-table');
     tables.forEach(table => {
@@ -56,6 +109,262 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     });
 
+    // Data browser: a virtual-scrolling table over /data. Only the rows in view
+    // (plus a few either side) exist in the DOM, and rows are fetched in pages
+    // that are kept until the sort or filters change
+    const dataBrowser = document.querySelector('.data-browser');
+    if (dataBrowser) {
+        initDataBrowser(dataBrowser);
+    }
+
+    function initDataBrowser(container) {
+        const ROW_HEIGHT = 32;
+        const PAGE_SIZE = 100;
+        const OVERSCAN = 10;
+        const MAX_CACHED_PAGES = 50;
+        // Browsers cap element heights (around 33M px), so very long tables scroll proportionally
+        const MAX_SCROLL_HEIGHT = 10000000;
+
+        const viewport = container.querySelector('.browser-viewport');
+        const spacer = container.querySelector('.browser-spacer');
+        const headRow = container.querySelector('.browser-head thead tr');
+        const body = container.querySelector('.browser-body');
+        const tbody = body.querySelector('tbody');
+        const status = container.querySelector('.browser-status');
+        const filterColumn = container.querySelector('.browser-filter-column');
+        const filterOperator = container.querySelector('.browser-filter-operator');
+        const filterValue = container.querySelector('.browser-filter-value');
+        const filterChips = container.querySelector('.browser-filters');
+
+        const state = { columns: [], total: 0, matched: 0, sort: null, order: 'asc', filters: [] };
+        let pages = new Map();
+        let pending = new Map();
+        // Bumped whenever the query changes so responses to an older query are ignored
+        let generation = 0;
+        let frameRequested = false;
+
+        function pageUrl(pageIndex) {
+            const url = new URL(container.dataset.url, window.location.origin);
+            url.searchParams.set('offset', pageIndex * PAGE_SIZE);
+            url.searchParams.set('limit', PAGE_SIZE);
+            if (state.sort !== null) {
+                url.searchParams.set('sort', state.sort);
+                url.searchParams.set('order', state.order);
+            }
+            if (state.filters.length) {
+                url.searchParams.set('filters', JSON.stringify(state.filters));
+            }
+            return url;
+        }
+
+        function fetchPage(pageIndex) {
+            if (pages.has(pageIndex) || pending.has(pageIndex)) {
+                return pending.get(pageIndex);
+            }
+            const requestGeneration = generation;
+            const request = fetch(pageUrl(pageIndex))
+                .then(response => response.json().then(data => {
+                    if (!response.ok) {
+                        throw new Error(data.error || `Data request failed with status ${response.status}`);
+                    }
+                    return data;
+                }))
+                .then(data => {
+                    if (requestGeneration !== generation) {
+                        return;
+                    }
+                    pending.delete(pageIndex);
+                    pages.set(pageIndex, data);
+                    if (pages.size > MAX_CACHED_PAGES) {
+                        pages.delete(pages.keys().next().value);
+                    }
+                    if (!state.columns.length) {
+                        setColumns(data.columns);
+                    }
+                    state.total = data.total_rows;
+                    state.matched = data.matched_rows;
+                    updateStatus();
+                    scheduleRender();
+                })
+                .catch(error => {
+                    if (requestGeneration !== generation) {
+                        return;
+                    }
+                    pending.delete(pageIndex);
+                    console.error('Error loading rows:', error);
+                    status.textContent = error.message;
+                    status.classList.add('error');
+                });
+            pending.set(pageIndex, request);
+            return request;
+        }
+
+        function setColumns(columns) {
+            state.columns = columns;
+            headRow.innerHTML = '';
+            const indexHeader = document.createElement('th');
+            indexHeader.className = 'row-number';
+            indexHeader.textContent = '#';
+            headRow.appendChild(indexHeader);
+            columns.forEach(column => {
+                const th = document.createElement('th');
+                th.textContent = column;
+                th.title = `Sort by ${column}`;
+                th.dataset.column = column;
+                th.addEventListener('click', () => toggleSort(column));
+                headRow.appendChild(th);
+
+                const option = document.createElement('option');
+                option.value = column;
+                option.textContent = column;
+                filterColumn.appendChild(option);
+            });
+            const width = `${columns.length * 160 + 80}px`;
+            container.querySelector('.browser-head').style.width = width;
+            body.style.width = width;
+        }
+
+        function updateStatus() {
+            status.classList.remove('error');
+            const matched = state.matched.toLocaleString();
+            status.textContent = state.filters.length
+                ? `${matched} of ${state.total.toLocaleString()} rows match`
+                : `${matched} rows`;
+            spacer.style.height = `${Math.min(state.matched * ROW_HEIGHT, MAX_SCROLL_HEIGHT)}px`;
+            headRow.querySelectorAll('th[data-column]').forEach(th => {
+                th.classList.toggle('sorted-asc', th.dataset.column === state.sort && state.order === 'asc');
+                th.classList.toggle('sorted-desc', th.dataset.column === state.sort && state.order === 'desc');
+            });
+        }
+
+        function scheduleRender() {
+            if (!frameRequested) {
+                frameRequested = true;
+                requestAnimationFrame(render);
+            }
+        }
+
+        function render() {
+            frameRequested = false;
+            const visibleRows = Math.ceil(viewport.clientHeight / ROW_HEIGHT);
+            const fullHeight = state.matched * ROW_HEIGHT;
+            let first;
+            let top;
+            if (fullHeight <= MAX_SCROLL_HEIGHT) {
+                first = Math.floor(viewport.scrollTop / ROW_HEIGHT);
+                top = first * ROW_HEIGHT;
+            } else {
+                const lastFirst = Math.max(0, state.matched - visibleRows);
+                const scrollRange = Math.max(1, viewport.scrollHeight - viewport.clientHeight);
+                first = Math.min(lastFirst, Math.floor(viewport.scrollTop / scrollRange * lastFirst));
+                top = viewport.scrollTop;
+            }
+            const start = Math.max(0, first - OVERSCAN);
+            const end = Math.min(state.matched, first + visibleRows + OVERSCAN);
+            body.style.transform = `translateY(${top - (first - start) * ROW_HEIGHT}px)`;
+
+            for (let page = Math.floor(start / PAGE_SIZE); page <= Math.floor(Math.max(start, end - 1) / PAGE_SIZE); page++) {
+                fetchPage(page);
+            }
+
+            const fragment = document.createDocumentFragment();
+            for (let i = start; i < end; i++) {
+                const page = pages.get(Math.floor(i / PAGE_SIZE));
+                const offset = i % PAGE_SIZE;
+                const tr = document.createElement('tr');
+                const indexCell = document.createElement('td');
+                indexCell.className = 'row-number';
+                indexCell.textContent = page ? (page.row_ids[offset] + 1).toLocaleString() : '';
+                tr.appendChild(indexCell);
+                state.columns.forEach((_, c) => {
+                    const td = document.createElement('td');
+                    if (!page) {
+                        td.className = 'loading-cell';
+                        td.textContent = '…';
+                    } else if (page.rows[offset][c] === null) {
+                        td.className = 'null-cell';
+                        td.textContent = 'null';
+                    } else {
+                        td.textContent = page.rows[offset][c];
+                        td.title = td.textContent;
+                    }
+                    tr.appendChild(td);
+                });
+                fragment.appendChild(tr);
+            }
+            tbody.replaceChildren(fragment);
+        }
+
+        function reload() {
+            generation++;
+            pages = new Map();
+            pending = new Map();
+            viewport.scrollTop = 0;
+            fetchPage(0);
+        }
+
+        function toggleSort(column) {
+            // Unsorted -> ascending -> descending -> unsorted
+            if (state.sort !== column) {
+                state.sort = column;
+                state.order = 'asc';
+            } else if (state.order === 'asc') {
+                state.order = 'desc';
+            } else {
+                state.sort = null;
+                state.order = 'asc';
+            }
+            reload();
+        }
+
+        function renderFilterChips() {
+            filterChips.innerHTML = '';
+            state.filters.forEach((filter, index) => {
+                const chip = document.createElement('span');
+                chip.className = 'filter-chip';
+                const operator = filterOperator.querySelector(`option[value="${filter[1]}"]`).textContent;
+                chip.textContent = filter.length === 3 ? `${filter[0]} ${operator} ${filter[2]}` : `${filter[0]} ${operator}`;
+                const remove = document.createElement('button');
+                remove.type = 'button';
+                remove.innerHTML = '<i class="fas fa-times"></i>';
+                remove.title = 'Remove filter';
+                remove.addEventListener('click', () => {
+                    state.filters.splice(index, 1);
+                    renderFilterChips();
+                    reload();
+                });
+                chip.appendChild(remove);
+                filterChips.appendChild(chip);
+            });
+        }
+
+        function addFilter() {
+            const operator = filterOperator.value;
+            const needsValue = operator !== 'null' && operator !== 'notnull';
+            if (!filterColumn.value || (needsValue && filterValue.value === '')) {
+                return;
+            }
+            state.filters.push(needsValue ? [filterColumn.value, operator, filterValue.value] : [filterColumn.value, operator]);
+            filterValue.value = '';
+            renderFilterChips();
+            reload();
+        }
+
+        container.querySelector('.browser-filter-add').addEventListener('click', addFilter);
+        filterValue.addEventListener('keydown', e => {
+            if (e.key === 'Enter') {
+                addFilter();
+            }
+        });
+        filterOperator.addEventListener('change', () => {
+            filterValue.disabled = filterOperator.value === 'null' || filterOperator.value === 'notnull';
+        });
+        viewport.addEventListener('scroll', scheduleRender, { passive: true });
+        window.addEventListener('resize', scheduleRender);
+
+        fetchPage(0);
+    }
+
     // PDF download functionality
     const downloadPdfBtn = document.getElementById('downloadPdfBtn');
     if (downloadPdfBtn) {
@@ -83,7 +392,8 @@ document.addEventListener('DOMContentLoaded', function() {
                 return;
             }
 
-            html2canvas(element, {
+            // Charts off screen have not been fetched yet; render them before capturing
+            loadAllCharts().then(() => html2canvas(element, {
                 scale: 1.5,
                 useCORS: true,
                 allowTaint: true,
@@ -93,7 +403,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 height: element.scrollHeight,
                 scrollX: 0,
                 scrollY: 0
-            }).then(canvas => {
+            })).then(canvas => {
                 const imgData = canvas.toDataURL('image/png', 0.8);
                 const { jsPDF } = window.jspdf;
                 const pdf = new jsPDF('p', 'mm', 'a4');
@@ -204,7 +514,7 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     // Enhanced error handling for missing visualizations
-    document.querySelectorAll('.chart-container').forEach(chartDiv => {
+    document.querySelectorAll('.chart-container:not([data-chart-url])').forEach(chartDiv => {
         if (!chartDiv.hasChildNodes() || chartDiv.children.length === 0) {
             chartDiv.innerHTML = `
                 <div style="display: flex; align-items: center; justify-content: center; height: 200px; color: #718096; flex-direction: column;">
@@ -13,6 +13,7 @@ document.addEventListener('DOMContentLoaded', function() {
     const progressFill = document.getElementById('progressFill');
     const progressText = document.getElementById('progressText');
     const statusMessage = document.getElementById('statusMessage');
+    const fastMode = document.getElementById('fastMode');
 
     let selectedFile = null;
 
@@ -59,7 +60,7 @@ document.addEventListener('DOMContentLoaded', function() {
         if (!file) return;
 
         // Validate file type
-        const allowedTypes = ['.csv', '.json', '.xlsx', '.xls'];
+        const allowedTypes = ['.csv', '.json', '.jsonl', '.ndjson', '.xlsx', '.xls', '.gz', '.bz2', '.xz', '.zip'];
         const fileExtension = '.' + file.name.split('.').pop().toLowerCase();
         
         if (!allowedTypes.includes(fileExtension)) {
@@ -157,6 +158,35 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
+    const stageLabels = {
+        queued: 'Waiting for a worker',
+        loading: 'Loading data',
+        stats: 'Computing statistics',
+        visualizations: 'Building visualizations',
+        insights: 'Generating insights',
+        done: 'Analysis complete'
+    };
+
+    // Poll a background analysis job, updating the progress bar until it is done
+    async function waitForJob(statusUrl) {
+        while (true) {
+            const response = await fetch(statusUrl);
+            if (!response.ok) {
+                const errorData = await response.json().catch(() => ({}));
+                throw new Error(errorData.error || `Status check failed with status ${response.status}`);
+            }
+            
+            const job = await response.json();
+            progressFill.style.width = job.progress + '%';
+            progressText.textContent = `${stageLabels[job.stage] || 'Analyzing'}... ${job.progress}%`;
+            
+            if (job.status === 'done') return job;
+            if (job.status === 'failed') throw new Error(job.error || 'Analysis failed');
+            
+            await new Promise(resolve => setTimeout(resolve, 500));
+        }
+    }
+
     // Analyze button handler
     analyzeBtn.addEventListener('click', async () => {
         if (!selectedFile) {
@@ -195,7 +225,8 @@ document.addEventListener('DOMContentLoaded', function() {
                     'Content-Type': 'application/json'
                 },
                 body: JSON.stringify({
-                    file_path: uploadResult.filename
+                    file_path: uploadResult.filename,
+                    mode: fastMode && fastMode.checked ? 'fast' : 'exact'
                 })
             });
             
@@ -206,6 +237,12 @@ document.addEventListener('DOMContentLoaded', function() {
             
             const analyzeResult = await analyzeResponse.json();
             
+            // Analysis runs as a background job; follow it until it finishes
+            // (fast mode already returned sampled results, so go straight to them)
+            if (analyzeResult.job_id && !analyzeResult.analysis) {
+                await waitForJob(analyzeResult.status_url);
+            }
+            
             // Redirect to results page
             if (analyzeResult.redirect_url) {
                 window.location.href = analyzeResult.redirect_url;
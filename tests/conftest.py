@@ -0,0 +1,91 @@
+# Shared test setup: the backend on the import path and the app's uploads in a temporary folder
+
+import io
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
+sys.path.insert(0, BACKEND_DIR)
+
+# Must be set before app is first imported
+UPLOAD_FOLDER = tempfile.mkdtemp(prefix='analyzer-tests-')
+os.environ['ANALYZER_UPLOAD_FOLDER'] = UPLOAD_FOLDER
+
+
+@pytest.fixture(scope='session', autouse=True)
+def _remove_upload_folder():
+    yield
+    # Background jobs still write their status and metrics there
+    app = sys.modules.get('app')
+    if app is not None and app._executor is not None:
+        app._executor.shutdown(wait=True)
+    shutil.rmtree(UPLOAD_FOLDER, ignore_errors=True)
+
+
+@pytest.fixture(scope='session')
+def app_module():
+    import app
+    return app
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+
+@pytest.fixture
+def upload(client):
+    """Post bytes to /upload under a file name and return the response"""
+    def post(data, filename):
+        return client.post('/upload', data={'file': (io.BytesIO(data), filename)},
+                           content_type='multipart/form-data')
+    return post
+
+
+@pytest.fixture
+def log_lines():
+    """JSON lines logged under data_analyzer while the test runs"""
+    import metrics
+    lines = []
+
+    class Collect(logging.Handler):
+        def emit(self, record):
+            lines.append(json.loads(record.getMessage()))
+
+    handler = Collect()
+    metrics.root_logger.addHandler(handler)
+    level = metrics.root_logger.level
+    metrics.root_logger.setLevel(logging.INFO)
+    yield lines
+    metrics.root_logger.removeHandler(handler)
+    metrics.root_logger.setLevel(level)
+
+
+@pytest.fixture
+def sample_frame():
+    """A small mixed-type dataset (numbers, categories, text, dates, missing values)"""
+    import numpy as np
+    import pandas as pd
+    rng = np.random.default_rng(0)
+    n = 500
+    data = pd.DataFrame({
+        'id': np.arange(n),
+        'amount': rng.normal(100, 15, n).round(2),
+        'quantity': rng.integers(1, 20, n),
+        'region': rng.choice(['north', 'south', 'east', 'west'], n),
+        'note': [f'note {i}' for i in range(n)],
+        'day': pd.date_range('2024-01-01', periods=n, freq='h').strftime('%Y-%m-%d %H:%M:%S'),
+    })
+    data.loc[::25, 'amount'] = np.nan
+    return data
+
+
+@pytest.fixture
+def sample_csv(sample_frame):
+    return sample_frame.to_csv(index=False).encode('utf-8')
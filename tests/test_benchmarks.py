@@ -0,0 +1,53 @@
+# Benchmark dataset generator and regression check
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+from generate import generate_frame, spec, spec_name, write_dataset
+from run import compare
+
+
+def test_specs_are_validated_and_named():
+    dataset = spec(rows=100, numeric=2, categorical=1, datetime=0, format='jsonl')
+    assert spec_name(dataset) == 'jsonl-r100-n2-c1-d0-m0.05-k50-s0'
+    with pytest.raises(ValueError):
+        spec(format='parquet')
+    with pytest.raises(ValueError):
+        spec(missing_rate=1.0)
+
+
+def test_frames_are_reproducible():
+    dataset = spec(rows=500, numeric=4, categorical=2, datetime=1, cardinality=5)
+    frame = generate_frame(dataset)
+    pd.testing.assert_frame_equal(frame, generate_frame(dataset))
+    assert list(frame.columns) == ['num_0', 'num_1', 'num_2', 'num_3', 'cat_0', 'cat_1', 'date_0']
+    assert frame['cat_0'].nunique() <= 5
+    assert 0 < frame.isna().mean().mean() < 0.1
+
+
+def test_written_datasets_are_reused(tmp_path):
+    dataset = spec(rows=50, format='csv')
+    path = write_dataset(dataset, str(tmp_path))
+    modified = os.stat(path).st_mtime_ns
+    assert write_dataset(dataset, str(tmp_path)) == path
+    assert os.stat(path).st_mtime_ns == modified
+    assert len(pd.read_csv(path)) == 50
+
+
+def test_compare_flags_only_growth_past_threshold_and_noise():
+    baseline = {'results': [
+        {'dataset': 'd', 'stage': 'load_data', 'wall_seconds': 1.0, 'peak_rss_mb': 100, 'payload_bytes': None},
+        {'dataset': 'd', 'stage': 'analyze_data', 'wall_seconds': 0.01, 'peak_rss_mb': 100, 'payload_bytes': 10_000},
+    ]}
+    results = [
+        {'dataset': 'd', 'stage': 'load_data', 'wall_seconds': 1.5, 'peak_rss_mb': 110, 'payload_bytes': None},
+        # Tripled, but by less than the minimum delta
+        {'dataset': 'd', 'stage': 'analyze_data', 'wall_seconds': 0.03, 'peak_rss_mb': 100, 'payload_bytes': 10_500},
+        {'dataset': 'new', 'stage': 'load_data', 'wall_seconds': 9.0, 'peak_rss_mb': 1, 'payload_bytes': None},
+    ]
+    assert compare(results, baseline) == [('d', 'load_data', 'wall_seconds', 1.0, 1.5)]
@@ -0,0 +1,70 @@
+# Paged, sorted and filtered row access behind /data
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from browse import TableBrowser, parse_filters, table_from_frame
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        'n': [3.0, np.nan, 1.0, 2.0, None, 5.0],
+        'name': ['cat', 'Dog', 'cow', None, 'doe', 'eel'],
+        'flag': [True, False, True, False, True, False],
+    })
+
+
+def test_parse_filters_validates_triples():
+    assert parse_filters(None) == ()
+    assert parse_filters('[["n", "gt", 2], ["name", "null"]]') == (('n', 'gt', '2'), ('name', 'null', None))
+    for text in ('{"n": 1}', '[["n", "approx", 1]]', '[["n", "gt"]]', 'not json'):
+        with pytest.raises(ValueError):
+            parse_filters(text)
+
+
+def test_sorting_keeps_missing_values_last_in_both_orders(frame, tmp_path):
+    written = []
+    browser = TableBrowser(table_from_frame(frame), index_dir=str(tmp_path / 'index'), on_write=written.append)
+    ascending = browser.page(sort='n')
+    assert [row[0] for row in ascending['rows']] == [1.0, 2.0, 3.0, 5.0, None, None]
+    descending = browser.page(sort='n', descending=True)
+    assert [row[0] for row in descending['rows']] == [5.0, 3.0, 2.0, 1.0, None, None]
+    assert descending['row_ids'][:2] == [5, 0]
+    # The permutation is saved once and reused by a new browser
+    assert written == [str(tmp_path / 'index')]
+    reopened = TableBrowser(table_from_frame(frame), index_dir=str(tmp_path / 'index'), on_write=written.append)
+    assert reopened.page(sort='n')['row_ids'] == ascending['row_ids']
+    assert len(written) == 1
+
+
+def test_filters_and_paging(frame):
+    browser = TableBrowser(table_from_frame(frame))
+    page = browser.page(offset=1, limit=2, sort='n', filters=parse_filters('[["flag", "eq", "true"]]'))
+    assert (page['matched_rows'], page['total_rows']) == (3, 6)
+    assert page['row_ids'] == [0, 4]
+    assert browser.page(filters=parse_filters('[["name", "startswith", "d"]]'))['row_ids'] == [1, 4]
+    assert browser.page(filters=parse_filters('[["n", "null"]]'))['row_ids'] == [1, 4]
+    with pytest.raises(ValueError):
+        browser.page(filters=parse_filters('[["n", "gt", "many"]]'))
+    with pytest.raises(ValueError):
+        browser.page(sort='missing')
+
+
+def test_data_endpoint(client, upload, sample_frame):
+    data = sample_frame.iloc[:150]
+    upload(data.to_csv(index=False).encode(), 'browse.csv')
+    filters = json.dumps([['region', 'eq', data['region'].iloc[0]]])
+    page = client.get(f'/data/browse.csv?limit=10&sort=quantity&order=desc&filters={filters}').get_json()
+    assert page['total_rows'] == 150 and len(page['rows']) == 10
+    assert page['matched_rows'] == (data['region'] == data['region'].iloc[0]).sum()
+    quantities = [row[page['columns'].index('quantity')] for row in page['rows']]
+    assert quantities == sorted(quantities, reverse=True)
+
+    assert client.get('/data/browse.csv?limit=0').status_code == 400
+    assert client.get('/data/browse.csv?order=up').status_code == 400
+    assert client.get('/data/browse.csv?sort=nope').status_code == 400
+    assert client.get('/data/nothing.csv').status_code == 404
@@ -0,0 +1,63 @@
+# Content-addressed result cache
+
+from cache import ResultCache, file_digest
+
+
+def test_digest_follows_contents(tmp_path):
+    first, second = tmp_path / 'a.csv', tmp_path / 'b.csv'
+    first.write_text('x\n1\n')
+    second.write_text('x\n1\n')
+    assert file_digest(str(first)) == file_digest(str(second))
+
+    second.write_text('x\n2\n')
+    assert file_digest(str(first)) != file_digest(str(second))
+
+
+def test_results_persist_across_instances(tmp_path):
+    cache = ResultCache(str(tmp_path), version='1')
+    key = cache.key_for('abc', 'fast', 100)
+    cache.set(key, {'rows': 3})
+
+    assert ResultCache(str(tmp_path), version='1').get(key) == {'rows': 3}
+    # Another version never sees the entry
+    other = ResultCache(str(tmp_path), version='2')
+    assert other.get(other.key_for('abc', 'fast', 100)) is None
+
+
+def test_memory_only_cache_writes_nothing(tmp_path):
+    cache = ResultCache(str(tmp_path), persist=False)
+    cache.set(cache.key_for('abc'), 1)
+    assert cache.get(cache.key_for('abc')) == 1
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_get_or_compute_computes_once(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return 'value'
+
+    assert cache.get_or_compute('k', compute) == 'value'
+    assert cache.get_or_compute('k', compute) == 'value'
+    assert len(calls) == 1
+
+
+def test_reupload_with_new_contents_is_analyzed_again(client, upload, sample_frame):
+    upload(sample_frame.to_csv(index=False).encode(), 'cached.csv')
+    first = client.post('/analyze', json={'file_path': 'cached.csv', 'wait': True}).get_json()['analysis']
+
+    upload(sample_frame.head(100).to_csv(index=False).encode(), 'cached.csv')
+    second = client.post('/analyze', json={'file_path': 'cached.csv', 'wait': True}).get_json()['analysis']
+
+    assert first['shape'][0] == 500
+    assert second['shape'][0] == 100
+
+
+def test_unreadable_entries_are_logged_and_dropped(tmp_path, log_lines):
+    cache = ResultCache(str(tmp_path))
+    (tmp_path / 'broken.pkl').write_bytes(b'not a pickle')
+    assert cache.get('broken') is None
+    [line] = [line for line in log_lines if line['event'] == 'cache_entry_unreadable']
+    assert line['path'].endswith('broken.pkl') and line['error']
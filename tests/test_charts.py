@@ -0,0 +1,35 @@
+# Server-side binned histograms and precomputed box plots
+
+import numpy as np
+import pandas as pd
+
+from analysis import MAX_BOX_OUTLIERS, box_figure, histogram_figure
+
+
+def test_histogram_sends_bin_counts_not_values():
+    values = pd.Series(np.random.default_rng(0).normal(size=100_000))
+    fig = histogram_figure(values, 'Distribution', nbins=30)
+    bars = fig.data[0]
+    assert len(bars.x) == len(bars.y) == 30
+    assert int(np.sum(bars.y)) == len(values)
+
+
+def test_histogram_skips_non_finite_values():
+    values = pd.Series([1.0, 2.0, np.inf, np.nan, 2.0])
+    fig = histogram_figure(values, 'Distribution', nbins=2)
+    assert int(np.sum(fig.data[0].y)) == 3
+
+
+def test_box_plot_uses_quartiles_and_caps_outliers():
+    rng = np.random.default_rng(0)
+    values = pd.Series(np.concatenate([rng.normal(size=10_000), rng.normal(50, 1, 2_000), [-100.0]]))
+    stats = values.describe()
+    fig = box_figure(values, stats, 'Box')
+    box, points = fig.data
+
+    assert box.q1[0] == stats['25%'] and box.q3[0] == stats['75%']
+    iqr = stats['75%'] - stats['25%']
+    assert box.upperfence[0] <= stats['75%'] + 1.5 * iqr
+    assert len(points.y) == MAX_BOX_OUTLIERS
+    # The extremes are always kept
+    assert min(points.y) == -100.0 and max(points.y) == values.max()
@@ -0,0 +1,81 @@
+# Compressed and zipped uploads, decompressed on the fly within limits
+
+import bz2
+import gzip
+import io
+import lzma
+import zipfile
+
+import pytest
+
+import compression
+from compression import DecompressionLimitError, configure_decompression, data_format, open_data, split_compression
+
+
+@pytest.fixture
+def limits():
+    """Restores the decompression limits a test changes"""
+    saved = compression._max_bytes, compression._max_ratio
+    yield configure_decompression
+    configure_decompression(*saved)
+
+
+def zipped(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def test_names_give_format_and_compression():
+    assert split_compression('Sales.CSV.GZ') == ('.csv', 'gzip')
+    assert split_compression('sales.csv') == ('.csv', None)
+    assert split_compression('archive.zip') == ('', 'zip')
+
+
+@pytest.mark.parametrize('name, compress', [
+    ('data.csv.gz', gzip.compress), ('data.csv.bz2', bz2.compress), ('data.csv.xz', lzma.compress),
+    ('data.zip', lambda data: zipped({'inner/data.csv': data, '__MACOSX/._data.csv': b'x'})),
+])
+def test_every_format_reads_back(tmp_path, name, compress, sample_csv):
+    path = tmp_path / name
+    path.write_bytes(compress(sample_csv))
+    assert data_format(str(path)) == ('.csv', name.split('.')[-1].replace('gz', 'gzip'))
+    with open_data(str(path)) as f:
+        assert f.read() == sample_csv
+
+
+def test_unsupported_contents_are_rejected(tmp_path):
+    several = tmp_path / 'several.zip'
+    several.write_bytes(zipped({'a.csv': b'a', 'b.csv': b'b'}))
+    workbook = tmp_path / 'book.xlsx.gz'
+    workbook.write_bytes(gzip.compress(b'not a workbook'))
+    for path in (several, workbook):
+        with pytest.raises(ValueError):
+            data_format(str(path))
+
+
+def test_size_and_ratio_limits(tmp_path, limits, monkeypatch):
+    path = tmp_path / 'zeros.csv.gz'
+    path.write_bytes(gzip.compress(b'0\n' * 500_000))
+
+    limits(100_000, 1000)
+    with pytest.raises(DecompressionLimitError, match='too large'), open_data(str(path)) as f:
+        f.read()
+
+    limits(10 * 1024 * 1024, 10)
+    monkeypatch.setattr(compression, 'RATIO_GRACE_BYTES', 0)
+    with pytest.raises(DecompressionLimitError, match='bomb'), open_data(str(path)) as f:
+        f.read()
+
+
+def test_compressed_uploads_are_analyzed_or_rejected(client, upload, sample_frame, limits):
+    data = sample_frame.iloc[:90].to_csv(index=False).encode()
+    assert upload(gzip.compress(data), 'small.csv.gz').status_code == 200
+    analysis = client.post('/analyze', json={'file_path': 'small.csv.gz', 'wait': True}).get_json()['analysis']
+    assert analysis['shape'] == [90, sample_frame.shape[1]]
+
+    limits(len(data) // 2, 1000)
+    response = upload(gzip.compress(sample_frame.iloc[:95].to_csv(index=False).encode()), 'big.csv.gz')
+    assert response.status_code == 413
@@ -0,0 +1,47 @@
+# Blockwise correlations with top-k pairs
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from correlation import correlation_summary, matrix_to_dict
+
+
+@pytest.fixture
+def wide():
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame(rng.normal(size=(400, 30)), columns=[f'c{i}' for i in range(30)])
+    data['twin'] = data['c3'] * 2 + rng.normal(scale=0.01, size=400)
+    data['mirror'] = -data['c7']
+    data.iloc[::9, 5] = np.nan
+    return data
+
+
+@pytest.mark.parametrize('method', ['pearson', 'spearman'])
+def test_pairs_match_pandas_across_tiles(wide, method):
+    # Tiles much smaller than the column count, on two threads
+    summary = correlation_summary(wide, method=method, top_k=5, block_size=8, workers=2)
+    expected = wide.corr(method=method)
+
+    assert summary['columns'] == wide.shape[1]
+    first, second = summary['pairs'][:2]
+    assert {(first['column_1'], first['column_2']), (second['column_1'], second['column_2'])} == {('c3', 'twin'), ('c7', 'mirror')}
+    for pair in summary['pairs']:
+        assert pair['correlation'] == pytest.approx(expected.at[pair['column_1'], pair['column_2']])
+    magnitudes = [abs(pair['correlation']) for pair in summary['pairs']]
+    assert magnitudes == sorted(magnitudes, reverse=True)
+
+
+def test_heatmap_keeps_the_most_correlated_columns(wide):
+    summary = correlation_summary(wide, max_columns=4, block_size=8)
+    assert set(summary['matrix'].columns) == {'c3', 'twin', 'c7', 'mirror'}
+    as_dict = matrix_to_dict(summary['matrix'])
+    assert as_dict['c3']['c3'] == 1.0
+
+
+def test_correlations_endpoint(client, upload, wide):
+    upload(wide.to_csv(index=False).encode(), 'wide.csv')
+    result = client.get('/correlations/wide.csv?method=spearman&top=3').get_json()
+    assert result['method'] == 'spearman' and len(result['pairs']) == 3
+    assert client.get('/correlations/wide.csv?method=kendall').status_code == 400
+    assert client.get('/correlations/wide.csv?top=0').status_code == 400
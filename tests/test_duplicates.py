@@ -0,0 +1,74 @@
+# Hash-based duplicate-row detection
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from duplicates import DuplicateTracker, duplicate_report
+
+
+@pytest.fixture
+def rows():
+    return pd.DataFrame({
+        'k': [1, 2, 1, 3, 1, 2, 4],
+        'v': ['a', 'b', 'a', 'c', 'a', 'x', 'd'],
+    })
+
+
+def test_report_counts_like_pandas_and_lists_groups(rows):
+    report = duplicate_report(rows)
+    assert report['duplicate_rows'] == rows.duplicated().sum() == 2
+    assert report['groups'] == [{'count': 3, 'rows': [0, 2, 4]}]
+
+    by_key = duplicate_report(rows, ['k'])
+    assert by_key['duplicate_rows'] == rows.duplicated(['k']).sum()
+    assert [group['count'] for group in by_key['groups']] == [3, 2]
+    with pytest.raises(ValueError):
+        duplicate_report(rows, ['missing'])
+
+
+def test_numeric_width_does_not_change_hashes():
+    wide = pd.DataFrame({'n': np.array([1, 2], dtype=np.int64)})
+    narrow = pd.DataFrame({'n': np.array([1, 2], dtype=np.int8)})
+    assert duplicate_report(pd.concat([wide, narrow], ignore_index=True))['duplicate_rows'] == 2
+
+
+def test_tracker_across_chunks_matches_whole_frame(rows):
+    tracker = DuplicateTracker()
+    for start in range(0, len(rows), 3):
+        tracker.update(rows.iloc[start:start + 3])
+    assert tracker.report() == {'columns': None, 'duplicate_rows': 2, 'approximate': False,
+                                'groups': [{'count': 3, 'rows': [0]}]}
+
+
+def test_bounded_tracker_estimates_from_kept_rows():
+    rng = np.random.default_rng(1)
+    data = pd.DataFrame({'k': rng.integers(0, 20_000, size=60_000)})
+    tracker = DuplicateTracker(capacity=2_000)
+    for start in range(0, len(data), 7_000):
+        tracker.update(data.iloc[start:start + 7_000])
+    report = tracker.report()
+
+    assert sum(len(run[0]) for run in tracker.runs) <= 2_000
+    assert report['approximate']
+    assert report['duplicate_rows'] == pytest.approx(data.duplicated().sum(), rel=0.15)
+    # Kept groups are whole, so their sizes are exact
+    sizes = data['k'].value_counts()
+    for group in report['groups']:
+        assert group['count'] == sizes[data['k'].iloc[group['rows'][0]]]
+
+
+def test_bounded_trackers_merge_at_the_coarser_sampling():
+    data = pd.DataFrame({'k': np.arange(10_000) % 4_000})
+    first, second = DuplicateTracker(capacity=500), DuplicateTracker(capacity=500)
+    first.update(data.iloc[:5_000])
+    second.update(data.iloc[5_000:])
+    first.merge(second)
+    assert first.report()['duplicate_rows'] == pytest.approx(6_000, rel=0.25)
+
+
+def test_duplicates_endpoint(client, upload, rows):
+    upload(rows.to_csv(index=False).encode(), 'dups.csv')
+    assert client.get('/duplicates/dups.csv').get_json()['duplicate_rows'] == 2
+    assert client.get('/duplicates/dups.csv?columns=k').get_json()['duplicate_rows'] == 3
+    assert client.get('/duplicates/dups.csv?columns=nope').status_code == 400
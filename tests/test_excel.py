@@ -0,0 +1,74 @@
+# Streaming Excel ingestion with sheet selection
+
+import io
+
+import pandas as pd
+import pytest
+
+from excel import detect_excel_format, list_sheets, read_excel_sheet
+
+
+def workbook_bytes(a=(1, 2, 3)):
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
+        pd.DataFrame({'a': list(a), 'b': ['x', 'y', None]}).to_excel(writer, sheet_name='first', index=False)
+        pd.DataFrame({'c': [1.5, 2.5]}).to_excel(writer, sheet_name='second', index=False)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    path = tmp_path / 'book.xlsx'
+    path.write_bytes(workbook_bytes())
+    return str(path)
+
+
+def test_sheets_are_listed_and_read_on_demand(workbook):
+    assert list_sheets(workbook) == ['first', 'second']
+    first = read_excel_sheet(workbook)
+    assert first['a'].tolist() == [1, 2, 3]
+    assert first['b'].isna().tolist() == [False, False, True]
+    assert read_excel_sheet(workbook, 'second')['c'].tolist() == [1.5, 2.5]
+    with pytest.raises(ValueError, match='not found'):
+        read_excel_sheet(workbook, 'third')
+
+
+def test_format_comes_from_the_file_not_its_name(tmp_path, workbook):
+    renamed = tmp_path / 'book.xls'
+    renamed.write_bytes(open(workbook, 'rb').read())
+    assert detect_excel_format(str(renamed)) == 'xlsx'
+    assert read_excel_sheet(str(renamed))['a'].tolist() == [1, 2, 3]
+
+    text = tmp_path / 'text.xlsx'
+    text.write_text('a,b\n1,2\n')
+    assert detect_excel_format(str(text)) is None
+    with pytest.raises(ValueError):
+        list_sheets(str(text))
+
+
+def test_upload_lists_sheets_and_analyzes_the_selected_one(client, upload):
+    response = upload(workbook_bytes(), 'book.xlsx').get_json()
+    assert response['sheets'] == ['first', 'second']
+
+    analysis = client.post('/analyze', json={'file_path': 'book.xlsx', 'sheet': 'second', 'wait': True}).get_json()
+    assert analysis['analysis']['columns'] == ['c']
+    assert 'sheet=second' in analysis['redirect_url']
+
+
+def test_naming_the_first_sheet_shares_the_default_sheet(app_module, client, upload, sample_frame):
+    upload(workbook_bytes(a=(4, 5, 6)), 'named.xlsx')
+    analysis = client.post('/analyze', json={'file_path': 'named.xlsx', 'sheet': 'first', 'wait': True}).get_json()
+    assert analysis['analysis']['columns'] == ['a', 'b']
+    assert 'sheet=' not in analysis['redirect_url']
+
+    path = app_module.upload_store.resolve('named.xlsx')
+    assert app_module.requested_sheet(path, 'first') is None
+    assert app_module.requested_sheet(path, 'second') == 'second'
+    assert client.get('/data/named.xlsx?sheet=first&limit=5').status_code == 200
+    assert app_module.browse_cache.get(app_module.browse_cache.key_for(app_module.file_digest(path))) is not None
+
+    # A sheet on a file that is not a workbook is ignored
+    upload(sample_frame.iloc[:160].to_csv(index=False).encode(), 'sheetless.csv')
+    response = client.get('/correlations/sheetless.csv?sheet=first')
+    assert response.status_code == 200
+    assert app_module.requested_sheet(app_module.upload_store.resolve('sheetless.csv'), 'first') is None
@@ -0,0 +1,154 @@
+# Incremental re-profiling of CSV uploads that only gained rows
+
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import analysis
+import incremental
+from analysis import analyze_data, load_data
+from incremental import extend_frame, is_append, load_state, profile_csv_incremental
+from sidecar import write_sidecar
+from streaming import profile_csv
+
+VERSION = 'test'
+
+
+def export(start, stop):
+    rng = np.random.default_rng(start)
+    n = stop - start
+    data = pd.DataFrame({
+        'id': np.arange(start, stop),
+        'value': rng.normal(size=n).round(3),
+        'kind': rng.choice(['a', 'b', 'c'], n),
+    })
+    data.loc[data['id'] % 11 == 0, 'value'] = np.nan
+    return data
+
+
+def csv_bytes(data, header=True):
+    return data.to_csv(index=False, header=header).encode()
+
+
+def stored(directory, data):
+    # Named by content digest, as the upload store names files
+    path = directory / (hashlib.sha256(data).hexdigest() + '.csv')
+    path.write_bytes(data)
+    return str(path)
+
+
+def same_analysis(first, second):
+    # Compared as JSON text, where NaN equals NaN
+    for key in first:
+        if key != 'analysis_timestamp':
+            assert json.dumps(first[key], sort_keys=True, default=str) == json.dumps(second[key], sort_keys=True, default=str), key
+
+
+def full_run(*args, **kwargs):
+    raise AssertionError('profiled in full')
+
+
+def assert_same_profile(resumed, fresh):
+    for key in ('shape', 'columns', 'dtypes', 'missing_values', 'categorical_stats', 'insights'):
+        assert resumed[key] == fresh[key], key
+    assert resumed['data_quality']['duplicate_rows'] == fresh['data_quality']['duplicate_rows']
+    for column, stats in fresh['basic_stats'].items():
+        for name in ('count', 'mean', 'std', 'min', 'max'):
+            assert resumed['basic_stats'][column][name] == pytest.approx(stats[name]), (column, name)
+
+
+def test_appended_rows_resume_from_saved_state(tmp_path, monkeypatch):
+    path = tmp_path / 'daily.csv'
+    path.write_bytes(csv_bytes(export(0, 800)))
+    profile_csv_incremental(str(path), VERSION, chunksize=100)
+
+    with open(path, 'ab') as f:
+        f.write(csv_bytes(export(800, 1000), header=False))
+    assert is_append(load_state(str(path), VERSION), str(path))
+
+    # Only the appended rows may be read
+    monkeypatch.setattr(incremental, 'stream_csv', full_run)
+    resumed = profile_csv_incremental(str(path), VERSION, chunksize=100)
+    monkeypatch.undo()
+
+    assert_same_profile(resumed, profile_csv(str(path), chunksize=100))
+
+
+def test_changed_prefix_is_profiled_in_full(tmp_path):
+    path = tmp_path / 'daily.csv'
+    path.write_bytes(csv_bytes(export(0, 300)))
+    profile_csv_incremental(str(path), VERSION)
+
+    edited = export(0, 300)
+    edited.loc[0, 'kind'] = 'z'
+    path.write_bytes(csv_bytes(edited))
+    assert not is_append(load_state(str(path), VERSION), str(path))
+    assert profile_csv_incremental(str(path), VERSION)['categorical_stats']['kind']['unique_count'] == 4
+    # Saved state of another analysis version is never used
+    assert load_state(str(path), 'other') is None
+
+
+def test_appended_rows_extend_the_earlier_frame(tmp_path):
+    first = csv_bytes(export(0, 700))
+    earlier = stored(tmp_path, first)
+    write_sidecar(load_data(earlier, use_sidecar=False), earlier)
+    # Appended rows widen an integer column, add a category and include an empty row
+    tail = export(700, 760)
+    tail.loc[tail.index[:3], 'kind'] = 'new'
+    grown = stored(tmp_path, first + csv_bytes(tail, header=False) + b',,\n')
+
+    extended = extend_frame(earlier, grown)
+    full = load_data(grown, use_sidecar=False)
+    pd.testing.assert_frame_equal(extended, full)
+    same_analysis(analyze_data(extended), analyze_data(full))
+
+
+def test_appends_that_change_column_types_are_parsed_in_full(tmp_path):
+    first = csv_bytes(export(0, 300))
+    earlier = stored(tmp_path, first)
+    write_sidecar(load_data(earlier, use_sidecar=False), earlier)
+    assert extend_frame(earlier, stored(tmp_path, first + b'x,1.0,a\n')) is None
+    # The last row was extended rather than followed by new ones
+    assert extend_frame(earlier, stored(tmp_path, first[:-1] + b'x\n1,1.0,a\n')) is None
+    assert extend_frame(earlier, stored(tmp_path, first.replace(b'id', b'ID') + b'1,1.0,a\n')) is None
+
+
+def test_small_reupload_parses_only_appended_rows(app_module, client, upload, tmp_path, monkeypatch):
+    first = csv_bytes(export(9000, 9500))
+    grown = first + csv_bytes(export(9500, 9600), header=False)
+    upload(first, 'small-export.csv')
+
+    monkeypatch.setattr(analysis, 'load_data', full_run)
+    assert upload(grown, 'small-export.csv').status_code == 200
+    monkeypatch.undo()
+
+    result = client.post('/analyze', json={'file_path': 'small-export.csv', 'wait': True}).get_json()['analysis']
+    fresh = tmp_path / 'fresh.csv'
+    fresh.write_bytes(grown)
+    same_analysis(result, json.loads(json.dumps(analyze_data(load_data(str(fresh), use_sidecar=False)))))
+
+
+def test_reupload_with_appended_rows_matches_a_fresh_run(app_module, client, upload, tmp_path, monkeypatch):
+    first = csv_bytes(export(5000, 5600))
+    grown = first + csv_bytes(export(5600, 6000), header=False)
+    # Both uploads are profiled in chunks
+    monkeypatch.setitem(app_module.app.config, 'STREAMING_PROFILE_THRESHOLD', len(first) - 1)
+
+    upload(first, 'export.csv')
+    client.post('/analyze', json={'file_path': 'export.csv', 'wait': True})
+    upload(grown, 'export.csv')
+    # The grown file is stored apart from the first one and starts from its profile
+    path = app_module.upload_store.resolve('export.csv')
+    assert load_state(path, app_module.ANALYSIS_VERSION).size == len(first)
+
+    monkeypatch.setattr(incremental, 'stream_csv', full_run)
+    resumed = client.post('/analyze', json={'file_path': 'export.csv', 'wait': True}).get_json()['analysis']
+    monkeypatch.undo()
+
+    fresh = tmp_path / 'fresh.csv'
+    fresh.write_bytes(grown)
+    # Compared as the client receives it
+    assert_same_profile(resumed, json.loads(json.dumps(profile_csv(str(fresh)))))
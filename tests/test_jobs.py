@@ -0,0 +1,72 @@
+# Background analysis jobs
+
+import time
+
+from jobs import STAGE_PROGRESS, JobStore, run_job
+
+
+def test_job_lifecycle(tmp_path):
+    db_path = str(tmp_path / 'jobs.sqlite3')
+    store = JobStore(db_path)
+    job_id = store.create('data.csv', sheet='second')
+    job = store.get(job_id)
+    assert (job['status'], job['stage'], job['progress'], job['sheet']) == ('queued', 'queued', 0, 'second')
+
+    stages = []
+
+    def analyze(filepath, progress):
+        progress('stats')
+        stages.append(JobStore(db_path).get(job_id)['stage'])
+
+    run_job(db_path, job_id, analyze, 'data.csv')
+    assert stages == ['stats']
+    job = store.get(job_id)
+    assert (job['status'], job['progress']) == ('done', STAGE_PROGRESS['done'])
+
+
+def test_long_stages_report_their_share_done(tmp_path):
+    db_path = str(tmp_path / 'jobs.sqlite3')
+    store = JobStore(db_path)
+    job_id = store.create('large.csv')
+    seen = []
+
+    def analyze(filepath, progress):
+        for fraction in (0.0, 0.5, 1.0):
+            progress('profiling', fraction)
+            seen.append(JobStore(db_path).get(job_id)['progress'])
+
+    run_job(db_path, job_id, analyze, 'large.csv')
+    start = STAGE_PROGRESS['profiling']
+    assert seen == [start, start + (STAGE_PROGRESS['done'] - start) // 2, STAGE_PROGRESS['done']]
+
+
+def test_failed_job_keeps_its_error(tmp_path):
+    db_path = str(tmp_path / 'jobs.sqlite3')
+    store = JobStore(db_path)
+    job_id = store.create('data.csv')
+
+    def analyze(filepath, progress):
+        raise ValueError('no columns')
+
+    run_job(db_path, job_id, analyze, 'data.csv')
+    job = store.get(job_id)
+    assert job['status'] == 'failed'
+    assert job['error'] == 'Data format error: no columns'
+    assert store.get('missing') is None
+
+
+def test_analyze_runs_in_the_background(client, upload, sample_frame):
+    upload(sample_frame.head(300).to_csv(index=False).encode(), 'job.csv')
+    started = client.post('/analyze', json={'file_path': 'job.csv'})
+    assert started.status_code == 202
+    job_id = started.get_json()['job_id']
+
+    deadline = time.time() + 60
+    while client.get(f'/jobs/{job_id}').get_json()['status'] not in ('done', 'failed'):
+        assert time.time() < deadline
+        time.sleep(0.1)
+
+    result = client.get(f'/jobs/{job_id}/result')
+    assert result.status_code == 200
+    assert result.get_json()['analysis']['shape'] == [300, 6]
+    assert client.get('/jobs/missing').status_code == 404
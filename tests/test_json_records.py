@@ -0,0 +1,73 @@
+# Streamed JSON Lines and top-level JSON arrays with nested fields flattened
+
+import io
+import json
+
+import pandas as pd
+import pytest
+
+from json_records import iter_json_array, json_layout, read_json_records, records_to_frame
+
+RECORDS = [
+    {'id': 1, 'user': {'name': 'ann', 'geo': {'lat': 1.5}}, 'tags': ['a', 'b'], 'created_at': '2024-01-02T03:04:05'},
+    {'id': 2, 'user': {'name': 'bob', 'geo': {'lat': -2.0}}, 'tags': [], 'created_at': '2024-02-03T04:05:06'},
+    {'id': 3, 'extra': True, 'created_at': '2024-03-04T05:06:07'},
+]
+
+
+@pytest.mark.parametrize('read_size', [1, 7, 1024])
+def test_array_elements_survive_any_buffer_boundary(read_size):
+    values = [1, -2.5e10, 'a,]"b', {'x': [1, {'y': None}]}, [], True, None]
+    text = json.dumps(values, indent=2)
+    assert list(iter_json_array(io.StringIO(text), read_size=read_size)) == values
+    assert list(iter_json_array(io.StringIO(' [ ] '), read_size=read_size)) == []
+
+
+@pytest.mark.parametrize('text', ['{"a": 1}', '[1, 2', '[1 2]'])
+def test_malformed_arrays_raise_value_error(text):
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO(text), read_size=4))
+
+
+def test_nested_fields_are_flattened_like_json_normalize():
+    data = records_to_frame(iter(RECORDS), batch_size=2)
+    assert list(data.columns) == ['id', 'user.name', 'user.geo.lat', 'tags', 'created_at', 'extra']
+    expected = pd.json_normalize(RECORDS)
+    assert data['user.geo.lat'].tolist()[:2] == expected['user.geo.lat'].tolist()[:2]
+    assert data['tags'].tolist()[:2] == ['["a", "b"]', '[]']
+    assert pd.isna(data.loc[2, 'user.name']) and pd.isna(data.loc[0, 'extra'])
+    assert pd.api.types.is_datetime64_any_dtype(data['created_at'])
+
+
+def test_batches_are_not_held_alongside_the_frame():
+    import tracemalloc
+    record = {'a': 1, 'b': 0.5, 'c': 2.0, 'd': 3}
+    records = (record for _ in range(200_000))
+    tracemalloc.start()
+    try:
+        data = records_to_frame(records, batch_size=20_000)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # Concatenating every batch at the end would peak at about twice the frame
+    assert peak < 1.6 * data.memory_usage(index=False).sum()
+
+
+def test_layout_detection_and_loading(tmp_path):
+    lines = tmp_path / 'records.json'
+    lines.write_text('\n'.join(json.dumps(record) for record in RECORDS))
+    array = tmp_path / 'array.json'
+    array.write_text(json.dumps(RECORDS, indent=2))
+    document = tmp_path / 'document.json'
+    document.write_text(json.dumps({'rows': RECORDS}, indent=2))
+
+    assert (json_layout(lines), json_layout(array), json_layout(document)) == ('lines', 'array', 'document')
+    pd.testing.assert_frame_equal(read_json_records(lines, lines=True), read_json_records(array))
+
+
+def test_json_lines_upload_is_analyzed(client, upload):
+    text = '\n'.join(json.dumps({'n': i, 'meta': {'group': 'g' + str(i % 3)}}) for i in range(60))
+    assert upload(text.encode(), 'events.jsonl').status_code == 200
+    analysis = client.post('/analyze', json={'file_path': 'events.jsonl', 'wait': True}).get_json()['analysis']
+    assert analysis['shape'] == [60, 2]
+    assert analysis['columns'] == ['n', 'meta.group']
@@ -0,0 +1,39 @@
+# Stage instrumentation, structured logs and the /metrics endpoint
+
+import logging
+
+import pytest
+
+from metrics import count_cache, log_event, render_metrics, stage
+
+
+def test_stage_logs_and_counts(log_lines):
+    with stage('test_stage', 'ok_detail') as record:
+        record.rows, record.columns = 7, 2
+    with pytest.raises(ValueError):
+        with stage('test_stage', 'failing'):
+            raise ValueError('broken')
+
+    ok, failed = [line for line in log_lines if line.get('stage') == 'test_stage']
+    assert (ok['status'], ok['rows'], ok['columns']) == ('ok', 7, 2)
+    assert (failed['status'], failed['error']) == ('error', 'broken')
+
+    text = render_metrics()
+    assert 'analyzer_stage_rows_total{detail="ok_detail",stage="test_stage"} 7' in text
+    assert 'analyzer_stage_duration_seconds_count{detail="failing",stage="test_stage",status="error"} 1' in text
+
+
+def test_module_events_share_the_stage_log(log_lines):
+    log_event(logging.getLogger('data_analyzer.test'), 'something', size=3, skipped=None)
+    event = log_lines[-1]
+    assert (event['event'], event['size']) == ('something', 3)
+    assert 'skipped' not in event and 'pid' in event
+
+
+def test_metrics_endpoint_reports_cache_hit_ratio(client):
+    count_cache('test_cache', True)
+    count_cache('test_cache', False)
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    assert 'analyzer_cache_hit_ratio{cache="test_cache"} 0.5' in response.get_data(as_text=True)
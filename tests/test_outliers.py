@@ -0,0 +1,72 @@
+# Vectorized IQR, z-score and MAD outlier detection
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import outliers
+from outliers import outlier_report, report_to_dict
+
+
+@pytest.fixture
+def block():
+    rng = np.random.default_rng(3)
+    data = pd.DataFrame(rng.normal(size=(300, 5)), columns=list('abcde'), index=np.arange(1000, 1300))
+    data.iloc[[4, 90], 0] = [25.0, -30.0]
+    data.iloc[::13, 1] = np.nan
+    data['c'] = 7.0
+    data.iloc[:200, 3] = 1.0
+    data.iloc[250, 3] = 40.0
+    data['e'] = np.nan
+    return data
+
+
+def expected(column):
+    values = column.dropna()
+    q1, median, q3 = values.quantile([0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    std = values.std()
+    mad = (values - median).abs().median() / 0.6745
+    if mad == 0:
+        mad = (values - median).abs().mean() * 1.2533
+    return {
+        'iqr': ((values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)).sum(),
+        'zscore': ((values - values.mean()).abs() > 3 * std).sum() if std > 0 else 0,
+        'mad': ((values - median).abs() > 3.5 * mad).sum() if mad > 0 else 0,
+    }
+
+
+@pytest.mark.parametrize('chunk_cells', [outliers.CHUNK_CELLS, 300])
+def test_counts_match_per_column_reference(block, monkeypatch, chunk_cells):
+    # 300 cells is one column per chunk
+    monkeypatch.setattr(outliers, 'CHUNK_CELLS', chunk_cells)
+    report = outlier_report(block)
+    for col in block.columns:
+        for method, count in expected(block[col]).items():
+            assert report[method]['counts'][col] == count, (col, method)
+    assert report['values'].tolist() == block.notna().sum().tolist()
+    assert set(report['iqr']['rows']['a']) >= {1004, 1090}
+    # A constant column has no outliers and an empty one no bounds
+    assert report['zscore']['counts']['c'] == 0
+    assert np.isnan(report['iqr']['lower']['e'])
+
+
+def test_summary_orders_columns_and_caps_rows(block):
+    summary = report_to_dict(outlier_report(block, methods=('mad',), max_rows=1), 'mad')
+    counts = [item['outliers'] for item in summary['columns']]
+    assert counts == sorted(counts, reverse=True)
+    assert all(len(item['rows']) <= 1 for item in summary['columns'])
+    empty = next(item for item in summary['columns'] if item['column'] == 'e')
+    assert (empty['lower'], empty['percentage']) == (None, 0.0)
+    with pytest.raises(ValueError):
+        outlier_report(block, methods=('grubbs',))
+
+
+def test_outliers_endpoint(client, upload, sample_frame):
+    data = sample_frame.iloc[:200].copy()
+    data.loc[7, 'quantity'] = 10_000
+    upload(data.to_csv(index=False).encode(), 'outliers.csv')
+    result = client.get('/outliers/outliers.csv?method=zscore').get_json()
+    quantity = next(item for item in result['columns'] if item['column'] == 'quantity')
+    assert 7 in quantity['rows']
+    assert client.get('/outliers/outliers.csv?method=grubbs').status_code == 400
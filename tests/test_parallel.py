@@ -0,0 +1,38 @@
+# Column-parallel profiling
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import parallel
+from parallel import STAT_ROWS, column_block_stats, parallel_numeric_stats, parallel_value_counts
+
+
+@pytest.fixture
+def block():
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame(rng.exponential(size=(2_000, 6)), columns=list('abcdef'))
+    data.iloc[::7, 2] = np.nan
+    data['f'] = np.nan
+    return data
+
+
+def test_block_stats_match_pandas(block):
+    stats = pd.DataFrame(column_block_stats(block.to_numpy()), index=STAT_ROWS, columns=block.columns)
+    expected = pd.concat([block.describe(), block.skew().to_frame('skew').T])
+    pd.testing.assert_frame_equal(stats.loc[STAT_ROWS], expected.loc[STAT_ROWS], check_exact=False)
+
+
+def test_pool_gives_the_serial_result(block, monkeypatch):
+    serial = parallel_numeric_stats(block, workers=1)
+    # Force the shared-memory path on a small block
+    monkeypatch.setattr(parallel, 'PARALLEL_MIN_CELLS', 0)
+    pd.testing.assert_frame_equal(parallel_numeric_stats(block, workers=2), serial)
+
+
+def test_value_counts_in_threads():
+    data = pd.DataFrame({'x': ['a', 'b', 'a', None], 'y': pd.Categorical(['u', 'u', 'v', 'v'], categories=['u', 'v', 'w'])})
+    counts = parallel_value_counts(data, ['x', 'y'], workers=2)
+    assert counts['x'].to_dict() == {'a': 2, 'b': 1}
+    # Unused categories are dropped, as DatasetProfile.value_counts does
+    assert counts['y'].to_dict() == {'u': 2, 'v': 2}
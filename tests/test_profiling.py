@@ -0,0 +1,49 @@
+# Single-pass dataset profile shared by the analysis stages
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from profiling import DatasetProfile
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        'a': np.array([1.0, 2.0, 3.0, 4.0, 100.0, np.nan], dtype=np.float32),
+        'b': [1, 2, 2, 3, 3, 3],
+        'c': pd.Categorical(['x', 'y', 'y', None, 'z', 'z'], categories=['w', 'x', 'y', 'z']),
+        'when': pd.date_range('2024-01-01', periods=6),
+    })
+
+
+def test_columns_are_classified_once(frame):
+    profile = DatasetProfile(frame)
+    assert profile.numeric_columns == ['a', 'b']
+    assert profile.categorical_columns == ['c']
+    assert profile.datetime_columns == ['when']
+    assert profile.total_missing == 2
+
+
+def test_numeric_stats_match_pandas(frame):
+    stats = DatasetProfile(frame).numeric_stats
+    expected = frame[['a', 'b']].astype('float64').describe()
+    for row in ('count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max'):
+        assert stats.loc[row].tolist() == pytest.approx(expected.loc[row].tolist())
+    # float32 columns are widened before accumulating
+    assert DatasetProfile(frame).numeric.dtypes['a'] == np.float64
+
+
+def test_results_are_computed_once(frame):
+    profile = DatasetProfile(frame)
+    assert profile.numeric_stats is profile.numeric_stats
+    assert profile.value_counts('c') is profile.value_counts('c')
+    assert profile.outlier_counts['a'] == 1
+
+
+def test_mode_breaks_ties_like_pandas(frame):
+    profile = DatasetProfile(frame)
+    assert profile.mode('b') == 3
+    assert profile.mode('c') == frame['c'].mode()[0]
+    # Unused categories are not counted
+    assert 'w' not in profile.value_counts('c').index
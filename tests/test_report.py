@@ -0,0 +1,76 @@
+# Streamed report export in Markdown, JSON and HTML
+
+import json
+
+import pytest
+
+from report import buffered, html_report, json_report, markdown_report
+
+
+@pytest.fixture
+def analysis():
+    return {
+        'shape': [3, 2],
+        'columns': ['a', '<b>'],
+        'dtypes': {'a': 'int64', '<b>': 'object'},
+        'missing_values': {'a': 0, '<b>': 1},
+        'total_missing': 1,
+        'data_quality': {'completeness': 83.333, 'duplicate_rows': 0},
+        'basic_stats': {'a': {'mean': 2.0, 'std': 1.0}},
+        'insights': {'recommendations': ['Fill missing values']},
+        'unavailable': {'correlations': 'Needs two numeric columns'},
+    }
+
+
+def test_buffered_joins_pieces_into_chunks():
+    chunks = list(buffered(['ab', 'cd', 'e', 'fgh', 'i'], size=4))
+    assert chunks == ['abcd', 'efgh', 'i']
+    assert list(buffered([], size=4)) == []
+
+
+def test_markdown_report_lists_sections(analysis):
+    text = ''.join(markdown_report('data.csv', analysis))
+    assert '- Shape: 3 rows × 2 columns' in text
+    assert '- mean: 2.0000' in text
+    assert '## Recommendations\n- Fill missing values' in text
+    assert '## Not Available\n- Needs two numeric columns' in text
+    raw = text.split('```json\n', 1)[1].rsplit('\n```', 1)[0]
+    assert json.loads(raw)['file_info']['total_rows'] == 3
+
+
+def test_json_report_is_one_document(analysis):
+    report = json.loads(''.join(json_report('data.csv', analysis)))
+    assert report['file_info']['filename'] == 'data.csv'
+    assert report['recommendations'] == ['Fill missing values']
+    assert report['unavailable'] == analysis['unavailable']
+
+
+def test_html_report_escapes_and_inlines_charts(analysis):
+    charts = [('Chart <1>', '{"data": [{"text": "</script>"}], "layout": {}}')]
+    text = ''.join(html_report('<x>.csv', analysis, charts, plotly_js='/* plotly */'))
+    assert '<title>Analysis Report - &lt;x&gt;.csv</title>' in text
+    assert '<td>&lt;b&gt;</td>' in text
+    assert '<h2>Not Available</h2>' in text
+    assert '/* plotly */' in text
+    assert '<h3>Chart &lt;1&gt;</h3>' in text
+    # Chart data cannot close the script element early
+    assert '"<\\/script>"' in text
+
+
+def test_download_report_endpoint(client, upload, sample_frame):
+    upload(sample_frame.iloc[:120].to_csv(index=False).encode(), 'report.csv')
+    client.post('/analyze', json={'file_path': 'report.csv', 'wait': True})
+
+    response = client.get('/download-report/report.csv')
+    assert response.status_code == 200 and response.mimetype == 'text/markdown'
+    assert 'attachment' in response.headers['Content-Disposition']
+    assert response.get_data(as_text=True).startswith('# Data Analysis Report for report.csv')
+
+    document = client.get('/download-report/report.csv?format=json').get_json()
+    assert document['file_info']['total_rows'] == 120
+
+    page = client.get('/download-report/report.csv?format=html').get_data(as_text=True)
+    assert page.startswith('<!DOCTYPE html>') and 'Plotly.newPlot' in page
+
+    assert client.get('/download-report/report.csv?format=pdf').status_code == 400
+    assert client.get('/download-report/missing.csv').status_code == 404
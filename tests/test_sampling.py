@@ -0,0 +1,67 @@
+# Sampled fast analysis with error bounds
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis import analyze_sample
+from sampling import proportion_interval, sample_rows
+
+
+@pytest.fixture
+def population():
+    rng = np.random.default_rng(1)
+    n = 20_000
+    data = pd.DataFrame({
+        'value': rng.normal(50, 10, n),
+        'group': rng.choice(['a', 'b', 'c'], n, p=[0.7, 0.2, 0.1]),
+    })
+    data.loc[rng.random(n) < 0.1, 'value'] = np.nan
+    return data
+
+
+def test_samples_are_seeded(population):
+    assert sample_rows(population, 1000).index.equals(sample_rows(population, 1000).index)
+    assert sample_rows(population, 10**6) is population
+
+
+def test_sample_analysis_scales_counts_and_bounds_the_truth(population):
+    analysis = analyze_sample(sample_rows(population, 2000), len(population))
+    report = analysis['approximation']
+    assert analysis['shape'][0] == len(population)
+    assert analysis['data_quality']['duplicate_rows'] is None
+    assert not any('duplicate' in insight for insight in analysis['insights']['data_quality'])
+
+    mean = report['means']['value']
+    assert mean['low'] <= population['value'].mean() <= mean['high']
+    missing = report['missing_rates']['value']
+    assert missing['low'] <= population['value'].isna().mean() <= missing['high']
+    assert analysis['missing_values']['value'] == pytest.approx(population['value'].isna().sum(), rel=0.2)
+
+
+def test_sample_analysis_profiles_the_sample_once(population, monkeypatch):
+    import analysis
+    built = []
+    original = analysis.DatasetProfile.__init__
+
+    def counting(self, *args, **kwargs):
+        built.append(1)
+        original(self, *args, **kwargs)
+
+    monkeypatch.setattr(analysis.DatasetProfile, '__init__', counting)
+    analyze_sample(sample_rows(population, 2000), len(population))
+    assert len(built) == 1
+
+
+def test_wilson_interval_stays_within_zero_and_one():
+    interval = proportion_interval(0, 50, 1.96)
+    assert interval['low'] == 0.0 and 0 < interval['high'] < 0.1
+
+
+def test_fast_mode_answers_from_a_sample(app_module, client, upload, sample_frame, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, 'FAST_SAMPLE_SIZE', 100)
+    upload(sample_frame.head(450).to_csv(index=False).encode(), 'fast.csv')
+    response = client.post('/analyze', json={'file_path': 'fast.csv', 'mode': 'fast'}).get_json()
+    assert response['analysis']['approximation']['sample_size'] == 100
+    assert response['analysis']['shape'][0] == 450
+    assert response['job_id']
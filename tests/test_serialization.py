@@ -0,0 +1,68 @@
+# orjson-backed JSON provider and gzip response compression
+
+import datetime
+import gzip
+import json
+
+import numpy as np
+import pytest
+from flask import Flask
+
+import serialization
+from serialization import FastJSONProvider
+
+
+@pytest.fixture(params=['orjson', 'stdlib'])
+def provider(request, monkeypatch):
+    if request.param == 'stdlib':
+        monkeypatch.setattr(serialization, 'orjson', None)
+    elif serialization.orjson is None:
+        pytest.skip('orjson is not installed')
+    return FastJSONProvider(Flask(__name__))
+
+
+def test_encodes_numpy_and_dates_like_jsonify(provider):
+    payload = {
+        'b': np.int64(3), 'a': np.float32(0.5), 'flag': np.bool_(True),
+        'values': np.array([1.5, 2.5]).tolist(), 'when': datetime.date(2024, 5, 6)
+    }
+    text = provider.dumps(payload)
+    assert json.loads(text) == {'a': 0.5, 'b': 3, 'flag': True, 'values': [1.5, 2.5],
+                                'when': 'Mon, 06 May 2024 00:00:00 GMT'}
+    # Keys are sorted as jsonify sorts them
+    assert text.index('"a"') < text.index('"b"')
+
+
+def test_non_finite_floats_become_null(provider):
+    if serialization.orjson is None:
+        pytest.skip('the standard library encoder writes NaN')
+    assert json.loads(provider.dumps({'x': float('nan'), 'y': float('inf')})) == {'x': None, 'y': None}
+
+
+def test_large_json_responses_are_gzipped(client, upload, sample_frame):
+    data = sample_frame.iloc[:300].copy()
+    data['note'] = 'compressed'
+    upload(data.to_csv(index=False).encode(), 'gzip.csv')
+
+    plain = client.get('/data/gzip.csv?limit=200')
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.headers['Vary'] == 'Accept-Encoding'
+
+    packed = client.get('/data/gzip.csv?limit=200', headers={'Accept-Encoding': 'gzip'})
+    assert packed.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(packed.data)) == plain.get_json()
+    assert len(packed.data) < len(plain.data)
+
+    small = client.get('/data/gzip.csv?limit=1', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in small.headers
+
+
+def test_streamed_reports_are_gzipped_and_metrics_are_not(client, upload, sample_frame):
+    upload(sample_frame.iloc[:310].to_csv(index=False).encode(), 'gzip-report.csv')
+    report = client.get('/download-report/gzip-report.csv?format=md', headers={'Accept-Encoding': 'gzip'})
+    assert report.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in report.headers
+    assert gzip.decompress(report.data).decode().startswith('# Data Analysis Report for gzip-report.csv')
+
+    metrics = client.get('/metrics', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in metrics.headers
@@ -0,0 +1,43 @@
+# Feather sidecars written at upload time
+
+import os
+
+import pandas as pd
+
+from analysis import load_data
+from sidecar import read_sidecar, sidecar_path, write_sidecar
+
+
+def test_load_uses_sidecar_with_the_parsed_types(tmp_path, sample_csv):
+    path = str(tmp_path / 'data.csv')
+    with open(path, 'wb') as f:
+        f.write(sample_csv)
+    parsed = load_data(path, use_sidecar=False)
+    assert write_sidecar(parsed, path) == sidecar_path(path)
+
+    pd.testing.assert_frame_equal(load_data(path), parsed)
+
+
+def test_stale_sidecar_is_ignored(tmp_path):
+    path = str(tmp_path / 'data.csv')
+    with open(path, 'w') as f:
+        f.write('a\n1\n2\n')
+    write_sidecar(pd.DataFrame({'a': [1, 2]}), path)
+    # The upload changed after its sidecar was written
+    stat = os.stat(sidecar_path(path))
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert read_sidecar(path) is None
+
+
+def test_unstorable_frame_writes_no_sidecar(tmp_path):
+    path = str(tmp_path / 'data.csv')
+    mixed = pd.DataFrame({'mix': pd.Series([1, 'a', 2.5], dtype=object)})
+    assert write_sidecar(mixed, path) is None
+    assert not os.path.exists(sidecar_path(path))
+
+
+def test_upload_writes_a_sidecar(app_module, upload, sample_csv):
+    assert upload(sample_csv, 'sidecar.csv').status_code == 200
+    path = app_module.upload_store.resolve('sidecar.csv')
+    assert os.path.exists(sidecar_path(path))
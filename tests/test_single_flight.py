@@ -0,0 +1,86 @@
+# One computation per cache key at a time, shared with concurrent callers
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from cache import ResultCache
+
+
+def run_together(cache, key, compute, callers=8):
+    barrier = threading.Barrier(callers)
+
+    def call():
+        barrier.wait()
+        return cache.get_or_compute(key, compute)
+
+    with ThreadPoolExecutor(callers) as pool:
+        futures = [pool.submit(call) for _ in range(callers)]
+        return [future.result() if future.exception() is None else future.exception() for future in futures]
+
+
+@pytest.mark.parametrize('persist', [True, False])
+def test_concurrent_callers_share_one_run(tmp_path, persist):
+    cache = ResultCache(str(tmp_path), persist=persist)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return {'rows': 5}
+
+    assert run_together(cache, cache.key_for('abc'), compute) == [{'rows': 5}] * 8
+    assert len(calls) == 1
+    # No lock file or in-flight entry is left behind
+    assert not cache._inflight
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.lock')]
+
+
+def test_a_failed_run_is_retried_by_the_next_caller(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.1)
+        if len(calls) == 1:
+            raise RuntimeError('first run fails')
+        return 'value'
+
+    results = run_together(cache, cache.key_for('abc'), compute, callers=4)
+    assert sum(isinstance(result, RuntimeError) for result in results) == 1
+    assert results.count('value') == 3
+    assert len(calls) == 2
+
+
+def _compute_in_child(cache_dir, marker_dir, start):
+    cache = ResultCache(cache_dir)
+
+    def compute():
+        open(os.path.join(marker_dir, str(os.getpid())), 'w').close()
+        time.sleep(0.3)
+        return 'shared'
+
+    start.wait()
+    assert cache.get_or_compute(cache.key_for('abc'), compute) == 'shared'
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs fork')
+def test_processes_share_one_run(tmp_path):
+    markers = tmp_path / 'markers'
+    markers.mkdir()
+    context = multiprocessing.get_context('fork')
+    start = context.Event()
+    workers = [context.Process(target=_compute_in_child, args=(str(tmp_path / 'cache'), str(markers), start))
+               for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    start.set()
+    for worker in workers:
+        worker.join(10)
+    assert [worker.exitcode for worker in workers] == [0, 0, 0]
+    assert len(os.listdir(markers)) == 1
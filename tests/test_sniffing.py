@@ -0,0 +1,44 @@
+# CSV sniffing and lean single-pass parsing
+
+import codecs
+
+import numpy as np
+import pandas as pd
+
+from sniffing import detect_delimiter, detect_encoding, downcast_numeric, read_csv_lean, sniff_csv
+
+
+def test_encoding_detection():
+    assert detect_encoding(codecs.BOM_UTF8 + b'a,b\n') == 'utf-8-sig'
+    # A sample cut inside a multi-byte character is still UTF-8
+    assert detect_encoding('naïve'.encode('utf-8')[:3]) == 'utf-8'
+    assert detect_encoding('café au lait'.encode('latin-1')) == 'latin-1'
+
+
+def test_delimiter_detection():
+    assert detect_delimiter(['a;b;c', '1;2;3']) == ';'
+    assert detect_delimiter(['a\tb', '1\t2']) == '\t'
+    assert detect_delimiter(['single']) == ','
+
+
+def test_sniffed_format_and_lean_types(tmp_path):
+    path = tmp_path / 'data.csv'
+    rows = ['city;count;price;label'] + [f'{["Köln", "Bonn"][i % 2]};{i % 100};{i / 2};id {i}' for i in range(3000)]
+    path.write_bytes('\n'.join(rows).encode('latin-1'))
+
+    csv_format = sniff_csv(str(path))
+    assert (csv_format.encoding, csv_format.delimiter) == ('latin-1', ';')
+    assert csv_format.dtype == {'city': 'category'}
+
+    data = read_csv_lean(str(path))
+    assert data['city'].cat.categories.tolist() == ['Bonn', 'Köln']
+    assert data['count'].dtype == np.int8
+    assert data['price'].dtype == np.float32
+    assert data['label'].nunique() == 3000
+
+
+def test_downcast_keeps_values_exact():
+    data = pd.DataFrame({'small': [1, 2, 300], 'exact': [0.5, 1.25, np.nan], 'inexact': [0.1, 0.2, 0.3]})
+    lean = downcast_numeric(data)
+    assert lean.dtypes.tolist() == [np.int16, np.float32, np.float64]
+    pd.testing.assert_frame_equal(lean.astype('float64'), data.astype('float64'))
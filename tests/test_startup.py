@@ -0,0 +1,35 @@
+# Deferred imports, the optional warm-up and start-up metrics
+
+import os
+import subprocess
+import sys
+
+from metrics import render_metrics
+from warmup import warm_up
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
+
+
+def test_importing_app_leaves_heavy_modules_unloaded(tmp_path):
+    script = ("import sys, app; "
+              "print(','.join(m for m in ('pandas', 'pyarrow', 'plotly', 'openpyxl') if m in sys.modules))")
+    env = dict(os.environ, ANALYZER_UPLOAD_FOLDER=str(tmp_path))
+    env.pop('ANALYZER_PREWARM', None)
+    result = subprocess.run([sys.executable, '-c', script], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ''
+
+
+def test_warm_up_records_only_its_start_up_time():
+    assert warm_up() > 0
+    text = render_metrics()
+    assert 'analyzer_startup_seconds{milestone="warmup"}' in text
+    # The warm-up run is not counted as analysis traffic
+    assert 'stage="analyze_data"' not in text
+
+
+def test_import_and_first_request_are_measured(client):
+    client.get('/metrics')
+    text = client.get('/metrics').get_data(as_text=True)
+    assert 'analyzer_startup_seconds{milestone="import"}' in text
+    assert 'analyzer_startup_seconds{milestone="first_request"}' in text
@@ -0,0 +1,149 @@
+# Content-addressed upload store with quota eviction
+
+import io
+import os
+import types
+
+import pytest
+
+import store
+from cache import file_digest
+from jobs import JobStore
+from store import UploadStore, blob_suffix
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Store time that only moves when the test advances it"""
+    now = [1000.0]
+    monkeypatch.setattr(store, 'time', types.SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+@pytest.fixture
+def uploads(tmp_path, clock):
+    return UploadStore(str(tmp_path / 'blobs'), str(tmp_path / 'store.db'), quota=None)
+
+
+def save(uploads, data, name, clock=None):
+    if clock is not None:
+        clock[0] += 100
+    path, created = uploads.save(io.BytesIO(data), name)
+    uploads.assign(name, path)
+    return path, created
+
+
+def test_blob_suffix_keeps_the_loading_format():
+    assert blob_suffix('Sales.CSV.gz') == '.csv.gz'
+    assert blob_suffix('sales.json') == '.json'
+    assert blob_suffix('sales.data.zip') == '.zip'
+
+
+def test_identical_contents_are_stored_once(uploads):
+    first, created = save(uploads, b'x\n1\n', 'a.csv')
+    second, created_again = save(uploads, b'x\n1\n', 'b.csv')
+    assert created and not created_again and first == second
+    assert uploads.resolve('a.csv') == uploads.resolve('b.csv') == first
+
+    # A re-upload under an existing name leaves the earlier file in place
+    replaced, _ = uploads.save(io.BytesIO(b'x\n2\n'), 'a.csv')
+    assert uploads.assign('a.csv', replaced) == first
+    assert uploads.resolve('a.csv') == replaced and os.path.exists(first)
+    assert uploads.resolve('missing.csv') is None
+    assert [name for name in os.listdir(uploads.blob_dir) if name.endswith('.tmp')] == []
+
+
+
+@pytest.mark.skipif(not os.path.isdir('/proc/self/fd'), reason='needs /proc to count open files')
+def test_connections_are_closed(uploads):
+    def open_databases():
+        return [fd for fd in os.listdir('/proc/self/fd')
+                if os.path.realpath(f'/proc/self/fd/{fd}').startswith(uploads.db_path)]
+
+    path, _ = save(uploads, b'closed\n', 'closed.csv')
+    uploads.resolve('closed.csv')
+    uploads.record(path)
+    uploads.usage()
+    uploads.discard(path)
+    assert open_databases() == []
+
+def test_usage_comes_from_recorded_sizes(uploads):
+    path, _ = save(uploads, b'x\n' * 50, 'a.csv')
+    digest = file_digest(path)
+    sidecar = path + '.arrow'
+    with open(sidecar, 'wb') as f:
+        f.write(b'0' * 30)
+    index_dir = os.path.join(os.path.dirname(uploads.blob_dir), 'index', digest)
+    os.makedirs(index_dir)
+    with open(os.path.join(index_dir, 'order.npy'), 'wb') as f:
+        f.write(b'0' * 20)
+    for recorded in (sidecar, index_dir, os.path.join(uploads.blob_dir, 'no-digest.pkl')):
+        uploads.record(recorded)
+    assert uploads.usage() == 100 + 30 + 20
+
+    uploads.discard(path)
+    assert uploads.usage() == 0
+    assert not os.path.exists(sidecar) and not os.path.exists(index_dir)
+    assert uploads.resolve('a.csv') is None
+
+
+def test_quota_evicts_least_recently_used_except_kept_and_pinned(uploads, clock):
+    uploads.quota = 300
+    old, _ = save(uploads, b'a' * 100, 'old.csv', clock)
+    pinned, _ = save(uploads, b'b' * 100, 'pinned.csv', clock)
+    idle, _ = save(uploads, b'c' * 100, 'idle.csv', clock)
+    newest, _ = save(uploads, b'd' * 100, 'newest.csv', clock)
+    # Reading old.csv makes idle.csv the least recently used
+    clock[0] += store.TOUCH_INTERVAL + 1
+    uploads.resolve('old.csv')
+
+    in_use = {file_digest(pinned)}
+    assert uploads.enforce_quota(keep=newest, pinned=in_use) == 1
+    assert [os.path.exists(path) for path in (old, pinned, idle, newest)] == [True, True, False, True]
+
+    uploads.quota = 100
+    assert uploads.enforce_quota(keep=newest, pinned=in_use) == 1
+    assert [os.path.exists(path) for path in (old, pinned, idle, newest)] == [False, True, False, True]
+    # Still over quota, since what is left is in use
+    assert uploads.usage() == 200
+
+
+def test_unnamed_files_are_evicted_first_and_orphans_swept(uploads, clock):
+    uploads.quota = 150
+    replaced, _ = save(uploads, b'1' * 100, 'data.csv', clock)
+    current, _ = save(uploads, b'2' * 100, 'data.csv', clock)
+    orphan = os.path.join(uploads.blob_dir, '0' * 64 + '.pkl')
+    with open(orphan, 'wb') as f:
+        f.write(b'stale')
+    uploads.record(orphan)
+
+    assert uploads.enforce_quota() == 1
+    assert not os.path.exists(replaced) and os.path.exists(current)
+    assert not os.path.exists(orphan)
+    assert uploads.usage() == 100
+
+
+def test_active_jobs_pin_their_contents(tmp_path):
+    jobs = JobStore(str(tmp_path / 'jobs.db'))
+    running = jobs.create('a.csv', digest='a' * 64)
+    jobs.update(running, status='running')
+    finished = jobs.create('b.csv', digest='b' * 64)
+    jobs.update(finished, status='done')
+    jobs.create('c.csv')
+    assert jobs.active_digests() == {'a' * 64}
+
+
+def test_uploads_are_logged(upload, sample_frame, log_lines):
+    data = sample_frame.iloc[:140].to_csv(index=False).encode()
+    upload(data, 'logged.csv')
+    upload(data, 'logged-again.csv')
+    saved = [line for line in log_lines if line['event'] == 'upload_saved']
+    assert [(line['filename'], line['size'], line['deduplicated']) for line in saved] == [
+        ('logged.csv', len(data), False), ('logged-again.csv', len(data), True)]
+
+
+def test_open_browsers_pin_their_uploads(app_module, client, upload, sample_frame):
+    upload(sample_frame.iloc[:130].to_csv(index=False).encode(), 'pinned.csv')
+    client.get('/data/pinned.csv?limit=5')
+    path = app_module.upload_store.resolve('pinned.csv')
+    assert app_module.file_digest(path) in app_module.pinned_digests()
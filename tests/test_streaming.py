@@ -0,0 +1,94 @@
+# Chunked profiling of large CSV files
+
+import os
+
+import pandas as pd
+import pytest
+
+from analysis import analyze_data, load_data
+from sniffing import read_csv_prefix
+from streaming import UNAVAILABLE, StreamingProfile, profile_csv, stream_csv
+
+
+@pytest.fixture
+def csv_path(tmp_path, sample_csv):
+    path = tmp_path / 'data.csv'
+    path.write_bytes(sample_csv)
+    return str(path)
+
+
+def test_chunked_profile_is_shaped_like_analyze_data(csv_path):
+    full = analyze_data(load_data(csv_path, use_sidecar=False))
+    # Chunks much smaller than the file, so every accumulator merges
+    streamed = profile_csv(csv_path, chunksize=64)
+
+    assert set(streamed) - set(full) == {'streaming'}
+    for key in ('shape', 'columns', 'dtypes', 'missing_values', 'numeric_columns',
+                'categorical_columns', 'insights'):
+        assert streamed[key] == full[key], key
+    for column, stats in full['basic_stats'].items():
+        assert streamed['basic_stats'][column] == pytest.approx(stats)
+
+
+def test_chunked_profile_says_what_it_lacks(csv_path):
+    streamed = profile_csv(csv_path, chunksize=64)
+    assert streamed['unavailable'] == UNAVAILABLE
+    assert streamed['visualizations'] == {} and streamed['correlations'] == {}
+    assert analyze_data(load_data(csv_path, use_sidecar=False))['unavailable'] == {}
+
+
+def test_bounded_duplicate_count_is_labelled_approximate(sample_frame):
+    repeated = pd.concat([sample_frame] * 3, ignore_index=True)
+    profile = StreamingProfile(duplicate_capacity=100)
+    for start in range(0, len(repeated), 250):
+        profile.update(repeated.iloc[start:start + 250])
+    result = profile.result()
+
+    assert result['data_quality']['duplicates_approximate']
+    assert result['data_quality']['duplicate_rows'] == pytest.approx(1000, rel=0.3)
+    assert any(line.startswith('About ') for line in result['insights']['data_quality'])
+
+
+def test_prefix_parse_reads_complete_lines_only(csv_path, sample_frame):
+    prefix = read_csv_prefix(csv_path, sample_size=2000)
+    assert list(prefix.columns) == list(sample_frame.columns)
+    assert 0 < len(prefix) < len(sample_frame)
+    assert prefix['id'].tolist() == list(range(len(prefix)))
+
+
+def test_large_upload_is_streamed_and_charts_are_refused(app_module, client, upload, sample_frame, monkeypatch):
+    # Contents no other test uploads, so no result is cached for them yet
+    data = sample_frame.head(400).to_csv(index=False).encode()
+    monkeypatch.setitem(app_module.app.config, 'STREAMING_PROFILE_THRESHOLD', len(data) - 1)
+    assert upload(data, 'large.csv').status_code == 200
+    # Only the first rows were parsed, so no sidecar was written
+    path = app_module.upload_store.resolve('large.csv')
+    assert app_module.streams_profile(path)
+    assert not os.path.exists(path + '.feather')
+
+    analysis = client.post('/analyze', json={'file_path': 'large.csv', 'wait': True}).get_json()['analysis']
+    assert analysis['streaming'] and analysis['shape'] == [400, 6]
+    page = client.get('/results/large.csv').get_data(as_text=True)
+    assert 'profiled in chunks' in page
+
+    chart = client.get('/viz/large.csv/data_types_pie')
+    assert chart.status_code == 404
+    assert UNAVAILABLE['visualizations'] in chart.get_json()['error']
+    assert client.get('/correlations/large.csv').status_code == 400
+
+
+def test_streamed_analysis_reports_progress_per_chunk(app_module, upload, sample_frame, monkeypatch, tmp_path):
+    path = tmp_path / 'chunks.csv'
+    sample_frame.to_csv(path, index=False)
+    shares = []
+    stream_csv(str(path), chunksize=100, progress=shares.append)
+    assert len(shares) == 5 and shares == sorted(shares) and shares[-1] == 1.0
+
+    data = sample_frame.iloc[:410].to_csv(index=False).encode()
+    monkeypatch.setitem(app_module.app.config, 'STREAMING_PROFILE_THRESHOLD', len(data) - 1)
+    upload(data, 'progress.csv')
+    reported = []
+    app_module.get_analysis(app_module.upload_store.resolve('progress.csv'),
+                            progress=lambda stage, fraction=None: reported.append((stage, fraction)))
+    assert reported and {stage for stage, _ in reported} == {'profiling'}
+    assert reported[-1][1] == 1.0
@@ -0,0 +1,30 @@
+# Charts listed with the analysis and built on demand by /viz
+
+import json
+
+import pytest
+
+from analysis import analyze_data, build_visualization
+
+
+def test_analysis_lists_charts_without_building_them(sample_frame):
+    manifest = analyze_data(sample_frame)['visualizations']
+    assert list(manifest)[:2] == ['data_types_pie', 'missing_values_bar']
+    assert manifest['histogram_1'] == {'title': 'Distribution of id', 'column': 'id'}
+    assert all(set(entry) == {'title', 'column'} for entry in manifest.values())
+
+
+def test_unknown_chart_is_rejected(sample_frame):
+    with pytest.raises(ValueError):
+        build_visualization(sample_frame, 'histogram_99')
+
+
+def test_results_page_links_charts_and_viz_serves_them(client, upload, sample_frame):
+    upload(sample_frame.head(200).to_csv(index=False).encode(), 'charts.csv')
+    page = client.get('/results/charts.csv').get_data(as_text=True)
+    assert 'data-chart-url="/viz/charts.csv/data_types_pie"' in page
+
+    chart = client.get('/viz/charts.csv/histogram_1')
+    assert chart.status_code == 200
+    assert json.loads(chart.get_data())['layout']['title']['text'] == 'Distribution of id'
+    assert client.get('/viz/charts.csv/nope').status_code == 404